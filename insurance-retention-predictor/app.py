@@ -8,19 +8,21 @@
 4. 查看数据洞察仪表盘
 """
 
+import io
 import os
+import uuid
+import base64
 import logging
-import joblib
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import io
-import base64
 from datetime import datetime
-from flask import Flask, request, jsonify, render_template, redirect, url_for, flash, send_file
+from flask import Flask, request, render_template, redirect, url_for, flash, send_file
 from werkzeug.utils import secure_filename
-import shap
+
+from src.evaluation.batch_summary import BatchSummary, load_summary, summarize_result_file, summary_path
+from src.models.explain import compute_shap_values, shap_importance
+from src.models.predict_model import score_file_in_chunks
+from src.models.registry import ModelRegistry
+from src.visualization.charts import ChartRenderer, render_importance_chart, render_probability_histogram
 
 # 配置日志
 logging.basicConfig(
@@ -38,62 +40,38 @@ PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 
 # 模型和数据路径
 MODELS_DIR = os.path.join(PROJECT_ROOT, "models")
+PREPROCESSOR_PATH = os.path.join(PROJECT_ROOT, "data/processed/preprocessor.pkl")
 UPLOAD_FOLDER = os.path.join(PROJECT_ROOT, "uploads")
 DOWNLOAD_FOLDER = os.path.join(PROJECT_ROOT, "downloads")
-ALLOWED_EXTENSIONS = {'csv', 'xlsx'}
+ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'parquet', 'feather'}
+
+# 批量预测结果文件可选的格式，默认CSV便于直接用表格软件打开
+RESULT_FORMATS = {'csv', 'parquet'}
+
+# 批量预测时每个数据块的行数，峰值内存只与该值相关
+BATCH_CHUNK_SIZE = 50000
+
+# 检查模型目录是否有新模型的间隔（秒）
+MODEL_POLL_INTERVAL = 10
 
 # 确保目录存在
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(DOWNLOAD_FOLDER, exist_ok=True)
 
-# 模型加载
-def load_model():
-    """加载最新的预测模型"""
-    try:
-        # 查找最新的模型文件
-        model_files = [f for f in os.listdir(MODELS_DIR) if f.endswith('.pkl')]
-        if not model_files:
-            logger.error("未找到模型文件")
-            return None
-        
-        latest_model = max(model_files, key=lambda x: os.path.getmtime(os.path.join(MODELS_DIR, x)))
-        model_path = os.path.join(MODELS_DIR, latest_model)
-        
-        logger.info(f"加载模型：{model_path}")
-        model = joblib.load(model_path)
-        return model
-    
-    except Exception as e:
-        logger.error(f"加载模型失败: {str(e)}")
-        return None
+# 模型注册表：后台监视模型目录，发现新模型时加载、预热后原子切换，无需重启服务
+registry = ModelRegistry(MODELS_DIR, PREPROCESSOR_PATH, poll_interval=MODEL_POLL_INTERVAL)
+registry.refresh()
+registry.start()
 
-# 预处理器加载
-def load_preprocessor():
-    """加载数据预处理器"""
-    try:
-        preprocessor_path = os.path.join(PROJECT_ROOT, "data/processed/preprocessor.pkl")
-        if not os.path.exists(preprocessor_path):
-            logger.error(f"预处理器文件不存在: {preprocessor_path}")
-            return None
-        
-        logger.info(f"加载预处理器：{preprocessor_path}")
-        preprocessor = joblib.load(preprocessor_path)
-        return preprocessor
-    
-    except Exception as e:
-        logger.error(f"加载预处理器失败: {str(e)}")
-        return None
-
-# 全局变量
-model = load_model()
-preprocessor = load_preprocessor()
+# 图表渲染服务：在后台线程池中渲染并按模型版本和结果文件缓存
+chart_renderer = ChartRenderer()
 
 # 工具函数
 def allowed_file(filename):
     """检查文件扩展名是否允许"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def preprocess_data(data):
+def preprocess_data(data, preprocessor):
     """预处理输入数据"""
     if preprocessor is None:
         flash("预处理器加载失败，无法处理数据", "danger")
@@ -108,7 +86,7 @@ def preprocess_data(data):
         logger.error(f"数据预处理失败: {str(e)}")
         return None
 
-def predict_renewal(data):
+def predict_renewal(data, model):
     """预测客户续保概率"""
     if model is None:
         flash("模型加载失败，无法进行预测", "danger")
@@ -128,57 +106,23 @@ def predict_renewal(data):
         logger.error(f"预测失败: {str(e)}")
         return None
 
-def get_feature_importance(data=None):
+def get_feature_importance(bundle, data=None):
     """获取特征重要性"""
-    if model is None:
+    if bundle is None:
         flash("模型加载失败，无法获取特征重要性", "danger")
         return None
     
     try:
-        # 尝试不同的方法获取特征重要性
-        if hasattr(model, 'feature_importances_'):
-            # 树模型
-            importances = model.feature_importances_
-            feature_names = model.feature_names_in_ if hasattr(model, 'feature_names_in_') else [f"feature_{i}" for i in range(len(importances))]
-            
-            # 创建特征重要性DataFrame
-            importance_df = pd.DataFrame({
-                'Feature': feature_names,
-                'Importance': importances
-            }).sort_values('Importance', ascending=False)
-            
-            return importance_df
+        # 树模型和线性模型：全局特征重要性随模型版本预先计算，直接从内存返回
+        if bundle.importance is not None:
+            return bundle.importance
         
-        elif hasattr(model, 'coef_'):
-            # 线性模型
-            coefficients = model.coef_[0] if model.coef_.ndim > 1 else model.coef_
-            feature_names = model.feature_names_in_ if hasattr(model, 'feature_names_in_') else [f"feature_{i}" for i in range(len(coefficients))]
-            
-            # 创建特征重要性DataFrame
-            importance_df = pd.DataFrame({
-                'Feature': feature_names,
-                'Importance': np.abs(coefficients)  # 使用系数绝对值作为重要性
-            }).sort_values('Importance', ascending=False)
-            
-            return importance_df
-        
-        else:
-            # 使用SHAP值（如果数据可用）
-            if data is not None and hasattr(shap, 'Explainer'):
-                explainer = shap.Explainer(model)
-                shap_values = explainer(data)
-                
-                # 获取平均绝对SHAP值作为特征重要性
-                feature_names = data.columns if hasattr(data, 'columns') else [f"feature_{i}" for i in range(data.shape[1])]
-                importances = np.abs(shap_values.values).mean(axis=0)
-                
-                # 创建特征重要性DataFrame
-                importance_df = pd.DataFrame({
-                    'Feature': feature_names,
-                    'Importance': importances
-                }).sort_values('Importance', ascending=False)
-                
-                return importance_df
+        # 使用SHAP值（如果数据可用），解释器随模型版本缓存，不在每个请求中重建
+        explainer = bundle.get_explainer()
+        if data is not None and explainer is not None:
+            # 获取平均绝对SHAP值作为特征重要性
+            shap_values = compute_shap_values(explainer, data)
+            return shap_importance(shap_values, bundle.feature_names)
         
         return None
     
@@ -186,14 +130,30 @@ def get_feature_importance(data=None):
         logger.error(f"获取特征重要性失败: {str(e)}")
         return None
 
-def plot_to_base64(plt_obj):
-    """将Matplotlib图形转换为base64编码的字符串"""
-    img = io.BytesIO()
-    plt_obj.savefig(img, format='png', bbox_inches='tight')
-    img.seek(0)
-    encoded = base64.b64encode(img.getvalue()).decode('utf-8')
-    plt.close()
-    return encoded
+def render_shap_importance_chart(bundle, data):
+    """在渲染线程中计算单条预测的SHAP重要性并绘图，不占用请求线程"""
+    importance_df = get_feature_importance(bundle, data)
+    if importance_df is None:
+        return None
+    return render_importance_chart(importance_df)
+
+def submit_probability_chart(filename, summary):
+    """提交概率分布图的渲染任务，批量评分后的预渲染和结果页面使用同一缓存键和参数"""
+    key = ('probability_dist', filename, summary['model_version'], summary['threshold'])
+    chart_renderer.submit(
+        key, render_probability_histogram, summary['bin_edges'], summary['histogram'], summary['threshold']
+    )
+    return key
+
+def load_result_summary(result_path):
+    """读取结果摘要文件，历史结果没有摘要时分块生成一次并保存"""
+    summary = load_summary(summary_path(result_path))
+    if summary is None:
+        logger.info(f"结果摘要不存在，根据结果文件生成: {result_path}")
+        batch_summary = summarize_result_file(result_path, chunk_size=BATCH_CHUNK_SIZE)
+        batch_summary.save(summary_path(result_path))
+        summary = batch_summary.to_dict()
+    return summary
 
 # 路由定义
 @app.route('/')
@@ -210,6 +170,12 @@ def predict_form():
 def predict_single():
     """处理单个客户预测"""
     if request.method == 'POST':
+        # 整个请求使用同一个模型版本，后台切换不影响进行中的请求
+        bundle = registry.current()
+        if bundle is None:
+            flash("模型加载失败，无法进行预测", "danger")
+            return redirect(url_for('predict_form'))
+        
         try:
             # 收集表单数据
             form_data = {}
@@ -225,36 +191,41 @@ def predict_single():
                 except ValueError:
                     form_data[field] = value
             
-            # 创建DataFrame
-            input_data = pd.DataFrame([form_data])
-            
-            # 预处理数据
-            processed_data = preprocess_data(input_data)
-            if processed_data is None:
-                flash("数据预处理失败", "danger")
-                return redirect(url_for('predict_form'))
-            
-            # 预测
-            probability = predict_renewal(processed_data)[0]
-            
-            # 获取特征重要性
-            importance_df = get_feature_importance(processed_data)
+            if bundle.pipeline is not None:
+                # 快速路径：按列索引计划直接构造特征向量，不创建DataFrame
+                processed_data = bundle.pipeline.transform_record(form_data)
+                probability = bundle.pipeline.predict_proba_transformed(processed_data)[0]
+            else:
+                # 创建DataFrame
+                input_data = pd.DataFrame([form_data])
+                
+                # 预处理数据
+                processed_data = preprocess_data(input_data, bundle.preprocessor)
+                if processed_data is None:
+                    flash("数据预处理失败", "danger")
+                    return redirect(url_for('predict_form'))
+                
+                # 预测
+                probability = predict_renewal(processed_data, bundle.model)[0]
             
-            # 生成特征重要性图
-            importance_plot = None
-            if importance_df is not None:
-                plt.figure(figsize=(10, 6))
-                sns.barplot(data=importance_df.head(10), x='Importance', y='Feature')
-                plt.title('Top 10 特征重要性')
-                plt.tight_layout()
-                importance_plot = plot_to_base64(plt)
+            # 生成特征重要性图：预先计算的全局重要性图每个模型版本只渲染一次；
+            # 基于SHAP的重要性随输入变化，在渲染线程中计算并绘图。图表未完成时页面按URL轮询
+            if bundle.importance is not None:
+                chart_key = ('importance', bundle.version)
+                importance_plot = chart_renderer.render(chart_key, render_importance_chart, bundle.importance)
+            else:
+                chart_key = ('importance', bundle.version, uuid.uuid4().hex)
+                importance_plot = chart_renderer.render(
+                    chart_key, render_shap_importance_chart, bundle, processed_data
+                )
             
             # 渲染结果页面
             return render_template(
                 'prediction_result.html',
                 customer_data=form_data,
                 probability=probability,
-                importance_plot=importance_plot
+                importance_plot=importance_plot,
+                importance_plot_url=url_for('chart', chart_id=ChartRenderer.chart_id(chart_key))
             )
         
         except Exception as e:
@@ -289,31 +260,44 @@ def predict_batch():
             file_path = os.path.join(UPLOAD_FOLDER, filename)
             file.save(file_path)
             
+            # 整个请求使用同一个模型版本，后台切换不影响进行中的请求
+            bundle = registry.current()
+            if bundle is None:
+                flash("模型或预处理器加载失败，无法进行预测", "danger")
+                return redirect(url_for('batch_upload'))
+            
+            # 勾选逐行解释时，每个数据块用一次向量化SHAP调用计算主要影响因素
+            explainer = None
+            if request.form.get('explain'):
+                explainer = bundle.get_explainer()
+                if explainer is None:
+                    flash("当前模型不支持SHAP解释，结果中不包含逐行解释", "warning")
+            
             try:
-                # 根据文件类型加载数据
-                if filename.endswith('.csv'):
-                    data = pd.read_csv(file_path)
-                else:  # xlsx
-                    data = pd.read_excel(file_path)
-                
-                # 预处理数据
-                processed_data = preprocess_data(data)
-                if processed_data is None:
-                    flash("数据预处理失败", "danger")
-                    return redirect(url_for('batch_upload'))
-                
-                # 预测
-                probabilities = predict_renewal(processed_data)
-                
-                # 添加预测结果
-                data['RenewalProbability'] = probabilities
-                data['PredictedRenewal'] = (probabilities >= 0.5).astype(int)
-                
-                # 保存结果文件
+                # 分块读取、预处理、预测并追加写入结果文件，同时累计结果摘要
+                summary = BatchSummary()
+                summary.model_version = bundle.version
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                result_filename = f"prediction_results_{timestamp}.csv"
+                result_format = request.form.get('result_format', 'csv')
+                if result_format not in RESULT_FORMATS:
+                    result_format = 'csv'
+                result_filename = f"prediction_results_{timestamp}.{result_format}"
                 result_path = os.path.join(DOWNLOAD_FOLDER, result_filename)
-                data.to_csv(result_path, index=False)
+                stats = score_file_in_chunks(
+                    file_path, result_path, bundle.model, bundle.preprocessor,
+                    chunk_size=BATCH_CHUNK_SIZE,
+                    explainer=explainer,
+                    feature_names=bundle.feature_names,
+                    summary=summary
+                )
+                summary.save(summary_path(result_path))
+                flash(
+                    f"已完成 {stats['rows']} 条记录的预测，吞吐量 {stats['rows_per_second']:.0f} 行/秒",
+                    "info"
+                )
+                
+                # 在后台预先渲染概率分布图，结果页面直接读取缓存
+                submit_probability_chart(result_filename, summary.to_dict())
                 
                 # 重定向到结果页面
                 return redirect(url_for('prediction_results', filename=result_filename))
@@ -324,7 +308,7 @@ def predict_batch():
                 return redirect(url_for('batch_upload'))
         
         else:
-            flash('不支持的文件类型，请上传CSV或Excel文件', 'danger')
+            flash('不支持的文件类型，请上传CSV、Excel、Parquet或Feather文件', 'danger')
             return redirect(url_for('batch_upload'))
 
 @app.route('/prediction_results/<filename>')
@@ -336,50 +320,32 @@ def prediction_results(filename):
             flash("结果文件不存在", "danger")
             return redirect(url_for('batch_upload'))
         
-        # 读取预测结果
-        results = pd.read_csv(result_path)
-        
-        # 计算基本统计信息
-        total_count = len(results)
-        predicted_renewal_count = results['PredictedRenewal'].sum()
-        predicted_renewal_rate = predicted_renewal_count / total_count * 100
+        # 读取评分时生成的结果摘要，耗时与结果文件大小无关
+        summary = load_result_summary(result_path)
         
-        # 生成预测分布图
-        plt.figure(figsize=(10, 6))
-        sns.histplot(results['RenewalProbability'], bins=20, kde=True)
-        plt.title('续保概率分布')
-        plt.xlabel('续保概率')
-        plt.ylabel('客户数量')
-        plt.axvline(x=0.5, color='red', linestyle='--', label='决策阈值 (0.5)')
-        plt.legend()
-        probability_dist_plot = plot_to_base64(plt)
+        # 获取预测分布图：评分后已在后台提交渲染，尚未完成时页面按URL轮询
+        chart_key = submit_probability_chart(filename, summary)
+        probability_dist_plot = chart_renderer.render(
+            chart_key, render_probability_histogram,
+            summary['bin_edges'], summary['histogram'], summary['threshold']
+        )
         
-        # 如果数据中有实际的续保标签，计算模型性能
+        # 如果数据中有实际的续保标签，展示模型性能
         model_performance = None
-        if 'Renewed' in results.columns:
-            from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
-            
-            actual = results['Renewed']
-            predicted = results['PredictedRenewal']
-            probabilities = results['RenewalProbability']
-            
-            performance = {
-                'accuracy': accuracy_score(actual, predicted),
-                'precision': precision_score(actual, predicted),
-                'recall': recall_score(actual, predicted),
-                'f1': f1_score(actual, predicted),
-                'roc_auc': roc_auc_score(actual, probabilities)
+        if summary['metrics'] is not None:
+            model_performance = {
+                k: f"{v:.4f}" if v is not None else "N/A"
+                for k, v in summary['metrics'].items()
             }
-            
-            model_performance = {k: f"{v:.4f}" for k, v in performance.items()}
         
         return render_template(
             'batch_results.html',
             filename=filename,
-            total_count=total_count,
-            predicted_renewal_count=predicted_renewal_count,
-            predicted_renewal_rate=predicted_renewal_rate,
+            total_count=summary['total_count'],
+            predicted_renewal_count=summary['predicted_renewal_count'],
+            predicted_renewal_rate=summary['predicted_renewal_rate'],
             probability_dist_plot=probability_dist_plot,
+            probability_dist_plot_url=url_for('chart', chart_id=ChartRenderer.chart_id(chart_key)),
             model_performance=model_performance
         )
     
@@ -388,6 +354,16 @@ def prediction_results(filename):
         flash(f"显示结果时发生错误: {str(e)}", "danger")
         return redirect(url_for('batch_upload'))
 
+@app.route('/charts/<chart_id>')
+def chart(chart_id):
+    """返回后台渲染的图表：渲染完成时返回PNG，仍在渲染时返回202，页面据此轮询"""
+    status, image = chart_renderer.status(chart_id)
+    if status == 'ready':
+        return send_file(io.BytesIO(base64.b64decode(image)), mimetype='image/png')
+    if status == 'pending':
+        return '', 202
+    return '', 404
+
 @app.route('/download_results/<filename>')
 def download_results(filename):
     """下载预测结果文件"""
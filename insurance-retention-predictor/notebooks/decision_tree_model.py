@@ -6,6 +6,7 @@
 """
 
 import os
+import sys
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -28,6 +29,13 @@ DATA_PATH = os.path.join(PROJECT_ROOT, 'data/raw/policy_data.xlsx')
 FIGURES_DIR = os.path.join(PROJECT_ROOT, 'reports/figures')
 MODELS_DIR = os.path.join(PROJECT_ROOT, 'models')
 
+# 添加项目根目录到系统路径
+sys.path.append(PROJECT_ROOT)
+
+from src.data.ingestion import load_excel
+from src.data.transform_cache import transformer_memory
+from src.features.creation import create_time_features
+
 # 确保目录存在
 os.makedirs(FIGURES_DIR, exist_ok=True)
 os.makedirs(MODELS_DIR, exist_ok=True)
@@ -38,7 +46,7 @@ TIMESTAMP = datetime.now().strftime("%Y%m%d_%H%M%S")
 def load_data(data_path):
     """加载原始数据"""
     print(f"正在读取数据: {data_path}")
-    df = pd.read_excel(data_path)
+    df = load_excel(data_path)
     print(f"成功读取数据，形状: {df.shape}")
     return df
 
@@ -49,10 +57,8 @@ def preprocess_data(df):
     df['renewal_encoded'] = le.fit_transform(df['renewal'])
     
     # 从日期中提取年月特征
-    df['policy_start_date_year'] = df['policy_start_date'].dt.year
-    df['policy_start_date_month'] = df['policy_start_date'].dt.month
-    df['policy_end_date_year'] = df['policy_end_date'].dt.year
-    df['policy_end_date_month'] = df['policy_end_date'].dt.month
+    for date_col in ['policy_start_date', 'policy_end_date']:
+        df = create_time_features(df, date_col)
     
     return df
 
@@ -96,7 +102,7 @@ def build_train_decision_tree(X_train, y_train, cat_features, num_features, rand
         ]
     )
     
-    # 构建模型管道
+    # 构建模型管道，数据和预处理参数不变时复用缓存的已拟合预处理器
     model = Pipeline([
         ('preprocessor', preprocessor),
         ('classifier', DecisionTreeClassifier(
@@ -106,7 +112,7 @@ def build_train_decision_tree(X_train, y_train, cat_features, num_features, rand
             class_weight='balanced',
             random_state=random_state
         ))
-    ])
+    ], memory=transformer_memory())
     
     # 训练模型
     model.fit(X_train, y_train)
@@ -39,6 +39,10 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 # 添加项目根目录到系统路径
 sys.path.append(project_root)
 
+from src.data.ingestion import load_excel
+from src.data.transform_cache import transformer_memory
+from src.features.creation import create_time_features
+
 # 构建文件路径
 file_path = os.path.join(project_root, 'data', 'raw', 'policy_data.xlsx')
 print(f"数据文件路径: {file_path}")
@@ -67,7 +71,7 @@ try:
 
     # 读取数据
     print(f"正在读取数据: {file_path}")
-    df = pd.read_excel(file_path)
+    df = load_excel(file_path)
     print(f"成功读取数据，形状: {df.shape}")
     
     # 查看前几行数据
@@ -104,8 +108,7 @@ try:
     
     # 处理日期特征：提取年份和月份
     for date_col in date_features:
-        df[f'{date_col}_year'] = df[date_col].dt.year
-        df[f'{date_col}_month'] = df[date_col].dt.month
+        df = create_time_features(df, date_col)
     
     # 更新特征列表
     date_derived_features = []
@@ -141,7 +144,8 @@ try:
     
     categorical_transformer = Pipeline(steps=[
         ('imputer', SimpleImputer(strategy='most_frequent')),
-        ('onehot', OneHotEncoder(handle_unknown='ignore', sparse_output=False))
+        # 独热编码结果保持稀疏，逻辑回归可直接使用CSR矩阵
+        ('onehot', OneHotEncoder(handle_unknown='ignore'))
     ])
     
     # 检查是否有有效特征
@@ -159,11 +163,11 @@ try:
         # 2. 构建逻辑回归模型
         print("\n=== 构建逻辑回归模型 ===")
         
-        # 创建完整的模型管道
+        # 创建完整的模型管道，数据和预处理参数不变时复用缓存的已拟合预处理器
         model = Pipeline(steps=[
             ('preprocessor', preprocessor),
             ('classifier', LogisticRegression(max_iter=1000, random_state=42, C=1.0))
-        ])
+        ], memory=transformer_memory())
         
         # 训练模型
         print("训练模型中...")
@@ -36,6 +36,8 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 # 添加项目根目录到系统路径
 sys.path.append(project_root)
 
+from src.data.ingestion import load_excel
+
 # 构建文件路径
 file_path = os.path.join(project_root, 'data', 'raw', 'policy_data.xlsx')
 print(f"数据文件路径: {file_path}")
@@ -59,7 +61,7 @@ def save_fig(fig, name):
 try:
     # 读取Excel文件
     print(f"正在读取数据: {file_path}")
-    df = pd.read_excel(file_path)
+    df = load_excel(file_path)
     print(f"成功读取数据，形状: {df.shape}")
     
     #==========================================================
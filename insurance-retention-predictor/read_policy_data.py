@@ -1,6 +1,7 @@
-import pandas as pd
 import os
 
+from src.data.ingestion import load_excel
+
 # 获取当前脚本的绝对路径
 current_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -11,8 +12,8 @@ print(f"尝试读取文件: {file_path}")
 print(f"文件是否存在: {os.path.exists(file_path)}")
 
 try:
-    # 读取Excel文件
-    df = pd.read_excel(file_path)
+    # 读取Excel文件（之后的运行从Parquet缓存加载）
+    df = load_excel(file_path)
     
     # 显示前5行数据
     print('\n数据前5行：')
@@ -11,6 +11,7 @@ setup(
     install_requires=[
         "numpy>=1.24.0",
         "pandas>=2.0.0",
+        "pyarrow>=12.0.0",
         "scikit-learn>=1.3.0",
         "matplotlib>=3.7.0",
         "seaborn>=0.12.0",
@@ -0,0 +1,282 @@
+"""
+特征存储模块
+
+该模块将处理后的特征矩阵保存为连续的float32内存映射数组，包括：
+- 特征矩阵保存为标准的 .npy 文件（C连续、float32），特征名称等元数据保存在旁边的 .meta.json 文件
+- 以只读内存映射方式打开，不把整个矩阵读入内存
+- 包装为共享同一块内存的DataFrame，训练代码无需修改
+- 交叉验证的工作进程通过joblib按文件引用接收内存映射数组，各进程共享操作系统页缓存，不再各自复制数据
+- 稀疏（独热编码）特征矩阵以CSR格式保存为 .csr.npz 文件，加载后保持稀疏
+"""
+
+import os
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# 特征存储文件格式版本，元数据结构变化时递增
+FEATURE_STORE_VERSION = 1
+
+# 特征矩阵的存储类型
+FEATURE_DTYPE = np.float32
+
+# 写入时每次复制的行数
+_WRITE_CHUNK_ROWS = 65536
+
+# 特征矩阵的存储布局及对应的文件扩展名
+LAYOUT_EXTENSIONS = {
+    "dense": ".npy",
+    "csr": ".csr.npz",
+}
+
+
+def feature_store_paths(directory: str, name: str, layout: str = "dense") -> Tuple[str, str]:
+    """特征矩阵文件和元数据文件的路径"""
+    base = os.path.join(directory, name)
+    return f"{base}{LAYOUT_EXTENSIONS[layout]}", f"{base}.meta.json"
+
+
+def _resolve_feature_names(X: Any, feature_names: Optional[List[str]], n_cols: int) -> List[str]:
+    """确定特征名称并校验数量"""
+    if feature_names is None:
+        feature_names = (
+            [str(col) for col in X.columns] if isinstance(X, pd.DataFrame)
+            else [f"feature_{i}" for i in range(n_cols)]
+        )
+    if len(feature_names) != n_cols:
+        raise ValueError(f"特征名称数量 ({len(feature_names)}) 与矩阵列数 ({n_cols}) 不一致")
+    return list(feature_names)
+
+
+def _write_metadata(directory: str, name: str, layout: str, shape: Tuple[int, int], feature_names: List[str]) -> None:
+    """写入元数据文件，并删除另一种布局的旧特征矩阵文件"""
+    _, meta_path = feature_store_paths(directory, name)
+    metadata = {
+        "version": FEATURE_STORE_VERSION,
+        "layout": layout,
+        "dtype": np.dtype(FEATURE_DTYPE).name,
+        "shape": [int(shape[0]), int(shape[1])],
+        "feature_names": feature_names,
+        "created_at": datetime.now().isoformat(),
+    }
+    with open(meta_path, "w", encoding="utf-8") as file:
+        json.dump(metadata, file, ensure_ascii=False)
+
+    for other_layout in LAYOUT_EXTENSIONS:
+        if other_layout != layout:
+            stale_path, _ = feature_store_paths(directory, name, other_layout)
+            if os.path.exists(stale_path):
+                os.remove(stale_path)
+
+
+def save_feature_matrix(
+    X: Any, directory: str, name: str, feature_names: Optional[List[str]] = None
+) -> str:
+    """
+    将特征矩阵保存为float32内存映射数组
+
+    Args:
+        X: 特征矩阵（DataFrame或二维数组）
+        directory: 输出目录
+        name: 数据集名称（如 X_train）
+        feature_names: 特征名称，默认使用DataFrame的列名
+
+    Returns:
+        特征矩阵文件路径
+    """
+    values = X.to_numpy() if isinstance(X, pd.DataFrame) else np.asarray(X)
+    if values.ndim != 2:
+        raise ValueError(f"特征矩阵必须是二维的，实际维度: {values.ndim}")
+
+    n_rows, n_cols = values.shape
+    feature_names = _resolve_feature_names(X, feature_names, n_cols)
+
+    os.makedirs(directory, exist_ok=True)
+    data_path, _ = feature_store_paths(directory, name)
+
+    # 先写入临时文件再替换，正在读取旧文件的进程不受影响
+    tmp_path = f"{data_path}.tmp"
+    array = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=FEATURE_DTYPE, shape=(n_rows, n_cols))
+    for start in range(0, n_rows, _WRITE_CHUNK_ROWS):
+        array[start:start + _WRITE_CHUNK_ROWS] = values[start:start + _WRITE_CHUNK_ROWS]
+    array.flush()
+    del array
+    os.replace(tmp_path, data_path)
+    _write_metadata(directory, name, "dense", (n_rows, n_cols), feature_names)
+
+    logger.info(f"保存特征矩阵到 {data_path}，形状: {n_rows} x {n_cols}，类型: {np.dtype(FEATURE_DTYPE).name}")
+    return data_path
+
+
+def save_sparse_feature_matrix(
+    X: sp.spmatrix, directory: str, name: str, feature_names: Optional[List[str]] = None
+) -> str:
+    """
+    将稀疏特征矩阵以float32 CSR格式保存
+
+    Args:
+        X: 稀疏特征矩阵
+        directory: 输出目录
+        name: 数据集名称（如 X_train）
+        feature_names: 特征名称
+
+    Returns:
+        特征矩阵文件路径
+    """
+    X = sp.csr_matrix(X, dtype=FEATURE_DTYPE)
+    feature_names = _resolve_feature_names(X, feature_names, X.shape[1])
+
+    os.makedirs(directory, exist_ok=True)
+    data_path, _ = feature_store_paths(directory, name, "csr")
+
+    # 不压缩，加载时无需解压；先写入临时文件再替换
+    tmp_path = f"{data_path[:-len('.npz')]}.tmp.npz"
+    sp.save_npz(tmp_path, X, compressed=False)
+    os.replace(tmp_path, data_path)
+    _write_metadata(directory, name, "csr", X.shape, feature_names)
+
+    density = X.nnz / max(X.shape[0] * X.shape[1], 1)
+    logger.info(f"保存稀疏特征矩阵到 {data_path}，形状: {X.shape[0]} x {X.shape[1]}，密度: {density:.4f}")
+    return data_path
+
+
+def _checked_metadata(directory: str, name: str, layout: str) -> Dict[str, Any]:
+    """读取元数据并校验版本和布局"""
+    data_path, _ = feature_store_paths(directory, name, layout)
+    metadata = load_feature_metadata(directory, name)
+    if metadata is None or not os.path.exists(data_path):
+        raise FileNotFoundError(f"特征矩阵不存在: {data_path}")
+    if metadata.get("version") != FEATURE_STORE_VERSION:
+        raise ValueError(f"不支持的特征存储版本: {metadata.get('version')}")
+    if metadata.get("layout", "dense") != layout:
+        raise ValueError(f"特征矩阵 {name} 的存储布局为 {metadata.get('layout')}，不是 {layout}")
+    return metadata
+
+
+def load_feature_metadata(directory: str, name: str) -> Optional[Dict[str, Any]]:
+    """
+    读取特征矩阵的元数据
+
+    Args:
+        directory: 数据目录
+        name: 数据集名称
+
+    Returns:
+        元数据字典，文件不存在时返回None
+    """
+    _, meta_path = feature_store_paths(directory, name)
+    if not os.path.exists(meta_path):
+        return None
+
+    with open(meta_path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def open_feature_matrix(directory: str, name: str) -> Tuple[np.memmap, Dict[str, Any]]:
+    """
+    以只读内存映射方式打开特征矩阵，不复制数据
+
+    Args:
+        directory: 数据目录
+        name: 数据集名称
+
+    Returns:
+        内存映射数组和元数据
+    """
+    data_path, _ = feature_store_paths(directory, name)
+    metadata = _checked_metadata(directory, name, "dense")
+
+    array = np.load(data_path, mmap_mode="r")
+    if list(array.shape) != metadata["shape"] or array.dtype != np.dtype(metadata["dtype"]):
+        raise ValueError(f"特征矩阵 {data_path} 与元数据不一致，请重新生成")
+    return array, metadata
+
+
+def open_feature_frame(directory: str, name: str) -> pd.DataFrame:
+    """
+    打开特征矩阵并包装为DataFrame，DataFrame与内存映射数组共享内存
+
+    Args:
+        directory: 数据目录
+        name: 数据集名称
+
+    Returns:
+        以内存映射数组为底层数据的DataFrame
+    """
+    array, metadata = open_feature_matrix(directory, name)
+    frame = pd.DataFrame(array, columns=metadata["feature_names"], copy=False)
+    logger.info(f"以内存映射方式打开特征矩阵 {name}，形状: {array.shape}")
+    return frame
+
+
+def load_sparse_feature_matrix(directory: str, name: str) -> sp.csr_matrix:
+    """
+    加载CSR格式的稀疏特征矩阵
+
+    Args:
+        directory: 数据目录
+        name: 数据集名称
+
+    Returns:
+        CSR稀疏矩阵
+    """
+    data_path, _ = feature_store_paths(directory, name, "csr")
+    metadata = _checked_metadata(directory, name, "csr")
+
+    X = sp.load_npz(data_path).tocsr()
+    if list(X.shape) != metadata["shape"]:
+        raise ValueError(f"特征矩阵 {data_path} 与元数据不一致，请重新生成")
+    logger.info(f"加载稀疏特征矩阵 {name}，形状: {X.shape}，非零元素: {X.nnz}")
+    return X
+
+
+def load_feature_matrix(directory: str, name: str) -> Any:
+    """
+    按元数据记录的存储布局加载特征矩阵
+
+    Args:
+        directory: 数据目录
+        name: 数据集名称
+
+    Returns:
+        稠密布局返回内存映射DataFrame，CSR布局返回稀疏矩阵
+    """
+    metadata = load_feature_metadata(directory, name)
+    if metadata is not None and metadata.get("layout", "dense") == "csr":
+        return load_sparse_feature_matrix(directory, name)
+    return open_feature_frame(directory, name)
+
+
+def has_feature_matrix(directory: str, name: str, newer_than: Optional[str] = None) -> bool:
+    """
+    检查特征矩阵是否存在，并且不早于指定文件（如同名的表格数据文件）
+
+    Args:
+        directory: 数据目录
+        name: 数据集名称
+        newer_than: 用于比较修改时间的文件路径
+
+    Returns:
+        是否可以使用特征矩阵
+    """
+    metadata = load_feature_metadata(directory, name)
+    if metadata is None:
+        return False
+    data_path, _ = feature_store_paths(directory, name, metadata.get("layout", "dense"))
+    if not os.path.exists(data_path):
+        return False
+    if newer_than is not None and os.path.exists(newer_than):
+        return os.path.getmtime(data_path) >= os.path.getmtime(newer_than)
+    return True
@@ -0,0 +1,276 @@
+"""
+Excel数据读取模块
+
+该模块为原始Excel数据提供统一的读取接口，包括：
+- 使用快速引擎（python-calamine）以流式逐行模式读取xlsx，未安装时退回openpyxl只读模式
+- 将逐行读取的单元格值整理为与 pd.read_excel 一致的列类型（整数、浮点数、日期、字符串）
+- 按固定大小分块返回，峰值内存只与块大小相关
+- 首次读取后缓存一份带类型的Parquet副本，缓存以源文件内容哈希为键，
+  源文件修改时间和大小未变化时不重新计算哈希，之后的读取直接加载Parquet
+"""
+
+import os
+import sys
+import json
+import hashlib
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import pandas as pd
+
+# 添加项目根目录到系统路径，以便以脚本方式运行时导入src包
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from src.data.storage import default_format, read_frame, write_frame
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# 项目根目录
+PROJECT_ROOT = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), "../.."
+))
+
+# Excel转换缓存目录
+EXCEL_CACHE_DIR = os.path.join(PROJECT_ROOT, "data/cache/excel")
+
+# 缓存清单文件：源文件路径 -> 修改时间、大小和内容哈希
+_MANIFEST_NAME = "manifest.json"
+
+# 默认每个数据块的行数
+DEFAULT_CHUNK_SIZE = 50000
+
+# 计算文件哈希时每次读取的字节数
+_HASH_BLOCK_SIZE = 1 << 20
+
+
+def _iter_calamine_rows(file_path: str, sheet: Union[int, str]) -> Iterator[List[Any]]:
+    """使用python-calamine逐行读取工作表，空单元格返回None"""
+    from python_calamine import CalamineWorkbook
+
+    workbook = CalamineWorkbook.from_path(file_path)
+    if isinstance(sheet, int):
+        worksheet = workbook.get_sheet_by_index(sheet)
+    else:
+        worksheet = workbook.get_sheet_by_name(sheet)
+    for row in worksheet.iter_rows():
+        yield [None if value == "" else value for value in row]
+
+
+def _iter_openpyxl_rows(file_path: str, sheet: Union[int, str]) -> Iterator[List[Any]]:
+    """使用openpyxl只读流模式逐行读取工作表"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook.worksheets[sheet] if isinstance(sheet, int) else workbook[sheet]
+        for row in worksheet.iter_rows(values_only=True):
+            yield list(row)
+    finally:
+        workbook.close()
+
+
+def iter_excel_rows(file_path: str, sheet: Union[int, str] = 0) -> Iterator[List[Any]]:
+    """
+    流式逐行读取Excel工作表
+
+    Args:
+        file_path: Excel文件路径
+        sheet: 工作表序号或名称
+
+    Returns:
+        行迭代器（第一行为表头）
+    """
+    try:
+        import python_calamine  # noqa: F401
+    except ImportError:
+        logger.warning("未安装python-calamine，使用openpyxl读取Excel（较慢）: pip install python-calamine")
+        return _iter_openpyxl_rows(file_path, sheet)
+    return _iter_calamine_rows(file_path, sheet)
+
+
+def normalize_excel_types(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    整理逐行读取得到的列类型，与 pd.read_excel 的结果一致
+
+    - 取值均为整数的数值列（无缺失值）转换为int64，其余数值列为float64
+    - 日期和日期时间列转换为datetime64
+    - 同时包含数字和字符串的列统一转换为字符串，以便写入Parquet
+
+    Args:
+        df: 由单元格值构建的DataFrame
+
+    Returns:
+        整理类型后的DataFrame
+    """
+    df = df.infer_objects()
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_float_dtype(series):
+            if series.notna().all() and (series % 1 == 0).all():
+                df[col] = series.astype("int64")
+            continue
+        if series.dtype != object:
+            continue
+
+        values = series.dropna()
+        kinds = {type(value) for value in values}
+        if not kinds:
+            continue
+        if kinds <= {int, float, bool} and bool not in kinds:
+            df[col] = pd.to_numeric(series)
+        elif kinds <= {date, datetime, pd.Timestamp}:
+            df[col] = pd.to_datetime(series)
+        elif len(kinds) > 1:
+            df[col] = series.where(series.isna(), series.astype(str))
+    return df
+
+
+def iter_excel_chunks(
+    file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, sheet: Union[int, str] = 0
+) -> Iterator[pd.DataFrame]:
+    """
+    流式读取Excel文件并按块返回
+
+    Args:
+        file_path: Excel文件路径
+        chunk_size: 每个数据块的行数
+        sheet: 工作表序号或名称
+
+    Returns:
+        数据块迭代器
+    """
+    rows = iter_excel_rows(file_path, sheet)
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = [str(col) for col in header]
+
+    buffer = []
+    for row in rows:
+        buffer.append(row)
+        if len(buffer) >= chunk_size:
+            yield normalize_excel_types(pd.DataFrame.from_records(buffer, columns=columns))
+            buffer = []
+    if buffer:
+        yield normalize_excel_types(pd.DataFrame.from_records(buffer, columns=columns))
+
+
+def read_excel_frame(file_path: str, sheet: Union[int, str] = 0) -> pd.DataFrame:
+    """
+    使用快速引擎读取整个Excel工作表（不使用缓存）
+
+    Args:
+        file_path: Excel文件路径
+        sheet: 工作表序号或名称
+
+    Returns:
+        DataFrame
+    """
+    rows = iter_excel_rows(file_path, sheet)
+    header = next(rows, None)
+    if header is None:
+        return pd.DataFrame()
+    return normalize_excel_types(pd.DataFrame.from_records(list(rows), columns=[str(col) for col in header]))
+
+
+def file_hash(file_path: str) -> str:
+    """计算文件内容的SHA-256哈希"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _load_manifest(cache_dir: str) -> Dict[str, Dict[str, Any]]:
+    path = os.path.join(cache_dir, _MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        logger.warning(f"缓存清单无法读取，将重新建立: {path}")
+        return {}
+
+
+def _save_manifest(cache_dir: str, manifest: Dict[str, Dict[str, Any]]) -> None:
+    path = os.path.join(cache_dir, _MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _source_key(file_path: str, sheet: Union[int, str], manifest: Dict[str, Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+    """
+    源文件的缓存键：修改时间和大小与清单一致时沿用已记录的内容哈希，否则重新计算
+
+    Returns:
+        清单中的条目名和更新后的条目
+    """
+    stat = os.stat(file_path)
+    entry_name = f"{os.path.abspath(file_path)}::{sheet}"
+    entry = manifest.get(entry_name)
+    if entry and entry.get("mtime_ns") == stat.st_mtime_ns and entry.get("size") == stat.st_size:
+        return entry_name, entry
+
+    return entry_name, {
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": file_hash(file_path),
+    }
+
+
+def load_excel(
+    file_path: str, sheet: Union[int, str] = 0, cache_dir: Optional[str] = EXCEL_CACHE_DIR,
+    use_cache: bool = True
+) -> pd.DataFrame:
+    """
+    读取Excel文件，优先从带类型的Parquet缓存加载
+
+    Args:
+        file_path: Excel文件路径
+        sheet: 工作表序号或名称
+        cache_dir: 缓存目录
+        use_cache: 是否使用缓存
+
+    Returns:
+        DataFrame
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"文件不存在: {file_path}")
+
+    if not use_cache or cache_dir is None or default_format() != "parquet":
+        return read_excel_frame(file_path, sheet)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest = _load_manifest(cache_dir)
+    entry_name, entry = _source_key(file_path, sheet, manifest)
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    cache_path = os.path.join(cache_dir, f"{stem}_{sheet}_{entry['sha256'][:16]}.parquet")
+
+    if os.path.exists(cache_path):
+        logger.info(f"从缓存加载Excel数据: {cache_path}")
+        df = read_frame(cache_path)
+    else:
+        logger.info(f"读取Excel文件并写入缓存: {file_path}")
+        df = read_excel_frame(file_path, sheet)
+        write_frame(df, cache_path)
+        # 源文件内容已变化时删除旧的缓存文件
+        stale = (manifest.get(entry_name) or {}).get("cache_path")
+        in_use = {other.get("cache_path") for name, other in manifest.items() if name != entry_name}
+        if stale and stale != cache_path and stale not in in_use and os.path.exists(stale):
+            os.remove(stale)
+
+    entry["cache_path"] = cache_path
+    if manifest.get(entry_name) != entry:
+        manifest[entry_name] = entry
+        _save_manifest(cache_dir, manifest)
+    return df
@@ -0,0 +1,184 @@
+"""
+异常值截断模块
+
+该模块对数值列做向量化的异常值截断，包括：
+- 截断策略：sigma（均值±k倍标准差）、iqr（四分位数±k倍四分位距）、quantile（上下分位数）
+- 所有列的截断边界由单遍统计引擎一次计算
+- 数值列作为一个二维数组整体截断，同时统计每列的异常值数量
+- OutlierClipper：sklearn转换器，在训练集上学习截断边界，随预处理器保存，预测时使用同一边界
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+
+from src.data.profiling import StreamingStatistics, compute_statistics
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+CLIP_STRATEGIES = ("sigma", "iqr", "quantile")
+
+
+def compute_clip_bounds(
+    statistics: StreamingStatistics, columns: Sequence[str], strategy: str = "sigma",
+    n_sigma: float = 3.0, iqr_factor: float = 1.5, quantiles: Tuple[float, float] = (0.01, 0.99)
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    由统计结果计算各列的截断边界
+
+    Args:
+        statistics: 单遍统计结果
+        columns: 需要截断的数值列
+        strategy: 截断策略（sigma、iqr或quantile）
+        n_sigma: sigma策略的标准差倍数
+        iqr_factor: iqr策略的四分位距倍数
+        quantiles: quantile策略的下分位数和上分位数
+
+    Returns:
+        下边界数组和上边界数组
+    """
+    columns = list(columns)
+    if strategy == "sigma":
+        mean = statistics.mean[columns].to_numpy()
+        std = statistics.std()[columns].to_numpy()
+        lower, upper = mean - n_sigma * std, mean + n_sigma * std
+    elif strategy == "iqr":
+        q1, q3 = statistics.quantiles([0.25, 0.75])[columns].to_numpy()
+        iqr = q3 - q1
+        lower, upper = q1 - iqr_factor * iqr, q3 + iqr_factor * iqr
+    elif strategy == "quantile":
+        lower, upper = statistics.quantiles(list(quantiles))[columns].to_numpy()
+    else:
+        raise ValueError(f"不支持的截断策略: {strategy}，可选: {', '.join(CLIP_STRATEGIES)}")
+
+    # 统计量不可用（如整列缺失）时不截断
+    lower = np.where(np.isnan(lower), -np.inf, lower)
+    upper = np.where(np.isnan(upper), np.inf, upper)
+    return lower, upper
+
+
+def clip_array(values: np.ndarray, lower: np.ndarray, upper: np.ndarray) -> np.ndarray:
+    """
+    原地截断二维数组，返回每列的异常值数量
+
+    Args:
+        values: 二维浮点数组（原地修改）
+        lower: 每列的下边界
+        upper: 每列的上边界
+
+    Returns:
+        每列被截断的数值数量
+    """
+    below = values < lower
+    above = values > upper
+    counts = below.sum(axis=0) + above.sum(axis=0)
+    np.clip(values, lower, upper, out=values)
+    return counts
+
+
+def clip_outliers(
+    df: pd.DataFrame, columns: Sequence[str], strategy: str = "sigma", **kwargs: Any
+) -> pd.Series:
+    """
+    在DataFrame上计算截断边界并整体截断指定的数值列（原地修改）
+
+    Args:
+        df: 数据
+        columns: 需要截断的数值列
+        strategy: 截断策略（sigma、iqr或quantile）
+        **kwargs: 传给 compute_clip_bounds 的策略参数
+
+    Returns:
+        每列的异常值数量
+    """
+    columns = list(columns)
+    if not columns:
+        return pd.Series(dtype=np.int64)
+
+    values = df[columns].to_numpy(dtype=float, copy=True)
+    lower, upper = compute_clip_bounds(compute_statistics(df[columns]), columns, strategy, **kwargs)
+    counts = pd.Series(clip_array(values, lower, upper), index=columns)
+
+    # 只写回存在异常值的列，其他列保持原有类型
+    changed = counts.to_numpy() > 0
+    if changed.any():
+        df[counts.index[changed]] = values[:, changed]
+    return counts
+
+
+def log_outlier_counts(counts: pd.Series) -> None:
+    """记录每列的异常值数量"""
+    for col, count in counts[counts > 0].items():
+        logger.info(f"列 {col} 中发现 {count} 个异常值")
+
+
+class OutlierClipper(BaseEstimator, TransformerMixin):
+    """异常值截断转换器：在训练集上学习各列的截断边界，转换时使用同一边界"""
+
+    def __init__(
+        self, strategy: str = "quantile", n_sigma: float = 3.0,
+        iqr_factor: float = 1.5, quantiles: Tuple[float, float] = (0.01, 0.99)
+    ):
+        """
+        Args:
+            strategy: 截断策略（sigma、iqr或quantile）
+            n_sigma: sigma策略的标准差倍数
+            iqr_factor: iqr策略的四分位距倍数
+            quantiles: quantile策略的下分位数和上分位数
+        """
+        self.strategy = strategy
+        self.n_sigma = n_sigma
+        self.iqr_factor = iqr_factor
+        self.quantiles = quantiles
+
+    def _as_frame(self, X: Any) -> pd.DataFrame:
+        if isinstance(X, pd.DataFrame):
+            return X
+        return pd.DataFrame(np.asarray(X, dtype=float))
+
+    def fit(self, X: Any, y: Any = None) -> "OutlierClipper":
+        """在训练数据上学习截断边界，并统计训练数据中每列的异常值数量"""
+        frame = self._as_frame(X)
+        if isinstance(X, pd.DataFrame):
+            self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        self.n_features_in_ = frame.shape[1]
+
+        columns = list(frame.columns)
+        self.lower_, self.upper_ = compute_clip_bounds(
+            compute_statistics(frame), columns, self.strategy,
+            n_sigma=self.n_sigma, iqr_factor=self.iqr_factor, quantiles=tuple(self.quantiles)
+        )
+
+        values = frame.to_numpy(dtype=float)
+        below = values < self.lower_
+        above = values > self.upper_
+        self.outlier_counts_ = pd.Series(below.sum(axis=0) + above.sum(axis=0), index=columns)
+        log_outlier_counts(self.outlier_counts_)
+        return self
+
+    def transform(self, X: Any) -> np.ndarray:
+        """使用学习到的边界截断，缺失值保持不变"""
+        values = self._as_frame(X).to_numpy(dtype=float, copy=True)
+        np.clip(values, self.lower_, self.upper_, out=values)
+        return values
+
+    def get_feature_names_out(self, input_features: Optional[List[str]] = None) -> np.ndarray:
+        """截断不改变列"""
+        if input_features is not None:
+            return np.asarray(input_features, dtype=object)
+        if hasattr(self, "feature_names_in_"):
+            return self.feature_names_in_
+        return np.asarray([f"x{i}" for i in range(self.n_features_in_)], dtype=object)
+
+    def bounds(self) -> Dict[str, Tuple[float, float]]:
+        """各列的截断边界"""
+        names = self.get_feature_names_out()
+        return {str(name): (float(lo), float(hi)) for name, lo, hi in zip(names, self.lower_, self.upper_)}
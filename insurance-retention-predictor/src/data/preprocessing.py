@@ -10,17 +10,31 @@
 """
 
 import os
+import sys
 import logging
-from typing import Tuple, Dict, Any
+import argparse
+from typing import Tuple, Dict, Any, Optional, Union
 
 import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 from sklearn.impute import SimpleImputer
 
+# 添加项目根目录到系统路径，以便以脚本方式运行时导入src包
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from src.data.feature_store import save_feature_matrix, save_sparse_feature_matrix
+from src.data.outliers import OutlierClipper, clip_outliers, log_outlier_counts
+from src.data.profiling import DEFAULT_CHUNK_SIZE, compute_statistics, statistics_summary
+from src.data.schema import read_with_schema
+from src.data.storage import default_format, with_format, write_frame
+from src.data.transform_cache import TRANSFORM_CACHE_DIR, cache_key, load_entry, save_entry
+from src.features.creation import build_feature_transformers, find_date_columns
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -38,12 +52,13 @@ RAW_DATA_PATH = os.path.join(PROJECT_ROOT, "data/raw/insurance_data.csv")
 PROCESSED_DATA_DIR = os.path.join(PROJECT_ROOT, "data/processed")
 
 
-def load_data(file_path: str = RAW_DATA_PATH) -> pd.DataFrame:
+def load_data(file_path: str = RAW_DATA_PATH, refresh_schema: bool = False) -> pd.DataFrame:
     """
-    加载原始保险数据
+    加载原始保险数据，按保存的数据模式解析列类型（分类列为category，数值列降为最小安全位宽）
 
     Args:
         file_path: 原始数据文件路径
+        refresh_schema: 是否重新推断数据模式
 
     Returns:
         加载的数据DataFrame
@@ -51,7 +66,7 @@ def load_data(file_path: str = RAW_DATA_PATH) -> pd.DataFrame:
     logger.info(f"从 {file_path} 加载数据")
     
     try:
-        df = pd.read_csv(file_path)
+        df = read_with_schema(file_path, refresh=refresh_schema)
         logger.info(f"成功加载数据：{df.shape[0]} 行, {df.shape[1]} 列")
         return df
     except Exception as e:
@@ -59,41 +74,40 @@ def load_data(file_path: str = RAW_DATA_PATH) -> pd.DataFrame:
         raise
 
 
-def explore_data(df: pd.DataFrame) -> Dict[str, Any]:
+def explore_data(df: Union[pd.DataFrame, str], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
     """
-    探索数据基本信息
+    探索数据基本信息，一次遍历数据计算所有列的统计量
 
     Args:
-        df: 原始数据DataFrame
+        df: 原始数据DataFrame，或数据文件路径（按数据块只读取一次）
+        chunk_size: 每个数据块的行数
 
     Returns:
         包含数据统计信息的字典
     """
     logger.info("开始数据探索")
     
-    stats = {
-        "shape": df.shape,
-        "columns": list(df.columns),
-        "dtypes": df.dtypes.to_dict(),
-        "missing_values": df.isnull().sum().to_dict(),
-        "numerical_stats": df.describe().to_dict(),
-    }
+    statistics = compute_statistics(df, chunk_size, value_count_columns=["Renewed"])
+    stats = statistics_summary(statistics)
     
     # 检查目标变量分布
-    if "Renewed" in df.columns:
-        stats["target_distribution"] = df["Renewed"].value_counts().to_dict()
-        renewal_rate = df["Renewed"].mean() * 100
+    if "Renewed" in stats["columns"]:
+        stats["target_distribution"] = statistics.value_counts("Renewed").to_dict()
+        renewal_rate = statistics.mean["Renewed"] * 100
         logger.info(f"续保率: {renewal_rate:.2f}%")
     
     return stats
 
 
-def clean_data(df: pd.DataFrame) -> pd.DataFrame:
+def clean_data(df: pd.DataFrame, clip_strategy: Optional[str] = "sigma", **clip_params: Any) -> pd.DataFrame:
     """
     清洗数据：处理缺失值、异常值等
 
     Args:
         df: 原始数据DataFrame
+        clip_strategy: 异常值截断策略（sigma、iqr或quantile），为None时不截断
+            （改由预处理器中的 OutlierClipper 在训练集上学习截断边界）
+        **clip_params: 截断策略参数（n_sigma、iqr_factor、quantiles）
 
     Returns:
         清洗后的DataFrame
@@ -114,28 +128,13 @@ def clean_data(df: pd.DataFrame) -> pd.DataFrame:
     df_clean = df_clean.drop_duplicates()
     logger.info(f"删除空行和重复行后数据形状: {df_clean.shape}")
     
-    # 处理异常值（示例：将超过3个标准差的数值替换为截断值）
-    numeric_cols = df_clean.select_dtypes(include=["int64", "float64"]).columns
-    for col in numeric_cols:
-        if col == "CustomerID" or col == "Renewed":  # 跳过ID和目标变量
-            continue
-            
-        mean = df_clean[col].mean()
-        std = df_clean[col].std()
-        lower_bound = mean - 3 * std
-        upper_bound = mean + 3 * std
-        
-        # 记录异常值数量
-        outliers = ((df_clean[col] < lower_bound) | (df_clean[col] > upper_bound)).sum()
-        if outliers > 0:
-            logger.info(f"列 {col} 中发现 {outliers} 个异常值")
-            
-            # 截断异常值
-            df_clean[col] = np.where(
-                df_clean[col] < lower_bound,
-                lower_bound,
-                np.where(df_clean[col] > upper_bound, upper_bound, df_clean[col])
-            )
+    # 处理异常值：所有数值列的截断边界一次计算，整体截断
+    if clip_strategy is not None:
+        numeric_cols = [
+            col for col in df_clean.select_dtypes(include="number").columns
+            if col not in ("CustomerID", "Renewed")  # 跳过ID和目标变量
+        ]
+        log_outlier_counts(clip_outliers(df_clean, numeric_cols, clip_strategy, **clip_params))
     
     # 处理缺失值会在后续转换步骤中进行
     
@@ -154,9 +153,108 @@ def get_feature_names(column_transformer):
     return feature_names
 
 
-def preprocess_data(df: pd.DataFrame, test_size: float = 0.2, random_state: int = 42) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+def to_dense_frame(X: Any, feature_names: list) -> pd.DataFrame:
     """
-    预处理数据：特征转换、编码、缩放并划分训练集和测试集
+    将转换后的特征矩阵（稠密或稀疏）转换为带特征名称的稠密DataFrame
+
+    Args:
+        X: 特征矩阵
+        feature_names: 特征名称
+
+    Returns:
+        稠密DataFrame
+    """
+    if sp.issparse(X):
+        X = X.toarray()
+    return pd.DataFrame(X, columns=feature_names)
+
+
+def split_feature_types(X: pd.DataFrame) -> Tuple[list, list]:
+    """
+    识别数值特征和分类特征
+
+    Args:
+        X: 特征DataFrame
+
+    Returns:
+        数值特征列名列表和分类特征列名列表
+    """
+    numerical_features = X.select_dtypes(include="number").columns.tolist()
+    categorical_features = X.select_dtypes(include=["object", "category"]).columns.tolist()
+    return numerical_features, categorical_features
+
+
+def build_preprocessor(
+    numerical_features: list, categorical_features: list,
+    sparse: bool = False, categories: Any = "auto", clip_strategy: Optional[str] = None,
+    feature_transformers: Optional[list] = None
+) -> ColumnTransformer:
+    """
+    创建未拟合的预处理器：数值特征中位数填充并标准化，分类特征众数填充并独热编码，
+    衍生特征（日期成分、保留期、比率等）计算后同样填充并标准化
+
+    Args:
+        numerical_features: 数值特征列名
+        categorical_features: 分类特征列名
+        sparse: 稀疏模式，独热编码结果保持为稀疏矩阵
+        categories: 独热编码的类别，默认从数据中学习
+        clip_strategy: 异常值截断策略（sigma、iqr或quantile），设置时数值特征先按训练集学习的边界截断
+        feature_transformers: 特征创建转换器列表 (名称, 转换器, 输入列)，见 build_feature_transformers
+
+    Returns:
+        ColumnTransformer
+    """
+    numerical_steps = [
+        ("imputer", SimpleImputer(strategy="median")),
+        ("scaler", StandardScaler())
+    ]
+    if clip_strategy is not None:
+        numerical_steps.insert(0, ("clipper", OutlierClipper(strategy=clip_strategy)))
+    numerical_transformer = Pipeline(steps=numerical_steps)
+    
+    categorical_transformer = Pipeline(steps=[
+        ("imputer", SimpleImputer(strategy="most_frequent")),
+        ("onehot", OneHotEncoder(categories=categories, handle_unknown="ignore", sparse_output=sparse))
+    ])
+    
+    transformers = [
+        ("num", numerical_transformer, numerical_features),
+        ("cat", categorical_transformer, categorical_features)
+    ]
+    # 衍生特征放在原有特征之后，原有特征的列位置不变
+    for name, transformer, columns in feature_transformers or []:
+        transformers.append((name, Pipeline(steps=[
+            ("create", transformer),
+            ("imputer", SimpleImputer(strategy="median")),
+            ("scaler", StandardScaler())
+        ]), columns))
+    
+    # 稀疏模式下无论整体密度如何都输出稀疏矩阵
+    return ColumnTransformer(transformers=transformers, sparse_threshold=1.0 if sparse else 0.0)
+
+
+def feature_plan(X: pd.DataFrame) -> Tuple[list, list, list]:
+    """
+    确定预处理器的输入列：数值特征、分类特征和衍生特征转换器，日期列只用于创建衍生特征
+
+    Args:
+        X: 特征DataFrame
+
+    Returns:
+        数值特征列名、分类特征列名和衍生特征转换器列表
+    """
+    numerical_features, categorical_features = split_feature_types(X)
+    date_features = find_date_columns(X)
+    categorical_features = [col for col in categorical_features if col not in date_features]
+    feature_transformers = build_feature_transformers(X)
+    return numerical_features, categorical_features, feature_transformers
+
+
+def split_data(
+    df: pd.DataFrame, test_size: float = 0.2, random_state: int = 42
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.Series, pd.Series]:
+    """
+    分离特征和目标变量，按目标变量分层划分训练集和测试集
 
     Args:
         df: 清洗后的DataFrame
@@ -164,10 +262,8 @@ def preprocess_data(df: pd.DataFrame, test_size: float = 0.2, random_state: int
         random_state: 随机种子
 
     Returns:
-        训练特征、测试特征、训练标签、测试标签
+        训练特征、测试特征、训练标签和测试标签（未转换）
     """
-    logger.info("开始数据预处理")
-    
     if "Renewed" not in df.columns:
         raise ValueError("数据中缺少目标变量'Renewed'")
     
@@ -175,78 +271,163 @@ def preprocess_data(df: pd.DataFrame, test_size: float = 0.2, random_state: int
     X = df.drop(columns=["Renewed", "CustomerID"])
     y = df["Renewed"]
     
-    # 识别列类型
-    numerical_features = X.select_dtypes(include=["int64", "float64"]).columns.tolist()
-    categorical_features = X.select_dtypes(include=["object", "category"]).columns.tolist()
-    
-    logger.info(f"数值特征: {len(numerical_features)}, 分类特征: {len(categorical_features)}")
-    
-    # 创建预处理管道
-    numerical_transformer = Pipeline(steps=[
-        ("imputer", SimpleImputer(strategy="median")),
-        ("scaler", StandardScaler())
-    ])
-    
-    categorical_transformer = Pipeline(steps=[
-        ("imputer", SimpleImputer(strategy="most_frequent")),
-        ("onehot", OneHotEncoder(handle_unknown="ignore", sparse_output=False))
-    ])
-    
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ("num", numerical_transformer, numerical_features),
-            ("cat", categorical_transformer, categorical_features)
-        ]
-    )
-    
     # 划分训练集和测试集
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=test_size, random_state=random_state, stratify=y
     )
     
     logger.info(f"训练集大小: {X_train.shape}, 测试集大小: {X_test.shape}")
+    return X_train, X_test, y_train, y_test
+
+
+def fit_transform_features(
+    X_train: pd.DataFrame, X_test: pd.DataFrame, sparse: bool = False, clip_strategy: Optional[str] = None
+) -> Tuple[Any, Any, ColumnTransformer]:
+    """
+    在训练集上拟合预处理器，并转换训练集和测试集
+
+    Args:
+        X_train: 训练特征
+        X_test: 测试特征
+        sparse: 稀疏模式，独热编码结果保持为CSR矩阵
+        clip_strategy: 异常值截断策略
+
+    Returns:
+        转换后的训练特征、测试特征和预处理器；稀疏模式下特征为CSR矩阵，否则为带特征名称的DataFrame
+    """
+    numerical_features, categorical_features, feature_transformers = feature_plan(X_train)
+    
+    logger.info(
+        f"数值特征: {len(numerical_features)}, 分类特征: {len(categorical_features)}, "
+        f"衍生特征转换器: {len(feature_transformers)}"
+    )
+    
+    # 创建预处理管道
+    preprocessor = build_preprocessor(
+        numerical_features, categorical_features, sparse=sparse, clip_strategy=clip_strategy,
+        feature_transformers=feature_transformers
+    )
     
     # 应用预处理
     X_train_transformed = preprocessor.fit_transform(X_train)
     X_test_transformed = preprocessor.transform(X_test)
     
+    if sparse:
+        X_train_processed = sp.csr_matrix(X_train_transformed)
+        X_test_processed = sp.csr_matrix(X_test_transformed)
+        logger.info(f"稀疏模式：训练特征非零元素 {X_train_processed.nnz}，密度 {X_train_processed.nnz / max(np.prod(X_train_processed.shape), 1):.4f}")
+        return X_train_processed, X_test_processed, preprocessor
+    
     # 获取转换后的特征名称
     feature_names = get_feature_names(preprocessor)
     
     # 转换为DataFrame以保留特征名称
-    X_train_processed = pd.DataFrame(X_train_transformed, columns=feature_names)
-    X_test_processed = pd.DataFrame(X_test_transformed, columns=feature_names)
+    X_train_processed = to_dense_frame(X_train_transformed, feature_names)
+    X_test_processed = to_dense_frame(X_test_transformed, feature_names)
+    return X_train_processed, X_test_processed, preprocessor
+
+
+def preprocess_data(
+    df: pd.DataFrame, test_size: float = 0.2, random_state: int = 42, sparse: bool = False,
+    clip_strategy: Optional[str] = None, cache_dir: Optional[str] = TRANSFORM_CACHE_DIR
+) -> Tuple[Any, Any, pd.Series, pd.Series, ColumnTransformer]:
+    """
+    预处理数据：特征转换、编码、缩放并划分训练集和测试集
+
+    Args:
+        df: 清洗后的DataFrame
+        test_size: 测试集比例
+        random_state: 随机种子
+        sparse: 稀疏模式，独热编码结果保持为CSR矩阵，不转换为稠密DataFrame；
+            适用于高基数分类特征，需要稠密数据时调用 to_dense_frame 显式转换
+        clip_strategy: 异常值截断策略，设置时截断边界在训练集上学习并随预处理器保存，预测时复用
+        cache_dir: 预处理缓存目录，输入数据和预处理设置不变时直接返回缓存的预处理器和特征矩阵；
+            为None时不使用缓存
+
+    Returns:
+        训练特征、测试特征、训练标签、测试标签和预处理器；稀疏模式下特征为CSR矩阵
+    """
+    logger.info("开始数据预处理")
+    
+    if "Renewed" not in df.columns:
+        raise ValueError("数据中缺少目标变量'Renewed'")
+    
+    # 数据内容和预处理设置不变时跳过拟合和转换
+    key = None
+    if cache_dir is not None:
+        numerical_features, categorical_features, feature_transformers = feature_plan(
+            df.drop(columns=["Renewed", "CustomerID"])
+        )
+        key = cache_key(df, {
+            "numerical_features": numerical_features,
+            "categorical_features": categorical_features,
+            "feature_transformers": [
+                (name, type(transformer).__name__, transformer.get_params(), columns)
+                for name, transformer, columns in feature_transformers
+            ],
+            "test_size": test_size,
+            "random_state": random_state,
+            "sparse": sparse,
+            "clip_strategy": clip_strategy,
+        })
+        cached = load_entry(key, cache_dir)
+        if cached is not None:
+            logger.info(f"使用缓存的预处理结果: {key[:12]}")
+            return cached
+    
+    X_train, X_test, y_train, y_test = split_data(df, test_size, random_state)
+    X_train_processed, X_test_processed, preprocessor = fit_transform_features(
+        X_train, X_test, sparse=sparse, clip_strategy=clip_strategy
+    )
     
-    return X_train_processed, X_test_processed, y_train, y_test, preprocessor
+    result = (X_train_processed, X_test_processed, y_train, y_test, preprocessor)
+    if key is not None:
+        save_entry(key, result, cache_dir)
+    return result
 
 
 def save_processed_data(
-    X_train: pd.DataFrame, X_test: pd.DataFrame, 
+    X_train: Any, X_test: Any, 
     y_train: pd.Series, y_test: pd.Series,
     preprocessor: ColumnTransformer,
-    output_dir: str = PROCESSED_DATA_DIR
+    output_dir: str = PROCESSED_DATA_DIR,
+    fmt: Optional[str] = None
 ) -> None:
     """
     保存处理后的数据和预处理器
 
     Args:
-        X_train: 训练特征
-        X_test: 测试特征
+        X_train: 训练特征（DataFrame或稀疏矩阵）
+        X_test: 测试特征（DataFrame或稀疏矩阵）
         y_train: 训练标签
         y_test: 测试标签
         preprocessor: 列转换器
         output_dir: 输出目录
+        fmt: 存储格式（csv、parquet、feather或npz），默认安装了pyarrow时使用parquet
     """
-    logger.info(f"保存处理后的数据到 {output_dir}")
+    fmt = fmt or default_format()
+    logger.info(f"保存处理后的数据到 {output_dir}，格式: {fmt}")
     
     # 确保输出目录存在
     os.makedirs(output_dir, exist_ok=True)
     
-    # 保存处理后的数据
-    X_train.to_csv(os.path.join(output_dir, "X_train.csv"), index=False)
-    X_test.to_csv(os.path.join(output_dir, "X_test.csv"), index=False)
-    y_train.to_csv(os.path.join(output_dir, "y_train.csv"), index=False)
-    y_test.to_csv(os.path.join(output_dir, "y_test.csv"), index=False)
+    # 保存标签，列式格式保留数据类型
+    write_frame(y_train, with_format(os.path.join(output_dir, "y_train"), fmt))
+    write_frame(y_test, with_format(os.path.join(output_dir, "y_test"), fmt))
+    
+    if sp.issparse(X_train):
+        # 稀疏特征只保存为CSR矩阵，不生成稠密的表格文件
+        feature_names = get_feature_names(preprocessor)
+        save_sparse_feature_matrix(X_train, output_dir, "X_train", feature_names)
+        save_sparse_feature_matrix(X_test, output_dir, "X_test", feature_names)
+    else:
+        # 保存处理后的特征，列式格式保留数据类型和浮点精度
+        write_frame(X_train, with_format(os.path.join(output_dir, "X_train"), fmt))
+        write_frame(X_test, with_format(os.path.join(output_dir, "X_test"), fmt))
+        
+        # 同时保存float32内存映射特征矩阵，训练和交叉验证进程以零复制方式打开
+        save_feature_matrix(X_train, output_dir, "X_train")
+        save_feature_matrix(X_test, output_dir, "X_test")
     
     # 使用joblib保存预处理器
     import joblib
@@ -255,8 +436,16 @@ def save_processed_data(
     logger.info("处理后的数据和预处理器保存完成")
 
 
-def main():
-    """主函数：执行完整的数据预处理流程"""
+def main(sparse: bool = False, clip_strategy: Optional[str] = None, use_cache: bool = True):
+    """
+    主函数：执行完整的数据预处理流程
+
+    Args:
+        sparse: 是否使用稀疏模式（独热编码结果保持为CSR矩阵）
+        clip_strategy: 异常值截断策略，设置时截断放入预处理器（边界在训练集上学习），
+            清洗阶段不再截断；不设置时清洗阶段在全部数据上按3倍标准差截断
+        use_cache: 是否使用预处理缓存
+    """
     logger.info("开始保险数据预处理流程")
     
     # 检查原始数据文件是否存在
@@ -272,10 +461,16 @@ def main():
     logger.info(f"数据包含 {stats['shape'][0]} 行和 {stats['shape'][1]} 列")
     
     # 清洗数据
-    df_clean = clean_data(df)
+    if clip_strategy is None:
+        df_clean = clean_data(df)
+    else:
+        df_clean = clean_data(df, clip_strategy=None)
     
     # 预处理数据
-    X_train, X_test, y_train, y_test, preprocessor = preprocess_data(df_clean)
+    X_train, X_test, y_train, y_test, preprocessor = preprocess_data(
+        df_clean, sparse=sparse, clip_strategy=clip_strategy,
+        cache_dir=TRANSFORM_CACHE_DIR if use_cache else None
+    )
     
     # 保存处理后的数据
     save_processed_data(X_train, X_test, y_train, y_test, preprocessor)
@@ -284,4 +479,19 @@ def main():
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="保险数据预处理")
+    parser.add_argument(
+        "--sparse", action="store_true",
+        help="稀疏模式：独热编码结果保持为CSR矩阵，适用于高基数分类特征"
+    )
+    parser.add_argument(
+        "--clip-strategy", dest="clip_strategy", choices=["sigma", "iqr", "quantile"], default=None,
+        help="异常值截断策略：截断边界在训练集上学习并随预处理器保存，预测时使用同一边界"
+    )
+    parser.add_argument(
+        "--no-cache", dest="use_cache", action="store_false",
+        help="不使用预处理缓存，重新拟合预处理器"
+    )
+    
+    args = parser.parse_args()
+    main(sparse=args.sparse, clip_strategy=args.clip_strategy, use_cache=args.use_cache) 
\ No newline at end of file
@@ -0,0 +1,267 @@
+"""
+单遍数据统计模块
+
+该模块按数据块一次遍历数据，同时计算所有列的统计量，包括：
+- 每列的行数、缺失值数量
+- 数值列的计数、均值、方差（合并各数据块的均值和二阶中心矩）、最小值和最大值
+- 基于均匀随机抽样行的近似分位数（数据行数不超过样本大小时为精确值）
+- 分类列（以及指定的数值列，如目标变量）的取值计数和Top-K类别
+输入可以是内存中的DataFrame，也可以是CSV、Parquet或Feather文件（只读取一次）
+"""
+
+import os
+import sys
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到系统路径，以便以脚本方式运行时导入src包
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from src.data.storage import iter_frame_chunks
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# 默认每个数据块的行数
+DEFAULT_CHUNK_SIZE = 100000
+
+# 用于估计分位数的抽样行数
+DEFAULT_SAMPLE_SIZE = 100000
+
+# 每个分类列最多保留的类别数，超出时只保留计数最大的类别（近似Top-K）
+DEFAULT_MAX_CATEGORIES = 10000
+
+# describe() 输出的分位数
+DESCRIBE_PERCENTILES = (0.25, 0.5, 0.75)
+
+
+class StreamingStatistics:
+    """单遍统计引擎：每个数据块调用一次 update，所有列的统计量同时更新"""
+
+    def __init__(
+        self, sample_size: int = DEFAULT_SAMPLE_SIZE,
+        max_categories: Optional[int] = DEFAULT_MAX_CATEGORIES,
+        value_count_columns: Sequence[str] = (), random_state: int = 42
+    ):
+        """
+        Args:
+            sample_size: 用于估计分位数的抽样行数
+            max_categories: 每个分类列最多保留的类别数，为None时保留全部类别（精确计数）
+            value_count_columns: 额外统计取值计数的数值列（如目标变量）
+            random_state: 随机种子
+        """
+        self.sample_size = sample_size
+        self.max_categories = max_categories
+        self.value_count_columns = list(value_count_columns)
+        self.rng = np.random.default_rng(random_state)
+
+        self.columns: Optional[List[str]] = None
+        self.dtypes: Optional[pd.Series] = None
+        self.numerical_columns: List[str] = []
+        self.categorical_columns: List[str] = []
+        self.n_rows = 0
+
+    def _init_columns(self, chunk: pd.DataFrame) -> None:
+        """按第一个数据块确定列和列类型，并初始化统计量"""
+        self.columns = list(chunk.columns)
+        self.dtypes = chunk.dtypes
+        self.numerical_columns = chunk.select_dtypes(include="number").columns.tolist()
+        self.categorical_columns = [col for col in self.columns if col not in self.numerical_columns]
+
+        n_num = len(self.numerical_columns)
+        self.missing = pd.Series(0, index=self.columns, dtype=np.int64)
+        self.count = np.zeros(n_num)
+        self._mean = np.zeros(n_num)
+        self._m2 = np.zeros(n_num)
+        self._min = np.full(n_num, np.inf)
+        self._max = np.full(n_num, -np.inf)
+        # 每行一个随机键，保留随机键最小的 sample_size 行，即均匀随机抽样的行
+        self._sample = np.empty((0, n_num))
+        self._sample_keys = np.empty(0)
+
+        counted = self.categorical_columns + [
+            col for col in self.value_count_columns if col in self.numerical_columns
+        ]
+        self._value_counts = {col: pd.Series(dtype=np.int64) for col in counted}
+
+    def update(self, chunk: pd.DataFrame) -> "StreamingStatistics":
+        """
+        用一个数据块更新所有列的统计量
+
+        Args:
+            chunk: 数据块
+
+        Returns:
+            self
+        """
+        if self.columns is None:
+            self._init_columns(chunk)
+        if chunk.empty:
+            return self
+
+        self.missing = self.missing.add(chunk.isna().sum(), fill_value=0).astype(np.int64)
+
+        if self.numerical_columns:
+            values = chunk[self.numerical_columns].to_numpy(dtype=float)
+            present = ~np.isnan(values)
+            n_b = present.sum(axis=0)
+            filled = np.where(present, values, 0.0)
+
+            # 合并均值和二阶中心矩（Chan等人的并行算法），所有数值列同时计算
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean_b = np.where(n_b > 0, filled.sum(axis=0) / n_b, 0.0)
+                m2_b = (np.where(present, values - mean_b, 0.0) ** 2).sum(axis=0)
+                n_a = self.count
+                total = n_a + n_b
+                delta = mean_b - self._mean
+                weight = np.where(total > 0, n_b / total, 0.0)
+                self._mean = self._mean + delta * weight
+                self._m2 = self._m2 + m2_b + delta ** 2 * n_a * weight
+            self.count = total
+
+            self._min = np.minimum(self._min, np.where(present, values, np.inf).min(axis=0))
+            self._max = np.maximum(self._max, np.where(present, values, -np.inf).max(axis=0))
+
+            keys = np.concatenate([self._sample_keys, self.rng.random(len(values))])
+            sample = np.vstack([self._sample, values])
+            if len(keys) > self.sample_size:
+                keep = np.argpartition(keys, self.sample_size)[:self.sample_size]
+                keys, sample = keys[keep], sample[keep]
+            self._sample_keys, self._sample = keys, sample
+
+        for col, counts in self._value_counts.items():
+            chunk_counts = chunk[col].value_counts(dropna=True)
+            # category列的取值计数包含未出现的类别，只保留出现过的取值
+            counts = counts.add(chunk_counts[chunk_counts > 0], fill_value=0)
+            if self.max_categories is not None and len(counts) > self.max_categories:
+                counts = counts.nlargest(self.max_categories)
+            self._value_counts[col] = counts.astype(np.int64)
+
+        self.n_rows += len(chunk)
+        return self
+
+    def _series(self, values: np.ndarray) -> pd.Series:
+        return pd.Series(values, index=self.numerical_columns)
+
+    @property
+    def mean(self) -> pd.Series:
+        """数值列的均值"""
+        return self._series(np.where(self.count > 0, self._mean, np.nan))
+
+    def var(self, ddof: int = 1) -> pd.Series:
+        """数值列的方差，默认与pandas一致使用样本方差（ddof=1）"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self._series(np.where(self.count > ddof, self._m2 / (self.count - ddof), np.nan))
+
+    def std(self, ddof: int = 1) -> pd.Series:
+        """数值列的标准差"""
+        return np.sqrt(self.var(ddof))
+
+    @property
+    def min(self) -> pd.Series:
+        """数值列的最小值"""
+        return self._series(np.where(self.count > 0, self._min, np.nan))
+
+    @property
+    def max(self) -> pd.Series:
+        """数值列的最大值"""
+        return self._series(np.where(self.count > 0, self._max, np.nan))
+
+    def quantiles(self, qs: Sequence[float] = DESCRIBE_PERCENTILES) -> pd.DataFrame:
+        """
+        数值列的近似分位数
+
+        Args:
+            qs: 分位点（0到1之间）
+
+        Returns:
+            行为分位点、列为数值列的DataFrame
+        """
+        if len(self._sample) == 0:
+            values = np.full((len(qs), len(self.numerical_columns)), np.nan)
+        else:
+            with np.errstate(invalid="ignore"):
+                values = np.nanpercentile(self._sample, np.asarray(qs) * 100, axis=0)
+        return pd.DataFrame(values, index=list(qs), columns=self.numerical_columns)
+
+    def value_counts(self, col: str) -> pd.Series:
+        """列的取值计数（按计数降序）"""
+        return self._value_counts[col].sort_values(ascending=False)
+
+    def top_categories(self, col: str, k: int = 10) -> pd.Series:
+        """列中计数最大的 k 个取值"""
+        return self._value_counts[col].nlargest(k)
+
+    def describe(self) -> pd.DataFrame:
+        """与 DataFrame.describe() 格式一致的数值列统计表"""
+        quantiles = self.quantiles(DESCRIBE_PERCENTILES)
+        rows = {
+            "count": self._series(self.count),
+            "mean": self.mean,
+            "std": self.std(),
+            "min": self.min,
+        }
+        for q in DESCRIBE_PERCENTILES:
+            rows[f"{q * 100:g}%"] = quantiles.loc[q]
+        rows["max"] = self.max
+        return pd.DataFrame(rows).T
+
+
+def iter_chunks(data: Union[pd.DataFrame, str], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """按数据块遍历DataFrame或数据文件"""
+    if isinstance(data, pd.DataFrame):
+        for start in range(0, max(len(data), 1), chunk_size):
+            yield data.iloc[start:start + chunk_size]
+    else:
+        yield from iter_frame_chunks(data, chunk_size)
+
+
+def compute_statistics(
+    data: Union[pd.DataFrame, str], chunk_size: int = DEFAULT_CHUNK_SIZE, **kwargs: Any
+) -> StreamingStatistics:
+    """
+    一次遍历数据，计算所有列的统计量
+
+    Args:
+        data: DataFrame或数据文件路径
+        chunk_size: 每个数据块的行数
+        **kwargs: 传给 StreamingStatistics 的参数
+
+    Returns:
+        统计结果
+    """
+    statistics = StreamingStatistics(**kwargs)
+    for chunk in iter_chunks(data, chunk_size):
+        statistics.update(chunk)
+    return statistics
+
+
+def statistics_summary(statistics: StreamingStatistics, top_k: int = 10) -> Dict[str, Any]:
+    """
+    将统计结果整理为字典
+
+    Args:
+        statistics: 统计结果
+        top_k: 每个分类列输出的类别数
+
+    Returns:
+        包含形状、列类型、缺失值、数值统计和Top-K类别的字典
+    """
+    return {
+        "shape": (statistics.n_rows, len(statistics.columns or [])),
+        "columns": list(statistics.columns or []),
+        "dtypes": statistics.dtypes.to_dict() if statistics.dtypes is not None else {},
+        "missing_values": statistics.missing.to_dict() if statistics.columns else {},
+        "numerical_stats": statistics.describe().to_dict(),
+        "top_categories": {
+            col: statistics.top_categories(col, top_k).to_dict()
+            for col in statistics.categorical_columns
+        },
+    }
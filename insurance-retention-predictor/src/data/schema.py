@@ -0,0 +1,299 @@
+"""
+原始数据模式模块
+
+该模块为原始保单数据推断并保存列类型模式，读取时直接按模式解析，包括：
+- 低基数字符串列（如职业、地区、学历）保存为category类型
+- 整数列按取值范围降为最小的安全位宽（int8/int16/int32），浮点列在不损失精度时降为float32
+- 模式以JSON保存，之后的读取按模式解析，不再重新推断类型；数据超出模式范围时按实际数据放宽类型
+- 统计优化前后的内存占用
+"""
+
+import os
+import sys
+import json
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到系统路径，以便以脚本方式运行时导入src包
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from src.data.ingestion import load_excel
+from src.data.storage import detect_format, read_frame
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# 项目根目录
+PROJECT_ROOT = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), "../.."
+))
+
+# 模式保存目录
+SCHEMA_DIR = os.path.join(PROJECT_ROOT, "data/cache/schema")
+
+# 字符串列的唯一值数量不超过该比例（相对非缺失行数）时保存为category
+DEFAULT_MAX_CATEGORY_RATIO = 0.5
+
+# 字符串列的唯一值数量上限，超过时保持为字符串
+DEFAULT_MAX_CATEGORIES = 1000
+
+# 按位宽从小到大尝试的整数类型
+_INT_DTYPES = ("int8", "int16", "int32", "int64")
+
+
+def _smallest_int_dtype(values: pd.Series) -> str:
+    """能容纳取值范围的最小有符号整数类型"""
+    if values.empty:
+        return "int64"
+    low, high = values.min(), values.max()
+    for dtype in _INT_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return "int64"
+
+
+def _is_float32_safe(values: pd.Series) -> bool:
+    """浮点列转换为float32后取值不变"""
+    finite = values.dropna().to_numpy(dtype=np.float64)
+    with np.errstate(over="ignore"):
+        return bool(np.array_equal(finite.astype(np.float32).astype(np.float64), finite))
+
+
+def infer_column_dtype(
+    series: pd.Series, max_category_ratio: float = DEFAULT_MAX_CATEGORY_RATIO,
+    max_categories: int = DEFAULT_MAX_CATEGORIES
+) -> str:
+    """
+    推断单列的目标类型
+
+    Args:
+        series: 列数据
+        max_category_ratio: 唯一值比例上限
+        max_categories: 唯一值数量上限
+
+    Returns:
+        目标类型名称
+    """
+    if pd.api.types.is_bool_dtype(series):
+        return "bool"
+    if pd.api.types.is_integer_dtype(series):
+        return _smallest_int_dtype(series)
+    if pd.api.types.is_float_dtype(series):
+        return "float32" if _is_float32_safe(series) else "float64"
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return str(series.dtype)
+
+    values = series.dropna()
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return "category"
+    n_unique = values.nunique()
+    if n_unique <= max_categories and n_unique <= max(1, max_category_ratio * len(values)):
+        return "category"
+    return "object"
+
+
+def infer_schema(
+    df: pd.DataFrame, max_category_ratio: float = DEFAULT_MAX_CATEGORY_RATIO,
+    max_categories: int = DEFAULT_MAX_CATEGORIES
+) -> Dict[str, str]:
+    """
+    推断数据的列类型模式
+
+    Args:
+        df: 原始数据
+        max_category_ratio: 字符串列保存为category的唯一值比例上限
+        max_categories: 字符串列保存为category的唯一值数量上限
+
+    Returns:
+        列名到目标类型的映射（保持列顺序）
+    """
+    return {
+        str(col): infer_column_dtype(df[col], max_category_ratio, max_categories)
+        for col in df.columns
+    }
+
+
+def save_schema(schema: Dict[str, str], path: str) -> str:
+    """保存模式为JSON"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"columns": schema}, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def load_schema(path: str) -> Optional[Dict[str, str]]:
+    """加载模式，文件不存在或无法解析时返回None"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["columns"]
+    except (OSError, ValueError, KeyError):
+        logger.warning(f"模式文件无法读取，将重新推断: {path}")
+        return None
+
+
+def schema_path_for(file_path: str, schema_dir: str = SCHEMA_DIR) -> str:
+    """数据文件对应的模式文件路径"""
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(schema_dir, f"{stem}.schema.json")
+
+
+def apply_schema(df: pd.DataFrame, schema: Dict[str, str]) -> pd.DataFrame:
+    """
+    按模式转换列类型（原地修改并返回）
+
+    整数列取值超出模式位宽或出现缺失值、浮点列降为float32会损失精度时，
+    按实际数据选择类型并记录警告，不截断数据
+
+    Args:
+        df: 数据
+        schema: 列类型模式
+
+    Returns:
+        转换后的DataFrame
+    """
+    for col, dtype in schema.items():
+        if col not in df.columns or str(df[col].dtype) == dtype:
+            continue
+        series = df[col]
+
+        if dtype in _INT_DTYPES:
+            if pd.api.types.is_integer_dtype(series):
+                actual = _smallest_int_dtype(series)
+                if _INT_DTYPES.index(actual) > _INT_DTYPES.index(dtype):
+                    logger.warning(f"列 {col} 的取值超出模式类型 {dtype}，使用 {actual}")
+                    dtype = actual
+            else:
+                logger.warning(f"列 {col} 不再是整数列（{series.dtype}），保持原类型")
+                continue
+        elif dtype == "float32":
+            if not pd.api.types.is_numeric_dtype(series):
+                logger.warning(f"列 {col} 不再是数值列（{series.dtype}），保持原类型")
+                continue
+            if not _is_float32_safe(series):
+                dtype = "float64"
+        elif dtype == "float64" and not pd.api.types.is_numeric_dtype(series):
+            logger.warning(f"列 {col} 不再是数值列（{series.dtype}），保持原类型")
+            continue
+
+        df[col] = series.astype(dtype)
+    return df
+
+
+def _csv_read_dtypes(schema: Dict[str, str]) -> Dict[str, str]:
+    """读取CSV时直接解析的类型：分类列解析为category，避免先生成大量字符串对象"""
+    return {col: "category" for col, dtype in schema.items() if dtype == "category"}
+
+
+def estimate_object_memory(df: pd.DataFrame) -> int:
+    """
+    估计未优化时（字符串为object、数值为64位）的内存占用，单位字节
+
+    Args:
+        df: 已优化的数据
+
+    Returns:
+        估计的内存占用
+    """
+    total = int(df.index.memory_usage())
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # object列：每行一个指针，加上每个字符串对象的大小
+            counts = series.value_counts(dropna=True)
+            object_sizes = np.array([sys.getsizeof(value) for value in counts.index], dtype=np.int64)
+            total += 8 * len(series) + int((counts.to_numpy() * object_sizes).sum())
+        elif pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            total += 8 * len(series)
+        else:
+            total += int(series.memory_usage(index=False, deep=True))
+    return total
+
+
+def memory_report(df: pd.DataFrame, baseline_bytes: Optional[int] = None) -> Dict[str, float]:
+    """
+    统计优化前后的内存占用并记录日志
+
+    Args:
+        df: 已优化的数据
+        baseline_bytes: 优化前的内存占用，为None时按 estimate_object_memory 估计
+
+    Returns:
+        优化前后的内存占用（MB）和节省比例
+    """
+    if baseline_bytes is None:
+        baseline_bytes = estimate_object_memory(df)
+    optimized_bytes = int(df.memory_usage(deep=True).sum())
+    saved = baseline_bytes - optimized_bytes
+    report = {
+        "before_mb": baseline_bytes / 1024 ** 2,
+        "after_mb": optimized_bytes / 1024 ** 2,
+        "saved_mb": saved / 1024 ** 2,
+        "saved_pct": 100.0 * saved / baseline_bytes if baseline_bytes else 0.0,
+    }
+    logger.info(
+        f"内存占用: {report['before_mb']:.2f} MB -> {report['after_mb']:.2f} MB，"
+        f"节省 {report['saved_mb']:.2f} MB ({report['saved_pct']:.1f}%)"
+    )
+    return report
+
+
+def read_with_schema(
+    file_path: str, schema_path: Optional[str] = None, refresh: bool = False,
+    max_category_ratio: float = DEFAULT_MAX_CATEGORY_RATIO, max_categories: int = DEFAULT_MAX_CATEGORIES
+) -> pd.DataFrame:
+    """
+    按保存的模式读取原始数据，没有模式（或列已变化、要求刷新）时推断并保存模式
+
+    Args:
+        file_path: 数据文件路径（CSV、Parquet、Feather或Excel）
+        schema_path: 模式文件路径，默认按数据文件名保存在 SCHEMA_DIR
+        refresh: 是否重新推断模式
+        max_category_ratio: 字符串列保存为category的唯一值比例上限
+        max_categories: 字符串列保存为category的唯一值数量上限
+
+    Returns:
+        按模式转换类型后的DataFrame
+    """
+    schema_path = schema_path or schema_path_for(file_path)
+    schema = None if refresh else load_schema(schema_path)
+    is_csv = file_path.endswith(".csv")
+
+    if schema is not None:
+        df = _read_raw(file_path, _csv_read_dtypes(schema) if is_csv else None)
+        if list(df.columns) == list(schema):
+            df = apply_schema(df, schema)
+            memory_report(df)
+            return df
+        logger.info(f"数据列与保存的模式不一致，重新推断模式: {schema_path}")
+        if is_csv:
+            df = _read_raw(file_path)
+    else:
+        df = _read_raw(file_path)
+
+    baseline_bytes = int(df.memory_usage(deep=True).sum())
+    schema = infer_schema(df, max_category_ratio, max_categories)
+    save_schema(schema, schema_path)
+    logger.info(f"已推断并保存数据模式: {schema_path}")
+
+    df = apply_schema(df, schema)
+    memory_report(df, baseline_bytes)
+    return df
+
+
+def _read_raw(file_path: str, dtype: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """读取原始数据文件"""
+    if file_path.endswith(".xlsx"):
+        return load_excel(file_path)
+    if detect_format(file_path) == "csv":
+        return pd.read_csv(file_path, dtype=dtype)
+    return read_frame(file_path)
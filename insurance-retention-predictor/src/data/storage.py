@@ -0,0 +1,339 @@
+"""
+数据存储模块
+
+该模块为处理后的数据和预测结果提供统一的读写接口，包括：
+- 支持CSV、Parquet、Feather和压缩NumPy（.npz）格式，按文件扩展名自动识别
+- 列式格式保留数据类型和浮点精度，并支持只读取指定列
+- 分块读取和追加写入，用于大文件的流式处理
+- 在目录中自动查找同名数据集的最新文件，训练和预测无需指定格式
+"""
+
+import os
+import logging
+from typing import Any, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# 支持的格式及其文件扩展名
+FORMAT_EXTENSIONS = {
+    "csv": ".csv",
+    "parquet": ".parquet",
+    "feather": ".feather",
+    "npz": ".npz",
+}
+
+# npz文件中保存列名的键
+_NPZ_COLUMNS_KEY = "__columns__"
+
+
+def _require_pyarrow(fmt: str) -> None:
+    """检查列式格式所需的pyarrow是否可用"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError(f"{fmt}格式需要安装pyarrow: pip install pyarrow")
+
+
+def default_format() -> str:
+    """默认存储格式：安装了pyarrow时使用Parquet，否则使用CSV"""
+    try:
+        import pyarrow  # noqa: F401
+        return "parquet"
+    except ImportError:
+        return "csv"
+
+
+def detect_format(path: str) -> str:
+    """
+    根据文件扩展名识别存储格式
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        格式名称
+    """
+    ext = os.path.splitext(path)[1].lower()
+    for fmt, fmt_ext in FORMAT_EXTENSIONS.items():
+        if ext == fmt_ext:
+            return fmt
+    raise ValueError(f"不支持的文件格式: {path}")
+
+
+def with_format(path_without_ext: str, fmt: str) -> str:
+    """为不带扩展名的路径添加指定格式的扩展名"""
+    if fmt not in FORMAT_EXTENSIONS:
+        raise ValueError(f"不支持的存储格式: {fmt}，可选: {list(FORMAT_EXTENSIONS)}")
+    return path_without_ext + FORMAT_EXTENSIONS[fmt]
+
+
+def write_frame(data: Any, path: str) -> str:
+    """
+    按文件扩展名对应的格式写入DataFrame或Series
+
+    Args:
+        data: 要写入的DataFrame或Series
+        path: 输出文件路径
+
+    Returns:
+        输出文件路径
+    """
+    df = data.to_frame() if isinstance(data, pd.Series) else data
+    fmt = detect_format(path)
+
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+    elif fmt == "parquet":
+        _require_pyarrow(fmt)
+        df.to_parquet(path, index=False)
+    elif fmt == "feather":
+        _require_pyarrow(fmt)
+        df.reset_index(drop=True).to_feather(path)
+    else:
+        non_numeric = [col for col in df.columns if not pd.api.types.is_numeric_dtype(df[col])]
+        if non_numeric:
+            raise ValueError(f"npz格式只支持数值列，以下列不是数值类型: {non_numeric}")
+        # 每列单独保存，保留各列的数据类型，读取时可只加载需要的列
+        arrays = {f"col_{i}": df[col].to_numpy() for i, col in enumerate(df.columns)}
+        arrays[_NPZ_COLUMNS_KEY] = np.array([str(col) for col in df.columns])
+        np.savez_compressed(path, **arrays)
+
+    return path
+
+
+def frame_columns(path: str) -> List[str]:
+    """
+    读取文件中的列名，不加载数据
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        列名列表
+    """
+    fmt = detect_format(path)
+    if fmt == "csv":
+        return list(pd.read_csv(path, nrows=0).columns)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return list(pq.read_schema(path).names)
+    if fmt == "feather":
+        import pyarrow.ipc as ipc
+        with ipc.open_file(path) as reader:
+            return list(reader.schema.names)
+    with np.load(path) as npz:
+        return [str(col) for col in npz[_NPZ_COLUMNS_KEY]]
+
+
+def read_frame(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    按文件扩展名对应的格式读取DataFrame
+
+    Args:
+        path: 文件路径
+        columns: 只读取的列，默认读取全部列
+
+    Returns:
+        读取的DataFrame
+    """
+    fmt = detect_format(path)
+
+    if fmt == "csv":
+        return pd.read_csv(path, usecols=columns)
+    if fmt == "parquet":
+        _require_pyarrow(fmt)
+        return pd.read_parquet(path, columns=columns)
+    if fmt == "feather":
+        _require_pyarrow(fmt)
+        return pd.read_feather(path, columns=columns)
+
+    with np.load(path) as npz:
+        all_columns = [str(col) for col in npz[_NPZ_COLUMNS_KEY]]
+        selected = all_columns if columns is None else list(columns)
+        missing = [col for col in selected if col not in all_columns]
+        if missing:
+            raise KeyError(f"文件 {path} 中不存在列: {missing}")
+        return pd.DataFrame({col: npz[f"col_{all_columns.index(col)}"] for col in selected})
+
+
+def iter_frame_chunks(path: str, chunk_size: int, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    分块读取文件
+
+    Args:
+        path: 文件路径
+        chunk_size: 每个数据块的行数
+        columns: 只读取的列，默认读取全部列
+
+    Returns:
+        数据块迭代器
+    """
+    fmt = detect_format(path)
+
+    if fmt == "csv":
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=columns)
+    elif fmt == "parquet":
+        _require_pyarrow(fmt)
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    elif fmt == "feather":
+        # Feather按写入时的记录批次读取，每个批次通过内存映射按需加载
+        _require_pyarrow(fmt)
+        import pyarrow as pa
+        import pyarrow.ipc as ipc
+        with pa.memory_map(path) as source:
+            reader = ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                if columns is not None:
+                    batch = batch.select(columns)
+                for start in range(0, batch.num_rows, chunk_size):
+                    yield batch.slice(start, chunk_size).to_pandas()
+    else:
+        df = read_frame(path, columns)
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+
+
+class FrameWriter:
+    """
+    分块追加写入器，支持CSV和Parquet格式
+
+    分块读取的CSV各数据块的类型由pandas分别推断，同一列在不同数据块中的类型可能不同
+    （如前面的数据块中全为空值、后面出现字符串）。Parquet文件的模式在写入第一个数据块时确定，
+    后续数据块无法转换为该模式时，将不一致的列提升为兼容类型（整数与浮点数提升为浮点数，
+    其他类型提升为字符串），并按新模式重写已写入的内容。
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: 输出文件路径
+        """
+        self.path = path
+        self.format = detect_format(path)
+        if self.format not in ("csv", "parquet"):
+            raise ValueError(f"{self.format}格式不支持分块追加写入，请使用CSV或Parquet")
+        if self.format == "parquet":
+            _require_pyarrow(self.format)
+
+        self._parquet_writer = None
+        self._write_path = path
+        self._n_chunks = 0
+
+    def write(self, df: pd.DataFrame) -> None:
+        """追加写入一个数据块"""
+        if self.format == "csv":
+            df.to_csv(
+                self.path,
+                mode="w" if self._n_chunks == 0 else "a",
+                header=self._n_chunks == 0,
+                index=False
+            )
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self._write_path, table.schema)
+            elif not table.schema.equals(self._parquet_writer.schema):
+                try:
+                    table = table.cast(self._parquet_writer.schema)
+                except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                    table = self._promote(table)
+            self._parquet_writer.write_table(table)
+        self._n_chunks += 1
+
+    @staticmethod
+    def _promote_type(old_type: Any, new_type: Any) -> Any:
+        """两个数据块中同一列的兼容类型"""
+        import pyarrow as pa
+        if old_type == new_type or pa.types.is_null(new_type):
+            return old_type
+        if pa.types.is_null(old_type):
+            return new_type
+        numeric = (pa.types.is_integer, pa.types.is_floating)
+        if any(check(old_type) for check in numeric) and any(check(new_type) for check in numeric):
+            return pa.float64()
+        return pa.string()
+
+    def _promote(self, table: Any) -> Any:
+        """
+        将与当前模式不一致的列提升为兼容类型，按新模式重写已写入的内容
+
+        Args:
+            table: 无法转换为当前模式的数据块
+
+        Returns:
+            转换为新模式的数据块
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        schema = self._parquet_writer.schema
+        if table.schema.names != schema.names:
+            raise ValueError(f"数据块的列与已写入的列不一致: {table.schema.names} != {schema.names}")
+
+        # 提升后的模式不保留第一个数据块的pandas元数据，读取时按实际类型还原
+        promoted = pa.schema([
+            pa.field(field.name, self._promote_type(field.type, table.schema.field(field.name).type))
+            for field in schema
+        ])
+        changed = [name for name in schema.names if promoted.field(name).type != schema.field(name).type]
+        logger.warning(f"数据块的列类型与已写入的内容不一致，提升列类型并重写已写入的内容: {changed}")
+
+        # 已写入的内容按记录批次流式转换到新文件，内存占用与单个数据块相当
+        self._parquet_writer.close()
+        previous_path = self._write_path
+        self._write_path = f"{self.path}.promoted-{self._n_chunks:05d}"
+        self._parquet_writer = pq.ParquetWriter(self._write_path, promoted)
+        for batch in pq.ParquetFile(previous_path).iter_batches():
+            self._parquet_writer.write_table(pa.Table.from_batches([batch]).cast(promoted))
+        os.remove(previous_path)
+
+        return table.cast(promoted)
+
+    def close(self) -> None:
+        """完成写入"""
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+        if self._write_path != self.path:
+            os.replace(self._write_path, self.path)
+            self._write_path = self.path
+
+    def __enter__(self) -> "FrameWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def find_dataset(directory: str, name: str) -> Optional[str]:
+    """
+    在目录中查找指定名称的数据集文件，存在多种格式时返回最新的文件
+
+    Args:
+        directory: 数据目录
+        name: 不带扩展名的数据集名称
+
+    Returns:
+        数据集文件路径，未找到时返回None
+    """
+    candidates = [
+        with_format(os.path.join(directory, name), fmt)
+        for fmt in FORMAT_EXTENSIONS
+    ]
+    existing = [path for path in candidates if os.path.exists(path)]
+    if not existing:
+        return None
+    return max(existing, key=os.path.getmtime)
@@ -0,0 +1,347 @@
+"""
+流式数据预处理模块
+
+该模块在无法一次读入内存的数据上完成预处理，包括：
+- 按数据块读取原始数据（CSV、Parquet、Feather），每个数据块只在内存中停留一次
+- 按客户ID的哈希值划分训练集和测试集，划分结果与数据块大小和读取顺序无关
+- 一次遍历训练集拟合预处理统计量（单遍统计引擎）：数值特征和衍生特征的计数、均值和方差、
+  用于估计中位数的均匀随机样本，分类特征的取值计数
+- 与 preprocess_data 使用同一 feature_plan：日期列只用于衍生特征（日期成分、保留期、期限、比率），不做独热编码
+- 由统计量构建与 preprocess_data 结构相同的已拟合 ColumnTransformer，可直接用于推理管道
+- 按数据块转换训练集和测试集，逐块写入磁盘
+"""
+
+import os
+import sys
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.compose import ColumnTransformer
+
+# 添加项目根目录到系统路径，以便以脚本方式运行时导入src包
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from src.data.preprocessing import build_preprocessor, feature_plan, get_feature_names
+from src.data.profiling import DEFAULT_SAMPLE_SIZE, StreamingStatistics
+from src.data.storage import FrameWriter, iter_frame_chunks
+from src.features.creation import TenureTransformer
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# 默认每个数据块的行数
+DEFAULT_CHUNK_SIZE = 100000
+
+# 划分测试集时哈希值的分桶数
+_SPLIT_BUCKETS = 1000000
+
+# 流式统计保留期时的临时参考日期：保留期与参考日期呈线性关系，遍历结束后按训练集中最晚的日期平移
+_PROVISIONAL_REFERENCE_DATE = pd.Timestamp("1970-01-01")
+
+# 衍生特征在统计量中的列名前缀，避免与原始列重名
+_DERIVED_PREFIX = "__derived__"
+
+
+def iter_clean_chunks(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    分块读取原始数据，删除全为空的行和数据块内的重复行
+
+    Args:
+        file_path: 原始数据文件路径
+        chunk_size: 每个数据块的行数
+
+    Returns:
+        清洗后的数据块迭代器
+    """
+    for chunk in iter_frame_chunks(file_path, chunk_size):
+        yield chunk.dropna(how="all").drop_duplicates()
+
+
+def test_mask(chunk: pd.DataFrame, test_size: float = 0.2, random_state: int = 42) -> np.ndarray:
+    """
+    判断数据块中的每一行是否属于测试集
+
+    按客户ID的哈希值划分，同一客户始终落在同一侧，与数据块大小和读取顺序无关；
+    没有客户ID时按整行内容的哈希值划分
+
+    Args:
+        chunk: 数据块
+        test_size: 测试集比例
+        random_state: 随机种子，作为哈希键的一部分
+
+    Returns:
+        布尔数组，True表示测试集
+    """
+    hash_key = f"{random_state:016d}"[-16:]
+    if "CustomerID" in chunk.columns:
+        hashes = pd.util.hash_pandas_object(chunk["CustomerID"], index=False, hash_key=hash_key)
+    else:
+        hashes = pd.util.hash_pandas_object(chunk, index=False, hash_key=hash_key)
+    return (hashes.to_numpy() % _SPLIT_BUCKETS) < test_size * _SPLIT_BUCKETS
+
+
+class StreamingPreprocessorFitter:
+    """流式拟合预处理统计量，每个数据块调用一次 partial_fit"""
+
+    def __init__(self, sample_size: int = DEFAULT_SAMPLE_SIZE, random_state: int = 42):
+        """
+        Args:
+            sample_size: 用于估计中位数的抽样行数
+            random_state: 随机种子
+        """
+        # 独热编码需要完整的类别列表，分类列保留全部类别
+        self.statistics = StreamingStatistics(
+            sample_size=sample_size, max_categories=None, random_state=random_state
+        )
+        self.numerical_features: Optional[List[str]] = None
+        self.categorical_features: Optional[List[str]] = None
+        self.feature_transformers: List[Tuple[str, Any, List[str]]] = []
+        # 每个衍生特征转换器在数据块上计算取值用的已拟合副本，以及对应的统计列名
+        self._creators: List[Tuple[str, Any, List[str], List[str]]] = []
+        self.label_counts = pd.Series(dtype=float)
+
+    @property
+    def n_rows(self) -> int:
+        """已拟合的训练集行数"""
+        return self.statistics.n_rows
+
+    def partial_fit(self, X: pd.DataFrame, y: Optional[pd.Series] = None) -> "StreamingPreprocessorFitter":
+        """
+        用一个数据块更新统计量
+
+        Args:
+            X: 训练集特征数据块
+            y: 训练集标签数据块
+
+        Returns:
+            self
+        """
+        if self.numerical_features is None:
+            # 按第一个数据块确定列类型和衍生特征，与 preprocess_data 一致
+            self.numerical_features, self.categorical_features, self.feature_transformers = feature_plan(X)
+            self._init_creators(X)
+            logger.info(
+                f"数值特征: {len(self.numerical_features)}, 分类特征: {len(self.categorical_features)}, "
+                f"衍生特征转换器: {len(self.feature_transformers)}"
+            )
+
+        frames = [X[self.numerical_features + self.categorical_features]]
+        for _, creator, columns, stat_columns in self._creators:
+            frames.append(pd.DataFrame(
+                np.asarray(creator.transform(X[columns]), dtype=float), columns=stat_columns, index=X.index
+            ))
+        self.statistics.update(pd.concat(frames, axis=1))
+        if y is not None:
+            self.label_counts = self.label_counts.add(y.value_counts(), fill_value=0)
+        return self
+
+    def _init_creators(self, X: pd.DataFrame) -> None:
+        """
+        为每个衍生特征转换器准备在数据块上计算取值的副本
+
+        日期成分、期限和比率不依赖训练数据；保留期的参考日期默认是训练集中最晚的日期，
+        遍历时先以临时参考日期计算，构建预处理器时再平移
+        """
+        self._creators = []
+        for name, transformer, columns in self.feature_transformers:
+            creator = clone(transformer)
+            if isinstance(creator, TenureTransformer) and creator.reference_date is None:
+                creator.set_params(reference_date=str(_PROVISIONAL_REFERENCE_DATE.date()))
+            creator.fit(X[columns])
+            stat_columns = [f"{_DERIVED_PREFIX}{name}__{out}" for out in creator.get_feature_names_out()]
+            self._creators.append((name, creator, columns, stat_columns))
+
+    def _imputed_moments(
+        self, columns: List[str], offset: float = 0.0
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        以中位数填充缺失值后各列的中位数、均值、方差和行数
+
+        Args:
+            columns: 统计量中的数值列
+            offset: 加到所有取值上的常数（保留期的参考日期平移）
+
+        Returns:
+            中位数、均值、方差和行数
+        """
+        statistics = self.statistics
+        positions = [statistics.numerical_columns.index(col) for col in columns]
+        count = statistics.count[positions]
+        n_missing = statistics.missing[columns].to_numpy(dtype=float)
+        medians = statistics.quantiles([0.5]).loc[0.5, columns].to_numpy() + offset
+        column_mean = np.nan_to_num(statistics.mean[columns].to_numpy()) + offset
+        column_m2 = np.nan_to_num(statistics.var(ddof=0)[columns].to_numpy()) * count
+
+        # 缺失值以中位数填充后再标准化，均值和方差计入填充的取值
+        n_total = count + n_missing
+        mean = (count * column_mean + n_missing * medians) / n_total
+        m2 = column_m2 + count * (column_mean - mean) ** 2 + n_missing * (medians - mean) ** 2
+        return medians, mean, m2 / n_total, n_total
+
+    @staticmethod
+    def _set_imputer_and_scaler(pipeline: Any, moments: Tuple[np.ndarray, ...]) -> None:
+        """用全量统计量替换管道中中位数填充和标准化步骤学到的参数"""
+        medians, mean, var, n_total = moments
+        pipeline.named_steps["imputer"].statistics_ = medians
+        scaler = pipeline.named_steps["scaler"]
+        scaler.mean_ = mean
+        scaler.var_ = var
+        scaler.scale_ = np.where(var > 0, np.sqrt(var), 1.0)
+        scaler.n_samples_seen_ = n_total.astype(np.int64)
+
+    def build_preprocessor(self, prototype: pd.DataFrame) -> ColumnTransformer:
+        """
+        由统计量构建已拟合的预处理器
+
+        先在少量样本行上拟合与 preprocess_data 结构相同的 ColumnTransformer，
+        再用全量统计量替换各步骤学到的参数
+
+        Args:
+            prototype: 用于确定预处理器结构的样本行（如第一个数据块的训练集）
+
+        Returns:
+            已拟合的ColumnTransformer
+        """
+        if self.numerical_features is None or self.n_rows == 0:
+            raise ValueError("没有可用于拟合预处理器的训练数据")
+
+        statistics = self.statistics
+        categories = [
+            sorted(statistics.value_counts(col).index.tolist(), key=str) for col in self.categorical_features
+        ]
+        preprocessor = build_preprocessor(
+            self.numerical_features, self.categorical_features,
+            categories=categories if self.categorical_features else "auto",
+            feature_transformers=[
+                (name, clone(transformer), columns) for name, transformer, columns in self.feature_transformers
+            ]
+        )
+        preprocessor.fit(prototype)
+
+        if self.numerical_features:
+            self._set_imputer_and_scaler(
+                preprocessor.named_transformers_["num"], self._imputed_moments(self.numerical_features)
+            )
+
+        for name, _, _, stat_columns in self._creators:
+            pipeline = preprocessor.named_transformers_[name]
+            offset = 0.0
+            fitted_creator = pipeline.named_steps["create"]
+            if isinstance(fitted_creator, TenureTransformer) and fitted_creator.reference_date is None:
+                # 临时参考日期下的保留期为负的日期序号，最小值对应训练集中最晚的日期
+                earliest = statistics.min[stat_columns].min()
+                if pd.notna(earliest):
+                    offset = -float(earliest)
+                    fitted_creator.reference_date_ = _PROVISIONAL_REFERENCE_DATE + pd.Timedelta(days=offset)
+                else:
+                    offset = (fitted_creator.reference_date_ - _PROVISIONAL_REFERENCE_DATE) / pd.Timedelta(days=1)
+            self._set_imputer_and_scaler(pipeline, self._imputed_moments(stat_columns, offset))
+
+        if self.categorical_features:
+            modes = np.array(
+                [statistics.value_counts(col).index[0] for col in self.categorical_features], dtype=object
+            )
+            preprocessor.named_transformers_["cat"].named_steps["imputer"].statistics_ = modes
+
+        logger.info(f"流式拟合预处理器完成，训练集 {self.n_rows} 行")
+        return preprocessor
+
+
+def _split_features(chunk: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+    """分离特征和目标变量"""
+    if "Renewed" not in chunk.columns:
+        raise ValueError("数据中缺少目标变量'Renewed'")
+    X = chunk.drop(columns=["Renewed", "CustomerID"], errors="ignore")
+    return X, chunk["Renewed"]
+
+
+def fit_preprocessor_streaming(
+    file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, test_size: float = 0.2,
+    random_state: int = 42, sample_size: int = DEFAULT_SAMPLE_SIZE
+) -> Tuple[ColumnTransformer, Dict[str, Any]]:
+    """
+    一次遍历原始数据，在训练集上流式拟合预处理器
+
+    Args:
+        file_path: 原始数据文件路径
+        chunk_size: 每个数据块的行数
+        test_size: 测试集比例
+        random_state: 随机种子
+        sample_size: 每个数值特征用于估计中位数的样本大小
+
+    Returns:
+        已拟合的预处理器，以及训练集行数和标签分布
+    """
+    logger.info(f"流式拟合预处理器: {file_path}，数据块大小: {chunk_size}")
+    fitter = StreamingPreprocessorFitter(sample_size=sample_size, random_state=random_state)
+    prototype = None
+
+    for chunk in iter_clean_chunks(file_path, chunk_size):
+        train_chunk = chunk[~test_mask(chunk, test_size, random_state)]
+        if train_chunk.empty:
+            continue
+        X, y = _split_features(train_chunk)
+        fitter.partial_fit(X, y)
+        if prototype is None:
+            prototype = X
+
+    if prototype is None:
+        raise ValueError(f"数据文件中没有训练数据: {file_path}")
+
+    preprocessor = fitter.build_preprocessor(prototype)
+    summary = {
+        "n_train": fitter.n_rows,
+        "label_counts": {int(label): int(count) for label, count in fitter.label_counts.items()},
+    }
+    return preprocessor, summary
+
+
+def transform_streaming(
+    file_path: str, preprocessor: ColumnTransformer, train_path: str, test_path: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE, test_size: float = 0.2, random_state: int = 42
+) -> Dict[str, int]:
+    """
+    按数据块转换原始数据，训练集和测试集逐块写入磁盘（特征列之后为目标变量Renewed）
+
+    Args:
+        file_path: 原始数据文件路径
+        preprocessor: 已拟合的预处理器
+        train_path: 训练集输出路径（CSV或Parquet）
+        test_path: 测试集输出路径（CSV或Parquet）
+        chunk_size: 每个数据块的行数
+        test_size: 测试集比例
+        random_state: 随机种子，与拟合时一致
+
+    Returns:
+        训练集和测试集的行数
+    """
+    feature_names = list(get_feature_names(preprocessor))
+    counts = {"train": 0, "test": 0}
+
+    os.makedirs(os.path.dirname(os.path.abspath(train_path)), exist_ok=True)
+    os.makedirs(os.path.dirname(os.path.abspath(test_path)), exist_ok=True)
+    with FrameWriter(train_path) as train_writer, FrameWriter(test_path) as test_writer:
+        for chunk in iter_clean_chunks(file_path, chunk_size):
+            is_test = test_mask(chunk, test_size, random_state)
+            for split, writer, rows in (
+                ("train", train_writer, chunk[~is_test]), ("test", test_writer, chunk[is_test])
+            ):
+                if rows.empty:
+                    continue
+                X, y = _split_features(rows)
+                transformed = pd.DataFrame(
+                    np.asarray(preprocessor.transform(X), dtype=np.float32), columns=feature_names
+                )
+                transformed["Renewed"] = y.to_numpy()
+                writer.write(transformed)
+                counts[split] += len(transformed)
+
+    logger.info(f"流式转换完成，训练集 {counts['train']} 行，测试集 {counts['test']} 行")
+    return counts
@@ -0,0 +1,211 @@
+"""
+预处理结果缓存模块
+
+该模块按内容寻址缓存已拟合的预处理器和转换后的特征矩阵，数据和设置不变时跳过预处理，包括：
+- 缓存键由输入数据的内容哈希（列名、类型、索引和全部取值）与预处理设置
+  （数值/分类/衍生特征列、test_size、random_state等）共同计算，任一变化都会生成新的缓存项
+- 缓存项以joblib文件原子写入，命中时更新访问时间
+- 按访问时间淘汰超过保留天数的缓存项，并在总大小超过上限时淘汰最久未使用的缓存项
+- 为分析脚本中的sklearn Pipeline提供共享的 joblib.Memory，缓存已拟合的预处理步骤
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+import joblib
+import pandas as pd
+import sklearn
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# 项目根目录
+PROJECT_ROOT = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), "../.."
+))
+
+# 预处理缓存目录
+TRANSFORM_CACHE_DIR = os.path.join(PROJECT_ROOT, "data/cache/preprocess")
+
+# 缓存总大小上限（字节）
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+# 缓存项保留天数（按最近一次访问计算）
+DEFAULT_MAX_AGE_DAYS = 30
+
+# 缓存格式版本，预处理逻辑或缓存内容结构变化时递增，使旧缓存项失效
+CACHE_VERSION = 1
+
+# 缓存项文件扩展名
+_ENTRY_EXTENSION = ".joblib"
+
+
+def hash_frame(df: pd.DataFrame) -> str:
+    """
+    计算DataFrame的内容哈希，包括列名、列类型、索引和全部取值
+
+    Args:
+        df: 数据
+
+    Returns:
+        十六进制哈希字符串
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(col) for col in df.columns], ensure_ascii=False).encode("utf-8"))
+    digest.update(json.dumps([str(dtype) for dtype in df.dtypes]).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def cache_key(df: pd.DataFrame, params: Dict[str, Any]) -> str:
+    """
+    由输入数据和预处理设置计算缓存键
+
+    Args:
+        df: 输入数据
+        params: 预处理设置（列列表、test_size、random_state等，需可JSON序列化或可转为字符串）
+
+    Returns:
+        缓存键
+    """
+    payload = {
+        "version": CACHE_VERSION,
+        "sklearn": sklearn.__version__,
+        "data": hash_frame(df),
+        "params": params,
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _entry_path(key: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, f"{key}{_ENTRY_EXTENSION}")
+
+
+def load_entry(key: str, cache_dir: str = TRANSFORM_CACHE_DIR) -> Optional[Any]:
+    """
+    读取缓存项，命中时更新访问时间
+
+    Args:
+        key: 缓存键
+        cache_dir: 缓存目录
+
+    Returns:
+        缓存的对象，未命中或缓存项损坏时返回None
+    """
+    path = _entry_path(key, cache_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        value = joblib.load(path)
+    except Exception as e:
+        logger.warning(f"缓存项无法读取，已删除: {path} ({str(e)})")
+        os.remove(path)
+        return None
+    os.utime(path)
+    return value
+
+
+def save_entry(
+    key: str, value: Any, cache_dir: str = TRANSFORM_CACHE_DIR,
+    max_bytes: int = DEFAULT_MAX_BYTES, max_age_days: float = DEFAULT_MAX_AGE_DAYS
+) -> str:
+    """
+    原子写入缓存项，写入后淘汰过期和超出大小上限的缓存项
+
+    Args:
+        key: 缓存键
+        value: 要缓存的对象
+        cache_dir: 缓存目录
+        max_bytes: 缓存总大小上限
+        max_age_days: 缓存项保留天数
+
+    Returns:
+        缓存项路径
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _entry_path(key, cache_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(value, tmp_path)
+    os.replace(tmp_path, path)
+    evict(cache_dir, max_bytes=max_bytes, max_age_days=max_age_days, keep=key)
+    return path
+
+
+def evict(
+    cache_dir: str = TRANSFORM_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+    max_age_days: float = DEFAULT_MAX_AGE_DAYS, keep: Optional[str] = None
+) -> int:
+    """
+    淘汰缓存项：先删除超过保留天数未访问的缓存项，再按最久未使用的顺序删除，直到总大小不超过上限
+
+    Args:
+        cache_dir: 缓存目录
+        max_bytes: 缓存总大小上限
+        max_age_days: 缓存项保留天数
+        keep: 不淘汰的缓存键（如刚写入的缓存项）
+
+    Returns:
+        删除的缓存项数量
+    """
+    if not os.path.isdir(cache_dir):
+        return 0
+
+    entries = []
+    for filename in os.listdir(cache_dir):
+        if not filename.endswith(_ENTRY_EXTENSION):
+            continue
+        path = os.path.join(cache_dir, filename)
+        stat = os.stat(path)
+        entries.append((stat.st_mtime, stat.st_size, path, filename[:-len(_ENTRY_EXTENSION)]))
+
+    # 按最近访问时间从新到旧排列
+    entries.sort(reverse=True)
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    total = 0
+    for mtime, size, path, key in entries:
+        if key != keep and (mtime < cutoff or total + size > max_bytes):
+            os.remove(path)
+            removed += 1
+            continue
+        total += size
+
+    if removed:
+        logger.info(f"淘汰 {removed} 个预处理缓存项，剩余 {total / 1024 ** 2:.1f} MB")
+    return removed
+
+
+def transformer_memory(
+    cache_dir: str = TRANSFORM_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+    max_age_days: float = DEFAULT_MAX_AGE_DAYS
+) -> joblib.Memory:
+    """
+    sklearn Pipeline 的 memory 参数：缓存已拟合的预处理步骤，输入数据和步骤参数不变时直接复用
+
+    Args:
+        cache_dir: 缓存目录
+        max_bytes: 缓存总大小上限
+        max_age_days: 缓存项保留天数
+
+    Returns:
+        joblib.Memory
+    """
+    location = os.path.join(cache_dir, "pipeline")
+    memory = joblib.Memory(location, verbose=0)
+    try:
+        memory.reduce_size(bytes_limit=max_bytes, age_limit=timedelta(days=max_age_days))
+    except TypeError:
+        # 较早的joblib版本只支持在创建Memory时指定大小上限
+        memory = joblib.Memory(location, bytes_limit=max_bytes, verbose=0)
+        memory.reduce_size()
+    return memory
@@ -0,0 +1,203 @@
+"""
+批量预测结果摘要模块
+
+该模块在批量评分过程中逐块累计结果摘要，包括：
+- 总数、预测续保人数和续保率
+- 续保概率分布直方图
+- 存在实际标签（Renewed）时的混淆矩阵计数和评估指标
+- 摘要以JSON文件保存在结果文件旁，结果页面无需重新读取整个结果文件
+"""
+
+import os
+import json
+import logging
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.data.storage import frame_columns, iter_frame_chunks
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def summary_path(result_path: str) -> str:
+    """结果文件对应的摘要文件路径"""
+    return f"{result_path}.summary.json"
+
+
+class BatchSummary:
+    """批量预测结果摘要，内存占用与数据量无关"""
+
+    def __init__(self, threshold: float = 0.5, n_bins: int = 20, auc_bins: int = 1000):
+        """
+        Args:
+            threshold: 判定续保的概率阈值
+            n_bins: 概率分布直方图的分箱数
+            auc_bins: 计算ROC AUC时按类别统计的概率分箱数
+        """
+        self.threshold = threshold
+        self.n_bins = n_bins
+        self.auc_bins = auc_bins
+        self.model_version = None
+
+        self.total_count = 0
+        self.predicted_renewal_count = 0
+        self.histogram = np.zeros(n_bins, dtype=np.int64)
+
+        # 有实际标签时的统计
+        self.labeled_count = 0
+        self.confusion = {"tp": 0, "fp": 0, "tn": 0, "fn": 0}
+        self.positive_histogram = np.zeros(auc_bins, dtype=np.int64)
+        self.negative_histogram = np.zeros(auc_bins, dtype=np.int64)
+
+    def _bin_counts(self, probabilities: np.ndarray, n_bins: int) -> np.ndarray:
+        """按 [0, 1] 等宽分箱统计概率"""
+        indices = np.clip((probabilities * n_bins).astype(np.int64), 0, n_bins - 1)
+        return np.bincount(indices, minlength=n_bins)
+
+    def update(
+        self, probabilities: Any, predicted: Any, actual: Optional[Any] = None
+    ) -> None:
+        """
+        累计一个数据块的预测结果
+
+        Args:
+            probabilities: 续保概率
+            predicted: 预测标签
+            actual: 实际标签（如有）
+        """
+        probabilities = np.asarray(probabilities, dtype=float)
+        predicted = np.asarray(predicted).astype(bool)
+
+        self.total_count += len(probabilities)
+        self.predicted_renewal_count += int(predicted.sum())
+        self.histogram += self._bin_counts(probabilities, self.n_bins)
+
+        if actual is None:
+            return
+
+        actual = pd.to_numeric(pd.Series(actual), errors="coerce").to_numpy()
+        labeled = ~np.isnan(actual)
+        if not labeled.any():
+            return
+
+        actual = actual[labeled].astype(bool)
+        predicted = predicted[labeled]
+        probabilities = probabilities[labeled]
+
+        self.labeled_count += int(labeled.sum())
+        self.confusion["tp"] += int((actual & predicted).sum())
+        self.confusion["fp"] += int((~actual & predicted).sum())
+        self.confusion["tn"] += int((~actual & ~predicted).sum())
+        self.confusion["fn"] += int((actual & ~predicted).sum())
+        self.positive_histogram += self._bin_counts(probabilities[actual], self.auc_bins)
+        self.negative_histogram += self._bin_counts(probabilities[~actual], self.auc_bins)
+
+    def _roc_auc(self) -> Optional[float]:
+        """根据按类别统计的概率分箱计算ROC AUC（同一分箱内按平局处理）"""
+        n_pos = self.positive_histogram.sum()
+        n_neg = self.negative_histogram.sum()
+        if n_pos == 0 or n_neg == 0:
+            return None
+
+        negatives_below = np.cumsum(self.negative_histogram) - self.negative_histogram
+        wins = self.positive_histogram * (negatives_below + 0.5 * self.negative_histogram)
+        return float(wins.sum() / (n_pos * n_neg))
+
+    def metrics(self) -> Optional[Dict[str, Optional[float]]]:
+        """
+        根据混淆矩阵计数计算评估指标
+
+        Returns:
+            评估指标字典，没有实际标签时返回None
+        """
+        if self.labeled_count == 0:
+            return None
+
+        tp, fp, tn, fn = (self.confusion[k] for k in ("tp", "fp", "tn", "fn"))
+        precision = tp / (tp + fp) if tp + fp > 0 else 0.0
+        recall = tp / (tp + fn) if tp + fn > 0 else 0.0
+        return {
+            "accuracy": (tp + tn) / self.labeled_count,
+            "precision": precision,
+            "recall": recall,
+            "f1": 2 * precision * recall / (precision + recall) if precision + recall > 0 else 0.0,
+            "roc_auc": self._roc_auc(),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化的字典"""
+        return {
+            "model_version": self.model_version,
+            "threshold": self.threshold,
+            "total_count": self.total_count,
+            "predicted_renewal_count": self.predicted_renewal_count,
+            "predicted_renewal_rate": (
+                self.predicted_renewal_count / self.total_count * 100 if self.total_count else 0.0
+            ),
+            "bin_edges": np.linspace(0, 1, self.n_bins + 1).tolist(),
+            "histogram": self.histogram.tolist(),
+            "labeled_count": self.labeled_count,
+            "confusion": self.confusion,
+            "metrics": self.metrics(),
+        }
+
+    def save(self, path: str) -> None:
+        """
+        保存摘要到JSON文件
+
+        Args:
+            path: 摘要文件路径
+        """
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, ensure_ascii=False)
+        logger.info(f"保存批量预测摘要到 {path}")
+
+
+def load_summary(path: str) -> Optional[Dict[str, Any]]:
+    """
+    读取摘要文件
+
+    Args:
+        path: 摘要文件路径
+
+    Returns:
+        摘要字典，文件不存在时返回None
+    """
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def summarize_result_file(result_path: str, threshold: float = 0.5, chunk_size: int = 50000) -> BatchSummary:
+    """
+    分块读取已有的结果文件生成摘要（用于没有摘要文件的历史结果）
+
+    Args:
+        result_path: 结果文件路径
+        threshold: 判定续保的概率阈值
+        chunk_size: 每个数据块的行数
+
+    Returns:
+        结果摘要
+    """
+    # 只读取生成摘要需要的列
+    columns = ["RenewalProbability", "PredictedRenewal"]
+    if "Renewed" in frame_columns(result_path):
+        columns.append("Renewed")
+
+    summary = BatchSummary(threshold=threshold)
+    for chunk in iter_frame_chunks(result_path, chunk_size, columns):
+        summary.update(
+            chunk["RenewalProbability"], chunk["PredictedRenewal"],
+            chunk["Renewed"] if "Renewed" in chunk.columns else None
+        )
+    return summary
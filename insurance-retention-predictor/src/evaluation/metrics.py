@@ -0,0 +1,167 @@
+"""
+模型评估指标模块
+
+该模块负责计算分类模型的评估指标，包括：
+- 根据真实标签、预测标签和预测概率计算各项分类指标
+- 每个模型对同一数据集只推理一次，预测标签由概率和可配置的阈值得到
+- 按模型和数据集指纹缓存预测概率和评估结果，重复评估同一模型时不再推理
+"""
+
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+import joblib
+import numpy as np
+from sklearn.metrics import (
+    accuracy_score, precision_score, recall_score, f1_score,
+    roc_auc_score, average_precision_score
+)
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def classification_metrics(
+    y_true: np.ndarray, y_pred: np.ndarray, y_prob: np.ndarray = None
+) -> Dict[str, float]:
+    """
+    计算分类模型的性能指标
+
+    Args:
+        y_true: 真实标签
+        y_pred: 预测标签
+        y_prob: 预测概率（如有）
+
+    Returns:
+        包含各种指标的字典
+    """
+    metrics = {
+        "accuracy": accuracy_score(y_true, y_pred),
+        "precision": precision_score(y_true, y_pred, zero_division=0),
+        "recall": recall_score(y_true, y_pred, zero_division=0),
+        "f1": f1_score(y_true, y_pred, zero_division=0),
+    }
+    if y_prob is not None:
+        metrics["roc_auc"] = roc_auc_score(y_true, y_prob)
+        metrics["avg_precision"] = average_precision_score(y_true, y_prob)
+    return metrics
+
+
+def predict_scores(model: Any, X: Any) -> np.ndarray:
+    """
+    对数据集推理一次，得到正类（续保）概率
+
+    Args:
+        model: 训练好的模型
+        X: 特征矩阵
+
+    Returns:
+        正类概率数组
+    """
+    if hasattr(model, "predict_proba"):
+        return np.asarray(model.predict_proba(X))[:, 1]
+    return np.asarray(model.predict(X), dtype=float)
+
+
+class ModelEvaluator:
+    """模型评估器：每个模型对每个数据集只推理一次，并缓存评估结果"""
+
+    def __init__(self, threshold: float = 0.5):
+        """
+        Args:
+            threshold: 判定续保的概率阈值
+        """
+        self.threshold = threshold
+        self._scores: Dict[Tuple[str, str], np.ndarray] = {}
+        self._metrics: Dict[Tuple[str, str, float], Dict[str, float]] = {}
+        # 数据集对象 -> 指纹，同一对象只计算一次指纹
+        self._data_fingerprints: Dict[int, Tuple[Any, str]] = {}
+        # 模型对象 -> (模型, 属性快照, 指纹)，不序列化模型
+        self._model_fingerprints: Dict[int, Tuple[Any, Dict[str, Any], str]] = {}
+        self._model_versions = 0
+
+    def _model_fingerprint(self, model: Any) -> str:
+        """
+        模型指纹：由对象标识和状态版本组成，不序列化模型
+
+        快照保存模型各属性当前引用的对象（同时保持这些对象存活，标识不会被复用），
+        重新训练或修改参数会给属性赋新对象，此时分配新的状态版本
+        """
+        state = dict(vars(model)) if hasattr(model, "__dict__") else {}
+        cached = self._model_fingerprints.get(id(model))
+        if (
+            cached is not None and cached[0] is model and cached[1].keys() == state.keys()
+            and all(cached[1][name] is value for name, value in state.items())
+        ):
+            return cached[2]
+
+        self._model_versions += 1
+        fingerprint = f"{type(model).__name__}:{id(model)}:{self._model_versions}"
+        self._model_fingerprints[id(model)] = (model, state, fingerprint)
+        return fingerprint
+
+    def _data_fingerprint(self, X: Any) -> str:
+        """数据集指纹，按对象缓存"""
+        cached = self._data_fingerprints.get(id(X))
+        if cached is not None and cached[0] is X:
+            return cached[1]
+
+        fingerprint = joblib.hash(X)
+        self._data_fingerprints[id(X)] = (X, fingerprint)
+        return fingerprint
+
+    def scores(self, model: Any, X: Any) -> np.ndarray:
+        """
+        获取模型在数据集上的正类概率，已缓存时不再推理
+
+        Args:
+            model: 训练好的模型
+            X: 特征矩阵
+
+        Returns:
+            正类概率数组
+        """
+        return self._cached_scores(self._model_fingerprint(model), model, X)
+
+    def _cached_scores(self, model_key: str, model: Any, X: Any) -> np.ndarray:
+        """按模型指纹和数据集指纹缓存正类概率"""
+        key = (model_key, self._data_fingerprint(X))
+        scores = self._scores.get(key)
+        if scores is None:
+            scores = predict_scores(model, X)
+            self._scores[key] = scores
+        return scores
+
+    def evaluate(
+        self, model: Any, X: Any, y: Any, threshold: Optional[float] = None
+    ) -> Dict[str, float]:
+        """
+        评估模型，评估结果按模型、数据集指纹和阈值缓存
+
+        Args:
+            model: 训练好的模型
+            X: 特征矩阵
+            y: 真实标签
+            threshold: 判定续保的概率阈值，默认使用评估器的阈值
+
+        Returns:
+            评估指标字典
+        """
+        threshold = self.threshold if threshold is None else threshold
+        model_key = self._model_fingerprint(model)
+        key = (model_key, f"{self._data_fingerprint(X)}:{self._data_fingerprint(y)}", threshold)
+
+        metrics = self._metrics.get(key)
+        if metrics is not None:
+            logger.info(f"使用缓存的评估结果: {type(model).__name__}")
+            return metrics
+
+        scores = self._cached_scores(model_key, model, X)
+        y_pred = (scores >= threshold).astype(int)
+        metrics = classification_metrics(np.asarray(y), y_pred, scores)
+        self._metrics[key] = metrics
+        return metrics
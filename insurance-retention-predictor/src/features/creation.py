@@ -0,0 +1,275 @@
+"""
+特征创建模块
+
+该模块提供sklearn兼容的向量化特征转换器，作为预处理器的一部分随推理管道保存，
+训练、批量评分和Web应用单条预测使用同一套特征计算，包括：
+- DatePartsTransformer：从日期列提取年、月等日期成分
+- TenureTransformer：客户保留期（参考日期与起始日期之间的天数），参考日期在训练时确定
+- DurationTransformer：两个日期列之间的间隔天数（如保单期限）
+- RatioTransformer：比率特征（如保费/家庭成员数），分母为0时为缺失值
+- build_feature_transformers：按数据中实际存在的列生成要加入ColumnTransformer的特征转换器
+- create_features / create_time_features：在DataFrame上直接添加同名特征，供分析脚本使用
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# 默认提取的日期成分
+DEFAULT_DATE_PARTS = ("year", "month")
+
+# 支持的日期成分
+_DATE_PARTS = ("year", "month", "day", "dayofweek", "quarter", "dayofyear")
+
+# 保单数据的默认特征定义：只对数据中实际存在的列生效
+DEFAULT_FEATURE_SPEC: Dict[str, Any] = {
+    # 按名称识别的日期列（字符串日期也会解析），datetime64类型的列自动识别
+    "date_columns": ["policy_start_date", "policy_end_date"],
+    "date_parts": list(DEFAULT_DATE_PARTS),
+    # 保留期：参考日期与起始日期之间的天数
+    "tenure_columns": ["policy_start_date"],
+    # 保单期限：起始日期到结束日期的天数
+    "durations": [("policy_start_date", "policy_end_date")],
+    # 比率特征：分子 / 分母
+    "ratios": [("premium_amount", "family_members"), ("premium_amount", "age")],
+}
+
+
+def _to_datetime_frame(X: Any, columns: Sequence[str]) -> pd.DataFrame:
+    """将输入转换为日期类型的DataFrame，无法解析的值为缺失值"""
+    frame = X if isinstance(X, pd.DataFrame) else pd.DataFrame(X, columns=list(columns))
+    return frame.apply(lambda col: pd.to_datetime(col, errors="coerce"))
+
+
+def _to_numeric_frame(X: Any, columns: Sequence[str]) -> pd.DataFrame:
+    """将输入转换为数值类型的DataFrame，无法解析的值为缺失值"""
+    frame = X if isinstance(X, pd.DataFrame) else pd.DataFrame(X, columns=list(columns))
+    return frame.apply(lambda col: pd.to_numeric(col, errors="coerce"))
+
+
+class _FeatureTransformer(BaseEstimator, TransformerMixin):
+    """特征转换器基类：记录输入列名，输出特征名由子类给出"""
+
+    def _record_input(self, X: Any) -> None:
+        if isinstance(X, pd.DataFrame):
+            self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        self.n_features_in_ = X.shape[1]
+
+    def _input_columns(self, input_features: Optional[Sequence[str]] = None) -> List[str]:
+        if input_features is not None:
+            return [str(col) for col in input_features]
+        if hasattr(self, "feature_names_in_"):
+            return [str(col) for col in self.feature_names_in_]
+        return [f"x{i}" for i in range(self.n_features_in_)]
+
+    def _output_names(self, columns: List[str]) -> List[str]:
+        raise NotImplementedError
+
+    def get_feature_names_out(self, input_features: Optional[Sequence[str]] = None) -> np.ndarray:
+        """输出特征名"""
+        return np.asarray(self._output_names(self._input_columns(input_features)), dtype=object)
+
+
+class DatePartsTransformer(_FeatureTransformer):
+    """从日期列提取日期成分，输出列名为 <日期列>_<成分>"""
+
+    def __init__(self, parts: Sequence[str] = DEFAULT_DATE_PARTS):
+        """
+        Args:
+            parts: 日期成分（year、month、day、dayofweek、quarter、dayofyear）
+        """
+        self.parts = parts
+
+    def fit(self, X: Any, y: Any = None) -> "DatePartsTransformer":
+        unknown = [part for part in self.parts if part not in _DATE_PARTS]
+        if unknown:
+            raise ValueError(f"不支持的日期成分: {unknown}，可选: {', '.join(_DATE_PARTS)}")
+        self._record_input(X)
+        return self
+
+    def transform(self, X: Any) -> np.ndarray:
+        dates = _to_datetime_frame(X, self._input_columns())
+        blocks = [
+            getattr(dates[col].dt, part).to_numpy(dtype=float, na_value=np.nan)
+            for col in dates.columns for part in self.parts
+        ]
+        return np.column_stack(blocks) if blocks else np.empty((len(dates), 0))
+
+    def _output_names(self, columns: List[str]) -> List[str]:
+        return [f"{col}_{part}" for col in columns for part in self.parts]
+
+
+class TenureTransformer(_FeatureTransformer):
+    """客户保留期：参考日期与每个起始日期列之间的天数，输出列名为 <日期列>_tenure_days"""
+
+    def __init__(self, reference_date: Optional[str] = None):
+        """
+        Args:
+            reference_date: 参考日期，为None时使用训练数据中最晚的日期，
+                保证训练和预测使用同一参考日期
+        """
+        self.reference_date = reference_date
+
+    def fit(self, X: Any, y: Any = None) -> "TenureTransformer":
+        self._record_input(X)
+        if self.reference_date is not None:
+            self.reference_date_ = pd.Timestamp(self.reference_date)
+        else:
+            latest = _to_datetime_frame(X, self._input_columns()).max().max()
+            self.reference_date_ = latest if pd.notna(latest) else pd.Timestamp.now().normalize()
+        return self
+
+    def transform(self, X: Any) -> np.ndarray:
+        dates = _to_datetime_frame(X, self._input_columns())
+        days = (self.reference_date_ - dates) / pd.Timedelta(days=1)
+        return days.to_numpy(dtype=float, na_value=np.nan)
+
+    def _output_names(self, columns: List[str]) -> List[str]:
+        return [f"{col}_tenure_days" for col in columns]
+
+
+class DurationTransformer(_FeatureTransformer):
+    """两个日期列之间的间隔天数，输入为 [起始日期, 结束日期] 两列，输出列名为 <起始>_to_<结束>_days"""
+
+    def fit(self, X: Any, y: Any = None) -> "DurationTransformer":
+        if X.shape[1] != 2:
+            raise ValueError(f"DurationTransformer需要起始日期和结束日期两列，实际为 {X.shape[1]} 列")
+        self._record_input(X)
+        return self
+
+    def transform(self, X: Any) -> np.ndarray:
+        dates = _to_datetime_frame(X, self._input_columns())
+        days = (dates.iloc[:, 1] - dates.iloc[:, 0]) / pd.Timedelta(days=1)
+        return days.to_numpy(dtype=float, na_value=np.nan).reshape(-1, 1)
+
+    def _output_names(self, columns: List[str]) -> List[str]:
+        return [f"{columns[0]}_to_{columns[1]}_days"]
+
+
+class RatioTransformer(_FeatureTransformer):
+    """比率特征，输入为 [分子, 分母] 两列，分母为0或缺失时结果为缺失值，输出列名为 <分子>_per_<分母>"""
+
+    def fit(self, X: Any, y: Any = None) -> "RatioTransformer":
+        if X.shape[1] != 2:
+            raise ValueError(f"RatioTransformer需要分子和分母两列，实际为 {X.shape[1]} 列")
+        self._record_input(X)
+        return self
+
+    def transform(self, X: Any) -> np.ndarray:
+        values = _to_numeric_frame(X, self._input_columns()).to_numpy(dtype=float, na_value=np.nan)
+        numerator, denominator = values[:, 0], values[:, 1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.where(denominator != 0, numerator / denominator, np.nan)
+        return ratio.reshape(-1, 1)
+
+    def _output_names(self, columns: List[str]) -> List[str]:
+        return [f"{columns[0]}_per_{columns[1]}"]
+
+
+def find_date_columns(X: pd.DataFrame, spec: Optional[Dict[str, Any]] = None) -> List[str]:
+    """
+    识别日期列：datetime64类型的列，以及特征定义中按名称指定的列
+
+    Args:
+        X: 特征DataFrame
+        spec: 特征定义，默认 DEFAULT_FEATURE_SPEC
+
+    Returns:
+        日期列名列表
+    """
+    spec = DEFAULT_FEATURE_SPEC if spec is None else spec
+    named = set(spec.get("date_columns") or [])
+    return [
+        col for col in X.columns
+        if pd.api.types.is_datetime64_any_dtype(X[col]) or col in named
+    ]
+
+
+def build_feature_transformers(
+    X: pd.DataFrame, spec: Optional[Dict[str, Any]] = None
+) -> List[Tuple[str, BaseEstimator, List[str]]]:
+    """
+    按数据中实际存在的列生成特征转换器
+
+    Args:
+        X: 特征DataFrame
+        spec: 特征定义，默认 DEFAULT_FEATURE_SPEC
+
+    Returns:
+        (名称, 转换器, 输入列) 列表，可直接加入ColumnTransformer
+    """
+    spec = DEFAULT_FEATURE_SPEC if spec is None else spec
+    columns = set(X.columns)
+    date_columns = find_date_columns(X, spec)
+    transformers: List[Tuple[str, BaseEstimator, List[str]]] = []
+
+    if date_columns:
+        parts = spec.get("date_parts") or DEFAULT_DATE_PARTS
+        transformers.append(("date_parts", DatePartsTransformer(parts=tuple(parts)), date_columns))
+
+    tenure_columns = [col for col in spec.get("tenure_columns") or [] if col in date_columns]
+    if tenure_columns:
+        transformers.append(
+            ("tenure", TenureTransformer(reference_date=spec.get("reference_date")), tenure_columns)
+        )
+
+    for start, end in spec.get("durations") or []:
+        if start in date_columns and end in date_columns:
+            transformers.append((f"duration_{start}_{end}", DurationTransformer(), [start, end]))
+
+    for numerator, denominator in spec.get("ratios") or []:
+        if numerator in columns and denominator in columns:
+            transformers.append((f"ratio_{numerator}_{denominator}", RatioTransformer(), [numerator, denominator]))
+
+    if transformers:
+        logger.info(f"特征创建: {', '.join(name for name, _, _ in transformers)}")
+    return transformers
+
+
+def create_features(df: pd.DataFrame, spec: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    """
+    基于原始特征创建新特征，与预处理器中的特征转换器计算方式和列名一致
+
+    Args:
+        df: 输入DataFrame
+        spec: 特征定义，默认 DEFAULT_FEATURE_SPEC
+
+    Returns:
+        包含新特征的DataFrame
+    """
+    result = df.copy()
+    for _, transformer, columns in build_feature_transformers(df, spec):
+        values = transformer.fit_transform(df[columns])
+        result[list(transformer.get_feature_names_out(columns))] = values
+    return result
+
+
+def create_time_features(
+    df: pd.DataFrame, date_column: str, parts: Sequence[str] = DEFAULT_DATE_PARTS
+) -> pd.DataFrame:
+    """
+    从日期特征创建时间相关特征
+
+    Args:
+        df: 输入DataFrame
+        date_column: 日期列名
+        parts: 日期成分
+
+    Returns:
+        包含时间特征的DataFrame
+    """
+    transformer = DatePartsTransformer(parts=tuple(parts))
+    values = transformer.fit_transform(df[[date_column]])
+    result = df.copy()
+    result[list(transformer.get_feature_names_out())] = values
+    return result
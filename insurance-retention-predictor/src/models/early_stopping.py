@@ -0,0 +1,209 @@
+"""
+提升树早停模块
+
+该模块为梯度提升树、XGBoost和LightGBM提供基于验证集的早停，包括：
+- 梯度提升树：设置 n_iter_no_change 和 validation_fraction，由模型在训练集内部划分验证集
+- XGBoost / LightGBM：从训练集中分层划出验证集，验证指标连续若干轮没有提升时停止训练
+- 超参数搜索的包装模型：XGBoost和LightGBM在每个交叉验证折的训练数据中划出验证集早停，
+  网格搜索、随机搜索和连续减半搜索的每次训练都不再训练全部的树
+- 读取模型的最佳迭代次数；XGBoost和LightGBM预测时默认只使用最佳迭代之前的树，
+  梯度提升树在停止时已截断多余的树
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+import lightgbm as lgb
+import numpy as np
+import xgboost as xgb
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.model_selection import train_test_split
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# 默认早停设置
+DEFAULT_VALIDATION_FRACTION = 0.1
+DEFAULT_ROUNDS = 20
+
+
+def early_stopping_settings(config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    读取 training.early_stopping 配置
+
+    Args:
+        config: 配置参数
+
+    Returns:
+        包含 validation_fraction、rounds 和 random_state 的字典，未启用时返回None
+    """
+    settings = config.get("training", {}).get("early_stopping") or {}
+    if not settings.get("enabled", False):
+        return None
+    return {
+        "validation_fraction": settings.get("validation_fraction", DEFAULT_VALIDATION_FRACTION),
+        "rounds": settings.get("rounds", DEFAULT_ROUNDS),
+        "random_state": settings.get("random_state", 42),
+    }
+
+
+def supports_early_stopping(estimator: Any) -> bool:
+    """模型是否支持早停"""
+    return isinstance(estimator, (GradientBoostingClassifier, xgb.XGBClassifier, lgb.LGBMClassifier))
+
+
+def needs_holdout(estimator: Any, settings: Optional[Dict[str, Any]]) -> bool:
+    """
+    模型早停是否需要在训练时单独传入验证集
+
+    梯度提升树在模型内部划分验证集，可以直接用于交叉验证；XGBoost和LightGBM需要单独传入验证集。
+    """
+    return settings is not None and isinstance(estimator, (xgb.XGBClassifier, lgb.LGBMClassifier))
+
+
+def apply_early_stopping_params(estimator: Any, settings: Optional[Dict[str, Any]]) -> Any:
+    """
+    为梯度提升树设置内部早停参数，其他模型保持不变
+
+    Args:
+        estimator: 未训练的模型
+        settings: 早停设置，为None时不修改
+
+    Returns:
+        模型本身
+    """
+    if settings is not None and isinstance(estimator, GradientBoostingClassifier):
+        estimator.set_params(
+            n_iter_no_change=settings["rounds"],
+            validation_fraction=settings["validation_fraction"]
+        )
+    return estimator
+
+
+def fit_estimator(estimator: Any, X: Any, y: Any, settings: Optional[Dict[str, Any]] = None) -> Any:
+    """
+    训练模型，支持早停的模型按设置启用早停
+
+    Args:
+        estimator: 未训练的模型
+        X: 训练特征（DataFrame、数组或稀疏矩阵）
+        y: 训练标签
+        settings: 早停设置，为None时完整训练
+
+    Returns:
+        训练好的模型
+    """
+    if settings is None or not supports_early_stopping(estimator):
+        return estimator.fit(X, y)
+
+    if isinstance(estimator, GradientBoostingClassifier):
+        return apply_early_stopping_params(estimator, settings).fit(X, y)
+
+    # 训练数据很少时（如连续减半搜索的前几轮），某个类别不足两个样本则无法分层划出验证集，完整训练
+    class_counts = np.unique(y, return_counts=True)[1]
+    if class_counts.min() < 2:
+        return estimator.fit(X, y)
+
+    # 分层划出验证集，验证集只用于确定停止的迭代次数，且至少包含每个类别的一个样本
+    n_valid = max(int(np.ceil(settings["validation_fraction"] * len(y))), len(class_counts))
+    X_fit, X_valid, y_fit, y_valid = train_test_split(
+        X, y, test_size=n_valid,
+        stratify=y, random_state=settings["random_state"]
+    )
+
+    if isinstance(estimator, xgb.XGBClassifier):
+        estimator.set_params(early_stopping_rounds=settings["rounds"])
+        try:
+            estimator.fit(X_fit, y_fit, eval_set=[(X_valid, y_valid)], verbose=False)
+        finally:
+            # 最佳迭代保存在模型中；清除该参数，模型被克隆或重新训练时不要求验证集
+            estimator.set_params(early_stopping_rounds=None)
+    else:
+        estimator.fit(
+            X_fit, y_fit, eval_set=[(X_valid, y_valid)],
+            callbacks=[lgb.early_stopping(settings["rounds"], verbose=False)]
+        )
+    return estimator
+
+
+class EarlyStoppingClassifier(ClassifierMixin, BaseEstimator):
+    """
+    每次训练时按早停设置训练内部模型的包装模型，用于sklearn超参数搜索
+
+    内部模型的参数不加前缀直接读取和设置，搜索空间、best_params_ 和 cv_results_ 中的参数名与未包装时一致。
+    """
+
+    def __init__(self, estimator: Any = None, early_stopping: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            estimator: 未训练的XGBoost或LightGBM模型
+            early_stopping: 早停设置
+        """
+        self.estimator = estimator
+        self.early_stopping = early_stopping
+
+    def get_params(self, deep: bool = True) -> Dict[str, Any]:
+        params = super().get_params(deep=False)
+        if deep and self.estimator is not None:
+            params.update(self.estimator.get_params(deep=True))
+        return params
+
+    def set_params(self, **params: Any) -> "EarlyStoppingClassifier":
+        own = {name: params.pop(name) for name in list(params) if name in ("estimator", "early_stopping")}
+        super().set_params(**own)
+        if params:
+            self.estimator.set_params(**params)
+        return self
+
+    def fit(self, X: Any, y: Any) -> "EarlyStoppingClassifier":
+        """从训练数据中划出验证集早停训练内部模型"""
+        self.estimator_ = fit_estimator(clone(self.estimator), X, y, self.early_stopping)
+        self.classes_ = self.estimator_.classes_
+        return self
+
+    def predict(self, X: Any) -> Any:
+        return self.estimator_.predict(X)
+
+    def predict_proba(self, X: Any) -> Any:
+        return self.estimator_.predict_proba(X)
+
+
+def best_iteration(model: Any) -> Optional[int]:
+    """
+    模型预测时使用的迭代次数（树的数量）
+
+    Args:
+        model: 训练好的模型
+
+    Returns:
+        早停后的迭代次数，模型未使用早停时返回None
+    """
+    if isinstance(model, GradientBoostingClassifier):
+        if model.n_iter_no_change is None or not hasattr(model, "n_estimators_"):
+            return None
+        return int(model.n_estimators_)
+
+    if isinstance(model, xgb.XGBClassifier):
+        try:
+            return int(model.best_iteration) + 1
+        except AttributeError:
+            return None
+
+    if isinstance(model, lgb.LGBMClassifier):
+        best = getattr(model, "best_iteration_", None)
+        return int(best) if best else None
+
+    return None
+
+
+def log_best_iteration(name: str, model: Any) -> Optional[int]:
+    """记录早停后的迭代次数"""
+    best = best_iteration(model)
+    if best is not None:
+        logger.info(f"{name} 早停：使用 {best} / {model.get_params()['n_estimators']} 次迭代")
+    return best
@@ -0,0 +1,211 @@
+"""
+模型解释模块
+
+该模块负责基于SHAP值解释模型预测，包括：
+- 为模型构建SHAP解释器（由调用方按模型版本缓存）
+- 一次向量化调用计算整批数据的逐行SHAP值
+- 汇总全局特征重要性和每个客户的主要影响因素
+- 计算并保存模型的全局特征重要性，供Web应用直接读取
+"""
+
+import os
+import json
+import logging
+from typing import Any, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def build_explainer(model: Any) -> Optional[Any]:
+    """
+    为模型构建SHAP解释器
+
+    Args:
+        model: 训练好的模型
+
+    Returns:
+        SHAP解释器，shap不可用或模型不受支持时返回None
+    """
+    try:
+        import shap
+    except ImportError:
+        logger.warning("未安装shap，无法构建解释器")
+        return None
+
+    try:
+        explainer = shap.Explainer(model)
+        logger.info(f"已为模型 {type(model).__name__} 构建SHAP解释器")
+        return explainer
+    except Exception as e:
+        logger.warning(f"构建SHAP解释器失败: {str(e)}")
+        return None
+
+
+def compute_shap_values(explainer: Any, data: Any) -> np.ndarray:
+    """
+    一次向量化调用计算整批数据的SHAP值
+
+    Args:
+        explainer: SHAP解释器
+        data: 转换后的特征矩阵
+
+    Returns:
+        形状为 (n_samples, n_features) 的正类SHAP值
+    """
+    values = np.asarray(explainer(data).values)
+
+    # 部分解释器对二分类模型返回每个类别的SHAP值，只保留正类（续保）
+    if values.ndim == 3:
+        values = values[:, :, -1]
+    return values
+
+
+def shap_importance(shap_values: np.ndarray, feature_names: List[str]) -> pd.DataFrame:
+    """
+    以平均绝对SHAP值作为特征重要性
+
+    Args:
+        shap_values: SHAP值矩阵
+        feature_names: 特征名称
+
+    Returns:
+        按重要性降序排列的特征重要性DataFrame
+    """
+    return pd.DataFrame({
+        'Feature': feature_names,
+        'Importance': np.abs(shap_values).mean(axis=0)
+    }).sort_values('Importance', ascending=False)
+
+
+def top_factors(shap_values: np.ndarray, feature_names: List[str], top_k: int = 3) -> pd.DataFrame:
+    """
+    提取每行绝对SHAP值最大的前k个特征及其影响值
+
+    Args:
+        shap_values: SHAP值矩阵
+        feature_names: 特征名称
+        top_k: 每行保留的特征数
+
+    Returns:
+        每行包含 TopFactor{i} 和 TopFactor{i}Impact 列的DataFrame
+    """
+    top_k = min(top_k, shap_values.shape[1])
+    names = np.asarray(feature_names, dtype=object)
+
+    # argpartition只做部分排序，再对前k个排序
+    top_idx = np.argpartition(-np.abs(shap_values), top_k - 1, axis=1)[:, :top_k]
+    top_values = np.take_along_axis(shap_values, top_idx, axis=1)
+    order = np.argsort(-np.abs(top_values), axis=1)
+    top_idx = np.take_along_axis(top_idx, order, axis=1)
+    top_values = np.take_along_axis(top_values, order, axis=1)
+
+    factors = {}
+    for i in range(top_k):
+        factors[f"TopFactor{i + 1}"] = names[top_idx[:, i]]
+        factors[f"TopFactor{i + 1}Impact"] = top_values[:, i]
+    return pd.DataFrame(factors)
+
+
+def explain_batch(explainer: Any, data: Any, feature_names: List[str], top_k: int = 3) -> pd.DataFrame:
+    """
+    计算整批数据的逐行解释
+
+    Args:
+        explainer: SHAP解释器
+        data: 转换后的特征矩阵
+        feature_names: 特征名称
+        top_k: 每行保留的主要影响因素个数
+
+    Returns:
+        每行主要影响因素的DataFrame
+    """
+    return top_factors(compute_shap_values(explainer, data), feature_names, top_k)
+
+
+def compute_global_importance(model: Any, feature_names: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+    """
+    根据树模型的特征重要性或线性模型的系数计算全局特征重要性
+
+    Args:
+        model: 训练好的模型
+        feature_names: 特征名称，默认使用模型记录的特征名称
+
+    Returns:
+        按重要性降序排列的特征重要性DataFrame，模型不支持时返回None
+    """
+    if hasattr(model, 'feature_importances_'):
+        # 树模型
+        importances = np.asarray(model.feature_importances_)
+    elif hasattr(model, 'coef_'):
+        # 线性模型，使用系数绝对值作为重要性
+        coefficients = model.coef_[0] if model.coef_.ndim > 1 else model.coef_
+        importances = np.abs(coefficients)
+    else:
+        return None
+
+    if feature_names is None:
+        feature_names = (
+            list(model.feature_names_in_) if hasattr(model, 'feature_names_in_')
+            else [f"feature_{i}" for i in range(len(importances))]
+        )
+
+    return pd.DataFrame({
+        'Feature': feature_names,
+        'Importance': importances
+    }).sort_values('Importance', ascending=False).reset_index(drop=True)
+
+
+def importance_path(artifact_path: str) -> str:
+    """模型文件对应的特征重要性文件路径（与模型文件同目录）"""
+    return f"{os.path.splitext(artifact_path)[0]}.importance.json"
+
+
+def save_importance(importance_df: pd.DataFrame, artifact_path: str) -> str:
+    """
+    将全局特征重要性保存到模型文件旁
+
+    Args:
+        importance_df: 特征重要性DataFrame
+        artifact_path: 模型文件路径
+
+    Returns:
+        特征重要性文件路径
+    """
+    path = importance_path(artifact_path)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "features": importance_df['Feature'].astype(str).tolist(),
+                "importances": importance_df['Importance'].astype(float).tolist(),
+            },
+            file, ensure_ascii=False
+        )
+    logger.info(f"保存特征重要性到 {path}")
+    return path
+
+
+def load_importance(artifact_path: str) -> Optional[pd.DataFrame]:
+    """
+    读取模型文件旁的全局特征重要性
+
+    Args:
+        artifact_path: 模型文件路径
+
+    Returns:
+        特征重要性DataFrame，文件不存在时返回None
+    """
+    path = importance_path(artifact_path)
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    return pd.DataFrame({'Feature': data["features"], 'Importance': data["importances"]})
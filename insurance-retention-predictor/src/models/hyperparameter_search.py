@@ -0,0 +1,298 @@
+"""
+超参数搜索模块
+
+该模块根据 hyperparameter_search.method 配置创建超参数搜索，包括：
+- grid / random：sklearn的网格搜索和随机搜索，每个候选参数都做完整的交叉验证
+- halving：连续减半搜索，先用少量样本（或少量树）评估全部候选，只有表现较好的候选进入下一轮并获得更多资源
+- optuna：基于TPE采样的Optuna搜索，按折报告交叉验证得分，由MedianPruner提前终止明显较差的试验；
+  研究持久化到SQLite，中断后在同一数据和设置上重新运行时从已完成的试验继续；每折训练时XGBoost和LightGBM可按验证集早停
+- 启用早停时，grid、random和halving搜索中的XGBoost和LightGBM由包装模型在每折的训练数据中划出验证集早停
+所有后端提供与sklearn搜索一致的 best_params_、best_score_、best_estimator_ 等属性
+"""
+
+import os
+import time
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+import joblib
+import numpy as np
+from sklearn.base import clone
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import (
+    GridSearchCV, HalvingRandomSearchCV, RandomizedSearchCV, StratifiedKFold
+)
+
+from src.models.early_stopping import EarlyStoppingClassifier, fit_estimator, needs_holdout
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# 项目根目录
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+
+# 默认的Optuna研究存储位置
+DEFAULT_OPTUNA_STORAGE = os.path.join(PROJECT_ROOT, "models/optuna/studies.db")
+
+SEARCH_METHODS = ("grid", "random", "halving", "optuna")
+
+
+def _safe_indexing(data: Any, indices: np.ndarray) -> Any:
+    """按行索引取子集，兼容DataFrame、Series、数组和稀疏矩阵"""
+    if hasattr(data, "iloc"):
+        return data.iloc[indices]
+    return data[indices]
+
+
+class OptunaSearchCV:
+    """基于Optuna的交叉验证超参数搜索，支持按折剪枝和持久化研究"""
+
+    def __init__(
+        self, estimator: Any, param_distributions: Dict[str, List[Any]],
+        n_trials: int = 20, cv: int = 5, scoring: str = "roc_auc",
+        refit: bool = True, random_state: int = 42,
+        storage: Optional[str] = None, study_name: Optional[str] = None,
+        n_startup_trials: int = 5, timeout: Optional[float] = None,
+        estimator_n_jobs: Optional[int] = None,
+        early_stopping: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Args:
+            estimator: 未训练的模型
+            param_distributions: 参数名到候选值列表的字典
+            n_trials: 研究的总试验次数（包括之前运行中已完成的试验）
+            cv: 交叉验证折数
+            scoring: 评分指标
+            refit: 是否用最佳参数在完整训练集上重新训练
+            random_state: 随机种子
+            storage: 研究存储的SQLite文件路径，为空时不持久化
+            study_name: 研究名称，默认由模型类型、搜索空间、固定参数和训练数据指纹生成
+            n_startup_trials: MedianPruner开始剪枝前需完成的试验数
+            timeout: 本次运行的最长搜索时间（秒）
+            estimator_n_jobs: 试验依次进行时模型内部使用的线程数
+            early_stopping: 早停设置，每折训练和最终训练时从训练数据中划出验证集早停
+        """
+        self.estimator = estimator
+        self.param_distributions = param_distributions
+        self.n_trials = n_trials
+        self.cv = cv
+        self.scoring = scoring
+        self.refit = refit
+        self.random_state = random_state
+        self.storage = storage
+        self.study_name = study_name
+        self.n_startup_trials = n_startup_trials
+        self.timeout = timeout
+        self.estimator_n_jobs = estimator_n_jobs
+        self.early_stopping = early_stopping
+
+    def _default_study_name(self, X: Any, y: Any) -> str:
+        """
+        研究名称：模型类型加搜索空间、折数、固定参数、早停设置和训练数据指纹的摘要，
+        任一变化（如在新数据上重新训练）时使用新的研究，不续用旧数据上的试验
+        """
+        # 线程数不影响试验结果，不参与研究名称
+        fixed_params = {
+            name: value for name, value in self.estimator.get_params(deep=False).items()
+            if name not in self.param_distributions and name != "n_jobs"
+        }
+        space = json.dumps(
+            {
+                "params": self.param_distributions, "cv": self.cv, "scoring": self.scoring,
+                "fixed_params": fixed_params, "early_stopping": self.early_stopping,
+                "random_state": self.random_state, "data": joblib.hash((X, y)),
+            },
+            sort_keys=True, default=str
+        )
+        digest = hashlib.md5(space.encode("utf-8")).hexdigest()[:8]
+        return f"{type(self.estimator).__name__}_{digest}"
+
+    def _trial_estimator(self, params: Dict[str, Any]) -> Any:
+        """为试验创建模型"""
+        estimator = clone(self.estimator).set_params(**params)
+        if self.estimator_n_jobs is not None and "n_jobs" in estimator.get_params():
+            estimator.set_params(n_jobs=self.estimator_n_jobs)
+        return estimator
+
+    def fit(self, X: Any, y: Any) -> "OptunaSearchCV":
+        """
+        执行搜索
+
+        Args:
+            X: 训练特征
+            y: 训练标签
+
+        Returns:
+            self
+        """
+        import optuna
+
+        folds = list(StratifiedKFold(
+            n_splits=self.cv, shuffle=True, random_state=self.random_state
+        ).split(np.zeros(len(y)), y))
+        scorer = get_scorer(self.scoring)
+
+        def objective(trial: "optuna.Trial") -> float:
+            params = {
+                name: trial.suggest_categorical(name, list(values))
+                for name, values in self.param_distributions.items()
+            }
+            scores = []
+            fit_times = []
+            for step, (train_idx, valid_idx) in enumerate(folds):
+                estimator = self._trial_estimator(params)
+                start = time.perf_counter()
+                fit_estimator(estimator, _safe_indexing(X, train_idx), _safe_indexing(y, train_idx), self.early_stopping)
+                fit_times.append(time.perf_counter() - start)
+                scores.append(scorer(estimator, _safe_indexing(X, valid_idx), _safe_indexing(y, valid_idx)))
+
+                # 报告目前各折的平均得分，明显低于其他试验同一步的中位数时提前终止
+                trial.report(float(np.mean(scores)), step)
+                if trial.should_prune():
+                    raise optuna.TrialPruned()
+
+            trial.set_user_attr("mean_fit_time", float(np.mean(fit_times)))
+            return float(np.mean(scores))
+
+        storage_url = None
+        if self.storage:
+            os.makedirs(os.path.dirname(os.path.abspath(self.storage)), exist_ok=True)
+            storage_url = f"sqlite:///{os.path.abspath(self.storage)}"
+
+        study_name = self.study_name or self._default_study_name(X, y)
+        study = optuna.create_study(
+            study_name=study_name,
+            storage=storage_url,
+            load_if_exists=True,
+            direction="maximize",
+            sampler=optuna.samplers.TPESampler(seed=self.random_state),
+            pruner=optuna.pruners.MedianPruner(n_startup_trials=self.n_startup_trials, n_warmup_steps=1),
+        )
+
+        # 已完成和已剪枝的试验计入总次数，重新运行时只补足剩余的试验
+        finished_states = (optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED)
+        n_finished = len(study.get_trials(deepcopy=False, states=finished_states))
+        n_remaining = max(self.n_trials - n_finished, 0)
+        logger.info(f"Optuna研究 {study_name}：已完成 {n_finished} 次试验，本次运行 {n_remaining} 次")
+        if n_remaining > 0:
+            study.optimize(objective, n_trials=n_remaining, timeout=self.timeout)
+
+        completed = study.get_trials(deepcopy=False, states=(optuna.trial.TrialState.COMPLETE,))
+        if not completed:
+            raise ValueError(f"Optuna研究 {study_name} 没有完成的试验")
+
+        n_pruned = len(study.get_trials(deepcopy=False, states=(optuna.trial.TrialState.PRUNED,)))
+        logger.info(f"Optuna搜索完成：完成 {len(completed)} 次试验，剪枝 {n_pruned} 次试验")
+
+        # 与sklearn搜索结果一致的属性
+        self.study_ = study
+        self.n_splits_ = self.cv
+        self.cv_results_ = {
+            "params": [trial.params for trial in completed],
+            "mean_test_score": np.array([trial.value for trial in completed]),
+            "mean_fit_time": np.array([trial.user_attrs.get("mean_fit_time", np.nan) for trial in completed]),
+        }
+        self.best_index_ = int(np.argmax(self.cv_results_["mean_test_score"]))
+        self.best_params_ = self.cv_results_["params"][self.best_index_]
+        self.best_score_ = float(self.cv_results_["mean_test_score"][self.best_index_])
+
+        if self.refit:
+            start = time.perf_counter()
+            self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_)
+            fit_estimator(self.best_estimator_, X, y, self.early_stopping)
+            self.refit_time_ = time.perf_counter() - start
+        return self
+
+
+def build_search(
+    estimator: Any, param_grid: Dict[str, List[Any]], search_config: Dict[str, Any],
+    refit: bool = True, estimator_n_jobs: Optional[int] = None,
+    early_stopping: Optional[Dict[str, Any]] = None
+) -> Any:
+    """
+    根据配置创建超参数搜索
+
+    Args:
+        estimator: 未训练的模型
+        param_grid: 参数名到候选值列表的字典
+        search_config: hyperparameter_search 配置
+        refit: 是否用最佳参数在完整训练集上重新训练
+        estimator_n_jobs: 配置中模型的线程数（Optuna试验依次进行时使用）
+        early_stopping: 早停设置（Optuna每折训练时使用；sklearn搜索中梯度提升树通过模型参数早停，
+            XGBoost和LightGBM由包装模型在每折训练时早停）
+
+    Returns:
+        具有 fit 方法和 best_params_ 等属性的搜索对象
+    """
+    method = search_config.get("method", "random")
+    n_iter = search_config.get("n_iter", 10)
+    cv = search_config.get("cv", 5)
+
+    # sklearn搜索的每次训练只调用 fit(X, y)，需要单独验证集早停的模型由包装模型在每折的训练数据中划出验证集
+    if method != "optuna" and needs_holdout(estimator, early_stopping):
+        estimator = EarlyStoppingClassifier(estimator, early_stopping)
+
+    if method == "grid":
+        logger.info("使用网格搜索进行超参数优化")
+        return GridSearchCV(
+            estimator, param_grid, cv=cv, scoring="roc_auc",
+            verbose=1, n_jobs=-1, return_train_score=True, refit=refit
+        )
+
+    if method == "random":
+        logger.info("使用随机搜索进行超参数优化")
+        return RandomizedSearchCV(
+            estimator, param_grid, n_iter=n_iter, cv=cv, scoring="roc_auc",
+            verbose=1, n_jobs=-1, random_state=42, return_train_score=True, refit=refit
+        )
+
+    if method == "halving":
+        halving_config = search_config.get("halving", {})
+        resource = halving_config.get("resource", "n_samples")
+        factor = halving_config.get("factor", 3)
+        param_grid = dict(param_grid)
+        kwargs = {}
+
+        if resource == "n_estimators":
+            if "n_estimators" not in estimator.get_params():
+                raise ValueError(f"模型 {type(estimator).__name__} 没有 n_estimators 参数，无法按树的数量连续减半")
+            # 树的数量作为资源逐轮增加，不再作为搜索参数
+            n_estimators_values = [value for value in param_grid.pop("n_estimators", []) if value is not None]
+            kwargs["min_resources"] = min(n_estimators_values) if n_estimators_values else "smallest"
+            kwargs["max_resources"] = max(n_estimators_values) if n_estimators_values else estimator.get_params()["n_estimators"]
+        elif resource != "n_samples":
+            raise ValueError(f"不支持的连续减半资源: {resource}，可选: n_samples、n_estimators")
+
+        logger.info(f"使用连续减半搜索进行超参数优化，资源: {resource}，减半因子: {factor}")
+        return HalvingRandomSearchCV(
+            estimator, param_grid, resource=resource, factor=factor,
+            n_candidates="exhaust", cv=cv, scoring="roc_auc",
+            verbose=1, n_jobs=-1, random_state=42, return_train_score=True, refit=refit,
+            **kwargs
+        )
+
+    if method == "optuna":
+        optuna_config = search_config.get("optuna", {})
+        storage = optuna_config.get("storage", DEFAULT_OPTUNA_STORAGE)
+        if storage and not os.path.isabs(storage):
+            storage = os.path.join(PROJECT_ROOT, storage)
+
+        logger.info("使用Optuna搜索进行超参数优化（MedianPruner剪枝）")
+        return OptunaSearchCV(
+            estimator, param_grid, n_trials=n_iter, cv=cv, scoring="roc_auc",
+            refit=refit, random_state=42, storage=storage,
+            study_name=optuna_config.get("study_name"),
+            n_startup_trials=optuna_config.get("n_startup_trials", 5),
+            timeout=optuna_config.get("timeout"),
+            estimator_n_jobs=estimator_n_jobs,
+            early_stopping=early_stopping
+        )
+
+    raise ValueError(f"不支持的超参数搜索方法: {method}，可选: {', '.join(SEARCH_METHODS)}")
@@ -0,0 +1,287 @@
+"""
+增量训练模块
+
+该模块在新一期数据上继续训练最近保存的模型，而不是在全部历史数据上从头训练，包括：
+- 加载 save_model 最近保存的模型和对应的预处理器，用同一预处理器转换新数据
+- XGBoost / LightGBM：在原有的树之后追加提升轮数（早停的模型从最佳迭代处继续）
+- 随机森林 / 梯度提升树：warm_start 追加新的树
+- 逻辑回归：以原模型的系数作为求解器的初始值；liblinear求解器不支持热启动，
+  改为在原训练集（data/processed）和新数据合并后的数据上重新求解，不丢失历史数据
+- 预处理器已包含异常值截断步骤时，清洗新数据时不再截断，与训练时一致
+- 在新数据的验证集上比较新旧模型，新模型不差于旧模型时才保存
+"""
+
+import os
+import re
+import sys
+import copy
+import logging
+import argparse
+from typing import Any, Dict, Optional, Tuple
+
+import joblib
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import xgboost as xgb
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+
+# 添加项目根目录到系统路径，以便以脚本方式运行时导入src包
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from src.data.outliers import OutlierClipper
+from src.data.preprocessing import PROCESSED_DATA_DIR, clean_data, get_feature_names, to_dense_frame
+from src.data.storage import read_frame
+from src.evaluation.metrics import ModelEvaluator
+from src.models.early_stopping import best_iteration
+from src.models.inference import build_inference_pipeline, save_inference_pipeline
+from src.models.train_model import MODELS_DIR, PROJECT_ROOT, load_config, load_processed_data, save_model
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# save_model 保存的优化模型文件名：optimized_<模型名称>_<时间戳>.pkl
+ARTIFACT_PATTERN = re.compile(r"^optimized_(?P<name>.+)_\d{8}_\d{6}\.pkl$")
+
+# 默认增量训练设置
+DEFAULT_INCREMENTAL_CONFIG = {
+    "boosting_rounds": 50,
+    "extra_trees": 50,
+    "validation_fraction": 0.2,
+    "tolerance": 0.0,
+    "random_state": 42,
+}
+
+
+def find_latest_artifact(models_dir: str = MODELS_DIR) -> Optional[Tuple[str, str]]:
+    """
+    查找 save_model 最近保存的优化模型
+
+    Args:
+        models_dir: 模型目录
+
+    Returns:
+        模型文件路径和模型名称，没有找到时返回None
+    """
+    if not os.path.isdir(models_dir):
+        return None
+
+    candidates = []
+    for filename in os.listdir(models_dir):
+        match = ARTIFACT_PATTERN.match(filename)
+        if match:
+            path = os.path.join(models_dir, filename)
+            candidates.append((os.path.getmtime(path), path, match.group("name")))
+
+    if not candidates:
+        return None
+    _, path, name = max(candidates)
+    return path, name
+
+
+def has_outlier_clipper(preprocessor: Any) -> bool:
+    """预处理器中是否包含异常值截断步骤（此时清洗阶段不应再截断）"""
+    for _, transformer, _ in getattr(preprocessor, "transformers_", []):
+        steps = getattr(transformer, "steps", [])
+        if any(isinstance(step, OutlierClipper) for _, step in steps):
+            return True
+    return False
+
+
+def transform_new_data(new_data_path: str, preprocessor: Any) -> Tuple[Any, pd.Series]:
+    """
+    读取并清洗新数据，用原预处理器转换，特征列与原模型一致
+
+    Args:
+        new_data_path: 新数据文件路径（CSV、Parquet、Feather或.npz）
+        preprocessor: 原模型使用的预处理器
+
+    Returns:
+        转换后的特征和标签
+    """
+    # 预处理器中已学习截断边界时，清洗阶段不再按3倍标准差截断，避免重复截断
+    if has_outlier_clipper(preprocessor):
+        df = clean_data(read_frame(new_data_path), clip_strategy=None)
+    else:
+        df = clean_data(read_frame(new_data_path))
+    if "Renewed" not in df.columns:
+        raise ValueError("新数据中缺少目标变量'Renewed'")
+
+    X = df.drop(columns=["Renewed", "CustomerID"], errors="ignore")
+    y = df["Renewed"].reset_index(drop=True)
+
+    X_transformed = preprocessor.transform(X)
+    if sp.issparse(X_transformed):
+        return sp.csr_matrix(X_transformed), y
+    return to_dense_frame(X_transformed, get_feature_names(preprocessor)), y
+
+
+def _stack_features(X_old: Any, X_new: Any) -> Any:
+    """按行合并历史特征和新特征，保持新特征的类型和列名"""
+    if sp.issparse(X_new):
+        return sp.vstack([sp.csr_matrix(X_old), X_new], format="csr")
+    stacked = np.vstack([np.asarray(X_old, dtype=float), np.asarray(X_new, dtype=float)])
+    if isinstance(X_new, pd.DataFrame):
+        return pd.DataFrame(stacked, columns=X_new.columns)
+    return stacked
+
+
+def continue_training(
+    model: Any, X: Any, y: pd.Series, settings: Dict[str, Any],
+    history: Optional[Tuple[Any, pd.Series]] = None
+) -> Any:
+    """
+    在新数据上继续训练模型的副本，原模型保持不变
+
+    Args:
+        model: 已训练的模型
+        X: 新数据特征
+        y: 新数据标签
+        settings: 增量训练设置
+        history: 原模型的训练数据（特征和标签），不支持热启动的模型（liblinear逻辑回归）
+            在历史数据和新数据合并后的数据上重新求解
+
+    Returns:
+        继续训练后的模型
+    """
+    candidate = copy.deepcopy(model)
+
+    if isinstance(candidate, xgb.XGBClassifier):
+        booster = candidate.get_booster()
+        n_iterations = best_iteration(candidate)
+        if n_iterations is not None:
+            booster = booster[:n_iterations]
+        base_rounds = booster.num_boosted_rounds()
+        candidate.set_params(n_estimators=settings["boosting_rounds"])
+        candidate.fit(X, y, xgb_model=booster, verbose=False)
+        candidate.set_params(n_estimators=base_rounds + settings["boosting_rounds"])
+        logger.info(f"XGBoost 在 {base_rounds} 轮之后追加 {settings['boosting_rounds']} 轮")
+
+    elif isinstance(candidate, lgb.LGBMClassifier):
+        n_iterations = best_iteration(candidate)
+        init_model = lgb.Booster(model_str=candidate.booster_.model_to_string(num_iteration=n_iterations))
+        base_rounds = init_model.current_iteration()
+        candidate.set_params(n_estimators=settings["boosting_rounds"])
+        candidate.fit(X, y, init_model=init_model)
+        candidate.set_params(n_estimators=base_rounds + settings["boosting_rounds"])
+        logger.info(f"LightGBM 在 {base_rounds} 轮之后追加 {settings['boosting_rounds']} 轮")
+
+    elif isinstance(candidate, (RandomForestClassifier, GradientBoostingClassifier)):
+        base_trees = len(candidate.estimators_)
+        extra = settings["boosting_rounds"] if isinstance(candidate, GradientBoostingClassifier) else settings["extra_trees"]
+        # 早停的梯度提升树从实际训练的迭代次数继续
+        candidate.set_params(warm_start=True, n_estimators=base_trees + extra)
+        candidate.fit(X, y)
+        candidate.set_params(warm_start=False)
+        logger.info(f"{type(candidate).__name__} 在 {base_trees} 棵树之后追加 {extra} 棵")
+
+    elif isinstance(candidate, LogisticRegression):
+        if candidate.solver == "liblinear":
+            if history is None:
+                raise ValueError("liblinear求解器不支持热启动，需要原训练数据才能在历史数据和新数据上重新求解")
+            X_old, y_old = history
+            if X_old.shape[1] != X.shape[1]:
+                raise ValueError(f"原训练数据有 {X_old.shape[1]} 列，新数据有 {X.shape[1]} 列")
+            X_all = _stack_features(X_old, X)
+            y_all = pd.concat([pd.Series(np.asarray(y_old)), pd.Series(np.asarray(y))], ignore_index=True)
+            candidate.fit(X_all, y_all)
+            logger.info(
+                f"liblinear求解器不支持热启动，在原训练集 {X_old.shape[0]} 行和新数据 {X.shape[0]} 行上重新求解"
+            )
+        else:
+            candidate.set_params(warm_start=True)
+            candidate.fit(X, y)
+            candidate.set_params(warm_start=False)
+            logger.info(f"逻辑回归以原系数为初始值，迭代 {int(np.max(candidate.n_iter_))} 次收敛")
+
+    else:
+        raise ValueError(f"模型 {type(model).__name__} 不支持增量训练")
+
+    return candidate
+
+
+def incremental_retrain(
+    new_data_path: str, config: Dict[str, Any], models_dir: str = MODELS_DIR
+) -> Optional[str]:
+    """
+    增量训练：在新数据上继续训练最近保存的模型，验证通过后保存
+
+    Args:
+        new_data_path: 新数据文件路径
+        config: 配置参数
+        models_dir: 模型目录
+
+    Returns:
+        新模型的保存路径，没有可用的模型或新模型未通过验证时返回None
+    """
+    settings = {**DEFAULT_INCREMENTAL_CONFIG, **(config.get("incremental") or {})}
+    metric = config.get("best_model_metric", "roc_auc")
+
+    artifact = find_latest_artifact(models_dir)
+    if artifact is None:
+        logger.error(f"未找到可增量训练的模型: {models_dir}，请先运行完整训练")
+        return None
+    model_path, model_name = artifact
+    logger.info(f"加载最近保存的模型: {model_path}")
+    model = joblib.load(model_path)
+
+    preprocessor_path = os.path.join(PROCESSED_DATA_DIR, "preprocessor.pkl")
+    if not os.path.exists(preprocessor_path):
+        raise FileNotFoundError(f"预处理器文件不存在: {preprocessor_path}")
+    preprocessor = joblib.load(preprocessor_path)
+
+    # 构建推理管道时校验预处理器输出列与原模型一致
+    build_inference_pipeline(preprocessor, model)
+
+    X_new, y_new = transform_new_data(new_data_path, preprocessor)
+    X_fit, X_valid, y_fit, y_valid = train_test_split(
+        X_new, y_new, test_size=settings["validation_fraction"],
+        stratify=y_new, random_state=settings["random_state"]
+    )
+    logger.info(f"新数据: 训练 {X_fit.shape[0]} 行，验证 {X_valid.shape[0]} 行")
+
+    # 不支持热启动的liblinear逻辑回归需要原训练数据
+    history = None
+    if isinstance(model, LogisticRegression) and model.solver == "liblinear":
+        X_old, _, y_old, _ = load_processed_data(PROCESSED_DATA_DIR)
+        history = (X_old, y_old)
+
+    candidate = continue_training(model, X_fit, y_fit, settings, history)
+
+    # 在新数据的验证集上比较新旧模型
+    evaluator = ModelEvaluator(threshold=config.get("evaluation", {}).get("threshold", 0.5))
+    old_metrics = evaluator.evaluate(model, X_valid, y_valid)
+    new_metrics = evaluator.evaluate(candidate, X_valid, y_valid)
+    logger.info(
+        f"验证集 {metric}: 原模型 {old_metrics[metric]:.4f}，增量训练模型 {new_metrics[metric]:.4f}"
+    )
+
+    if new_metrics[metric] < old_metrics[metric] - settings["tolerance"]:
+        logger.warning("增量训练模型未通过验证，保留原模型")
+        return None
+
+    feature_names = list(get_feature_names(preprocessor))
+    new_model_path = save_model(candidate, f"optimized_{model_name}", models_dir, feature_names=feature_names)
+    save_inference_pipeline(build_inference_pipeline(preprocessor, candidate), f"optimized_{model_name}")
+    logger.info(f"增量训练模型已保存到 {new_model_path}")
+    return new_model_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="在新数据上增量训练最近保存的模型")
+    parser.add_argument("--new-data", dest="new_data", type=str, required=True, help="新一期数据文件路径")
+    parser.add_argument(
+        "--config", dest="config_path", type=str,
+        default=os.path.join(PROJECT_ROOT, "configs/default.yaml"),
+        help="配置文件路径"
+    )
+
+    args = parser.parse_args()
+    incremental_retrain(args.new_data, load_config(args.config_path))
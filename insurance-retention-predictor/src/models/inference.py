@@ -0,0 +1,404 @@
+"""
+推理管道模块
+
+该模块将拟合好的预处理器（ColumnTransformer）与训练好的模型打包为单个推理对象，包括：
+- 构建时校验预处理器输出列与模型输入列是否一致
+- 预先计算列索引计划（填充值、缩放参数、独热编码位置、衍生特征转换器）
+- 单条记录的快速预测路径，不构造DataFrame
+- 推理管道的保存与加载
+"""
+
+import os
+import math
+import logging
+import warnings
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from src.data.outliers import OutlierClipper
+from src.data.preprocessing import get_feature_names
+from src.features.creation import DatePartsTransformer, DurationTransformer, RatioTransformer, TenureTransformer
+from src.models.explain import compute_global_importance, save_importance
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# 项目根目录
+PROJECT_ROOT = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), "../.."
+))
+
+# 推理管道保存路径
+PIPELINES_DIR = os.path.join(PROJECT_ROOT, "models/pipelines")
+
+# 快速路径支持的衍生特征转换器
+_DERIVED_TRANSFORMERS = (DatePartsTransformer, TenureTransformer, DurationTransformer, RatioTransformer)
+
+
+def _is_missing(value: Any) -> bool:
+    """判断单个值是否为缺失值"""
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _build_numeric_plan(steps: List[Any], columns: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    为数值列转换器构建计划：异常值截断边界、缺失值填充值和仿射缩放参数
+
+    Args:
+        steps: 转换器步骤列表
+        columns: 输入列名
+
+    Returns:
+        数值列计划，包含不支持的步骤时返回None
+    """
+    n_cols = len(columns)
+    lower = np.full(n_cols, -np.inf)
+    upper = np.full(n_cols, np.inf)
+    fill = np.full(n_cols, np.nan)
+    mean = np.zeros(n_cols)
+    scale = np.ones(n_cols)
+
+    for i, step in enumerate(steps):
+        # 截断只作用于原始取值，必须是第一个步骤
+        if isinstance(step, OutlierClipper) and i == 0:
+            lower = np.asarray(step.lower_, dtype=float)
+            upper = np.asarray(step.upper_, dtype=float)
+        elif isinstance(step, SimpleImputer) and step.strategy in ("mean", "median") and not step.add_indicator:
+            fill = np.asarray(step.statistics_, dtype=float)
+        elif isinstance(step, StandardScaler):
+            if step.with_mean:
+                mean = np.asarray(step.mean_, dtype=float)
+            if step.with_std:
+                scale = np.asarray(step.scale_, dtype=float)
+        else:
+            return None
+
+    return {
+        "kind": "num", "columns": columns, "lower": lower, "upper": upper,
+        "fill": fill, "mean": mean, "scale": scale, "width": n_cols
+    }
+
+
+def _build_derived_plan(steps: List[Any], columns: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    为衍生特征转换器构建计划：先由特征创建转换器计算原始取值，再按数值计划填充和缩放
+
+    Args:
+        steps: 转换器步骤列表，第一个步骤为特征创建转换器
+        columns: 输入列名
+
+    Returns:
+        衍生特征计划，包含不支持的步骤时返回None
+    """
+    if not steps or not isinstance(steps[0], _DERIVED_TRANSFORMERS):
+        return None
+    creator = steps[0]
+    output_columns = [str(col) for col in creator.get_feature_names_out()]
+    step_plan = _build_numeric_plan(steps[1:], output_columns)
+    if step_plan is None:
+        return None
+    step_plan.update(kind="derived", columns=columns, creator=creator)
+    return step_plan
+
+
+def _build_categorical_plan(steps: List[Any], columns: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    为分类列转换器构建计划：缺失值填充值和独热编码位置映射
+
+    Args:
+        steps: 转换器步骤列表
+        columns: 输入列名
+
+    Returns:
+        分类列计划，包含不支持的步骤时返回None
+    """
+    fill = [None] * len(columns)
+    encoder = None
+
+    for step in steps:
+        if isinstance(step, SimpleImputer) and not step.add_indicator:
+            fill = list(step.statistics_)
+        elif isinstance(step, OneHotEncoder) and encoder is None:
+            encoder = step
+        else:
+            return None
+
+    # 只支持忽略未知类别、不丢弃列、不合并低频类别的独热编码
+    if (
+        encoder is None
+        or encoder.handle_unknown != "ignore"
+        or encoder.drop_idx_ is not None
+        or getattr(encoder, "min_frequency", None) is not None
+        or getattr(encoder, "max_categories", None) is not None
+    ):
+        return None
+
+    mappings = []
+    offsets = []
+    width = 0
+    for categories in encoder.categories_:
+        mappings.append({category: i for i, category in enumerate(categories)})
+        offsets.append(width)
+        width += len(categories)
+
+    return {
+        "kind": "cat", "columns": columns, "fill": fill,
+        "mappings": mappings, "offsets": offsets, "width": width
+    }
+
+
+def build_column_plan(preprocessor: Any) -> Optional[List[Dict[str, Any]]]:
+    """
+    根据拟合好的ColumnTransformer预先计算列索引计划
+
+    Args:
+        preprocessor: 拟合好的预处理器
+
+    Returns:
+        每个转换器对应的计划列表，预处理器结构不支持快速路径时返回None
+    """
+    if not isinstance(preprocessor, ColumnTransformer):
+        return None
+
+    plan = []
+    offset = 0
+    for name, transformer, columns in preprocessor.transformers_:
+        if name == "remainder":
+            if transformer == "drop":
+                continue
+            return None
+
+        steps = [step for _, step in transformer.steps] if isinstance(transformer, Pipeline) else [transformer]
+        columns = list(columns)
+
+        step_plan = _build_numeric_plan(steps, columns)
+        if step_plan is None:
+            step_plan = _build_derived_plan(steps, columns)
+        if step_plan is None:
+            step_plan = _build_categorical_plan(steps, columns)
+        if step_plan is None:
+            logger.info(f"转换器 {name} 不支持快速路径，单条预测将使用预处理器")
+            return None
+
+        step_plan["offset"] = offset
+        offset += step_plan["width"]
+        plan.append(step_plan)
+
+    return plan
+
+
+class InferencePipeline:
+    """预处理器与模型的组合推理对象"""
+
+    def __init__(self, preprocessor: Any, model: Any):
+        """
+        Args:
+            preprocessor: 拟合好的ColumnTransformer
+            model: 训练好的模型
+        """
+        self.preprocessor = preprocessor
+        self.model = model
+        self.feature_names = list(get_feature_names(preprocessor))
+        self._check_column_contract()
+
+        self.plan = build_column_plan(preprocessor)
+        self.n_features = len(self.feature_names)
+
+        # 二分类逻辑回归可直接用系数计算概率
+        self._linear = None
+        if isinstance(model, LogisticRegression) and model.coef_.shape[0] == 1:
+            self._linear = (model.coef_[0].astype(float), float(model.intercept_[0]))
+
+    def _check_column_contract(self) -> None:
+        """校验预处理器输出列与模型输入列一致"""
+        n_model_features = getattr(self.model, "n_features_in_", None)
+        if n_model_features is not None and n_model_features != len(self.feature_names):
+            raise ValueError(
+                f"预处理器输出 {len(self.feature_names)} 列，模型需要 {n_model_features} 列"
+            )
+
+        model_feature_names = getattr(self.model, "feature_names_in_", None)
+        if model_feature_names is not None and list(model_feature_names) != self.feature_names:
+            mismatched = [
+                (expected, actual)
+                for expected, actual in zip(model_feature_names, self.feature_names)
+                if expected != actual
+            ]
+            raise ValueError(f"预处理器输出列与模型输入列不一致: {mismatched[:5]}")
+
+    @property
+    def input_columns(self) -> Optional[List[str]]:
+        """预处理器的输入列名"""
+        columns = getattr(self.preprocessor, "feature_names_in_", None)
+        return None if columns is None else list(columns)
+
+    def transform(self, data: pd.DataFrame) -> np.ndarray:
+        """使用预处理器转换批量数据"""
+        return self.preprocessor.transform(data)
+
+    @staticmethod
+    def _fill_and_scale(values: np.ndarray, step_plan: Dict[str, Any]) -> np.ndarray:
+        """按数值计划截断、填充缺失值并缩放"""
+        np.clip(values, step_plan["lower"], step_plan["upper"], out=values)
+        missing = np.isnan(values)
+        values[missing] = step_plan["fill"][missing]
+        return (values - step_plan["mean"]) / step_plan["scale"]
+
+    def transform_record(self, record: Dict[str, Any]) -> np.ndarray:
+        """
+        将单条记录转换为模型输入向量，按列索引计划直接填充，不构造DataFrame
+
+        Args:
+            record: 字段名到取值的字典
+
+        Returns:
+            形状为 (1, n_features) 的特征矩阵
+        """
+        if self.plan is None:
+            # 记录中缺少的字段按缺失值处理，与快速路径一致
+            frame = pd.DataFrame([record])
+            if self.input_columns is not None:
+                frame = frame.reindex(columns=self.input_columns)
+            return self.preprocessor.transform(frame)
+
+        x = np.zeros(self.n_features)
+        for step_plan in self.plan:
+            offset = step_plan["offset"]
+            if step_plan["kind"] == "num":
+                values = np.array(
+                    [np.nan if _is_missing(record.get(col)) else float(record[col]) for col in step_plan["columns"]]
+                )
+                x[offset:offset + step_plan["width"]] = self._fill_and_scale(values, step_plan)
+            elif step_plan["kind"] == "derived":
+                raw = np.array([[record.get(col) for col in step_plan["columns"]]], dtype=object)
+                values = np.asarray(step_plan["creator"].transform(raw), dtype=float).ravel()
+                x[offset:offset + step_plan["width"]] = self._fill_and_scale(values, step_plan)
+            else:
+                for col, fill, mapping, col_offset in zip(
+                    step_plan["columns"], step_plan["fill"], step_plan["mappings"], step_plan["offsets"]
+                ):
+                    value = record.get(col)
+                    if _is_missing(value):
+                        value = fill
+                    index = mapping.get(value)
+                    if index is None:
+                        index = mapping.get(str(value))
+                    # 未知类别对应全零编码
+                    if index is not None:
+                        x[offset + col_offset + index] = 1.0
+
+        return x.reshape(1, -1)
+
+    def predict_proba_transformed(self, X: Any) -> np.ndarray:
+        """
+        对已转换的特征矩阵预测续保概率
+
+        Args:
+            X: 转换后的特征矩阵
+
+        Returns:
+            正类（续保）概率数组
+        """
+        if self._linear is not None and (isinstance(X, np.ndarray) or sp.issparse(X)):
+            coef, intercept = self._linear
+            return 1.0 / (1.0 + np.exp(-(X @ coef + intercept)))
+
+        if not hasattr(self.model, "predict_proba"):
+            return self.model.predict(X)
+
+        # 模型以带列名的DataFrame训练，传入数组时跳过列名校验警告
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", message="X does not have valid feature names")
+            return self.model.predict_proba(X)[:, 1]
+
+    def predict_proba(self, data: pd.DataFrame) -> np.ndarray:
+        """对批量数据预测续保概率"""
+        return self.predict_proba_transformed(self.transform(data))
+
+    def predict_proba_record(self, record: Dict[str, Any]) -> float:
+        """对单条记录预测续保概率"""
+        return float(self.predict_proba_transformed(self.transform_record(record))[0])
+
+
+def build_inference_pipeline(preprocessor: Any, model: Any) -> InferencePipeline:
+    """
+    构建推理管道并校验列约定
+
+    Args:
+        preprocessor: 拟合好的预处理器
+        model: 训练好的模型
+
+    Returns:
+        推理管道对象
+    """
+    pipeline = InferencePipeline(preprocessor, model)
+    logger.info(
+        f"构建推理管道: {pipeline.n_features} 个特征, "
+        f"快速路径: {'启用' if pipeline.plan is not None else '未启用'}"
+    )
+    return pipeline
+
+
+def save_inference_pipeline(pipeline: InferencePipeline, name: str, output_dir: str = PIPELINES_DIR) -> str:
+    """
+    保存推理管道
+
+    Args:
+        pipeline: 推理管道对象
+        name: 管道名称（通常与模型名称一致）
+        output_dir: 输出目录
+
+    Returns:
+        推理管道保存路径
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    pipeline_path = os.path.join(output_dir, f"{name}_{timestamp}.pkl")
+
+    logger.info(f"保存推理管道到 {pipeline_path}")
+    joblib.dump(pipeline, pipeline_path)
+
+    # 预先计算全局特征重要性，Web应用加载时直接读取
+    importance_df = compute_global_importance(pipeline.model, pipeline.feature_names)
+    if importance_df is not None:
+        save_importance(importance_df, pipeline_path)
+
+    return pipeline_path
+
+
+def load_latest_inference_pipeline(pipelines_dir: str = PIPELINES_DIR) -> Optional[InferencePipeline]:
+    """
+    加载最新的推理管道
+
+    Args:
+        pipelines_dir: 推理管道目录
+
+    Returns:
+        推理管道对象，未找到时返回None
+    """
+    if not os.path.isdir(pipelines_dir):
+        return None
+
+    pipeline_files = [f for f in os.listdir(pipelines_dir) if f.endswith(".pkl")]
+    if not pipeline_files:
+        return None
+
+    latest = max(pipeline_files, key=lambda x: os.path.getmtime(os.path.join(pipelines_dir, x)))
+    pipeline_path = os.path.join(pipelines_dir, latest)
+    logger.info(f"加载推理管道：{pipeline_path}")
+    return joblib.load(pipeline_path)
@@ -0,0 +1,343 @@
+"""
+外存训练模块
+
+该模块在无法一次读入内存的数据上训练模型，包括：
+- 流式拟合预处理器，并将转换后的训练集和测试集逐块写入磁盘
+- SGDClassifier：按数据块调用 partial_fit，多轮遍历训练数据，类别权重由流式统计的标签分布计算
+- XGBoost：通过 DataIter 按数据块读取，构建外存 DMatrix（缓存写入磁盘），使用hist算法训练
+- LightGBM：直接从转换后的CSV文件构建 Dataset（two_round 加载，不把整个文件读入内存）
+- 按数据块在测试集上评估，保存模型和推理管道
+"""
+
+import os
+import sys
+import json
+import shutil
+import logging
+import argparse
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import joblib
+import lightgbm as lgb
+import numpy as np
+import xgboost as xgb
+from sklearn.linear_model import SGDClassifier
+
+# 添加项目根目录到系统路径，以便以脚本方式运行时导入src包
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from src.data.preprocessing import PROCESSED_DATA_DIR, get_feature_names
+from src.data.storage import detect_format, iter_frame_chunks, with_format
+from src.data.streaming_preprocessing import (
+    DEFAULT_CHUNK_SIZE, DEFAULT_SAMPLE_SIZE, fit_preprocessor_streaming, transform_streaming
+)
+from src.evaluation.metrics import classification_metrics, predict_scores
+from src.models.inference import build_inference_pipeline, save_inference_pipeline
+from src.models.train_model import PROJECT_ROOT, load_config, save_model
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# 外存训练的中间数据目录
+OUT_OF_CORE_DIR = os.path.join(PROCESSED_DATA_DIR, "out_of_core")
+
+OUT_OF_CORE_MODELS = ("sgd", "xgboost", "lightgbm")
+
+
+def iter_xy_chunks(path: str, chunk_size: int) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    分块读取转换后的数据
+
+    Args:
+        path: 转换后的数据文件（特征列之后为目标变量Renewed）
+        chunk_size: 每个数据块的行数
+
+    Returns:
+        (特征, 标签) 数据块迭代器，特征为float32数组
+    """
+    for chunk in iter_frame_chunks(path, chunk_size):
+        y = chunk.pop("Renewed").to_numpy()
+        yield chunk.to_numpy(dtype=np.float32), y
+
+
+def balanced_class_weights(label_counts: Dict[int, int]) -> Dict[int, float]:
+    """按标签分布计算与 class_weight='balanced' 相同的类别权重"""
+    total = sum(label_counts.values())
+    return {label: total / (len(label_counts) * count) for label, count in label_counts.items()}
+
+
+def train_sgd(
+    train_path: str, params: Dict[str, Any], label_counts: Dict[int, int],
+    chunk_size: int = DEFAULT_CHUNK_SIZE, epochs: int = 3
+) -> SGDClassifier:
+    """
+    按数据块增量训练SGD逻辑回归
+
+    Args:
+        train_path: 转换后的训练集文件
+        params: SGDClassifier参数（class_weight为balanced时按标签分布计算样本权重）
+        label_counts: 训练集标签分布
+        chunk_size: 每个数据块的行数
+        epochs: 遍历训练数据的轮数
+
+    Returns:
+        训练好的SGDClassifier
+    """
+    params = dict(params)
+    class_weight = params.pop("class_weight", None)
+    weights = balanced_class_weights(label_counts) if class_weight == "balanced" else class_weight
+    classes = np.array(sorted(label_counts))
+
+    model = SGDClassifier(**{"loss": "log_loss", **params})
+    for epoch in range(epochs):
+        for X, y in iter_xy_chunks(train_path, chunk_size):
+            sample_weight = None if weights is None else np.vectorize(weights.get)(y)
+            model.partial_fit(X, y, classes=classes, sample_weight=sample_weight)
+        logger.info(f"SGD 完成第 {epoch + 1}/{epochs} 轮遍历")
+    return model
+
+
+class ChunkDataIter(xgb.DataIter):
+    """按数据块向XGBoost提供训练数据的迭代器"""
+
+    def __init__(self, path: str, chunk_size: int, cache_dir: str):
+        """
+        Args:
+            path: 转换后的训练集文件
+            chunk_size: 每个数据块的行数
+            cache_dir: 外存DMatrix缓存目录
+        """
+        self.path = path
+        self.chunk_size = chunk_size
+        self._chunks: Optional[Iterator[Tuple[np.ndarray, np.ndarray]]] = None
+        super().__init__(cache_prefix=os.path.join(cache_dir, "dtrain"))
+
+    def next(self, input_data: Any) -> bool:
+        """读取下一个数据块，没有更多数据时返回False"""
+        if self._chunks is None:
+            self._chunks = iter_xy_chunks(self.path, self.chunk_size)
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            return False
+        X, y = chunk
+        input_data(data=X, label=y)
+        return True
+
+    def reset(self) -> None:
+        """回到第一个数据块"""
+        self._chunks = None
+
+
+def train_xgboost(
+    train_path: str, params: Dict[str, Any], feature_names: List[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> xgb.XGBClassifier:
+    """
+    使用外存DMatrix训练XGBoost
+
+    Args:
+        train_path: 转换后的训练集文件
+        params: XGBClassifier参数（n_estimators为提升轮数）
+        feature_names: 特征名称
+        chunk_size: 每个数据块的行数
+
+    Returns:
+        训练好的XGBClassifier
+    """
+    params = dict(params)
+    num_boost_round = params.pop("n_estimators", 100)
+    params.setdefault("objective", "binary:logistic")
+    params["tree_method"] = "hist"
+    if "random_state" in params:
+        params["seed"] = params.pop("random_state")
+
+    cache_dir = tempfile.mkdtemp(prefix="xgb_cache_")
+    try:
+        dtrain = xgb.DMatrix(ChunkDataIter(train_path, chunk_size, cache_dir), feature_names=feature_names)
+        booster = xgb.train(params, dtrain, num_boost_round=num_boost_round)
+        # 先释放DMatrix，由XGBoost删除自己的缓存文件
+        del dtrain
+
+        # 转换为sklearn接口的模型，与其他训练流程保存的模型一致
+        model_file = os.path.join(cache_dir, "model.json")
+        booster.save_model(model_file)
+        model = xgb.XGBClassifier()
+        model.load_model(model_file)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return model
+
+
+class LightGBMBoosterClassifier:
+    """LightGBM Booster的分类器包装，提供与sklearn模型一致的预测接口"""
+
+    def __init__(self, booster: lgb.Booster):
+        """
+        Args:
+            booster: 训练好的LightGBM Booster
+        """
+        self.booster_ = booster
+        self.classes_ = np.array([0, 1])
+        self.feature_names_in_ = np.array(booster.feature_name(), dtype=object)
+        self.n_features_in_ = booster.num_feature()
+
+    @property
+    def feature_importances_(self) -> np.ndarray:
+        """按分裂增益计算的特征重要性"""
+        return self.booster_.feature_importance(importance_type="gain")
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        """预测各类别概率"""
+        positive = self.booster_.predict(X)
+        return np.column_stack([1 - positive, positive])
+
+    def predict(self, X: Any) -> np.ndarray:
+        """预测类别"""
+        return (self.booster_.predict(X) >= 0.5).astype(int)
+
+    def get_params(self, deep: bool = True) -> Dict[str, Any]:
+        """模型参数"""
+        return dict(self.booster_.params)
+
+
+def train_lightgbm(
+    train_path: str, params: Dict[str, Any], feature_names: List[str]
+) -> LightGBMBoosterClassifier:
+    """
+    从转换后的CSV文件直接构建Dataset并训练LightGBM
+
+    Args:
+        train_path: 转换后的训练集CSV文件
+        params: LightGBM参数（n_estimators为提升轮数）
+        feature_names: 特征名称
+
+    Returns:
+        训练好的模型
+    """
+    if detect_format(train_path) != "csv":
+        raise ValueError("LightGBM从文件构建Dataset需要CSV格式的训练数据")
+
+    params = dict(params)
+    num_boost_round = params.pop("n_estimators", 100)
+    params.setdefault("objective", "binary")
+    params.setdefault("verbose", -1)
+    if params.pop("class_weight", None) == "balanced":
+        params["is_unbalance"] = True
+
+    # two_round：先扫描文件确定分箱，再逐行加载，不把整个文本文件读入内存
+    dtrain = lgb.Dataset(
+        train_path,
+        params={"header": True, "label_column": "name:Renewed", "two_round": True},
+        feature_name=feature_names
+    )
+    booster = lgb.train(params, dtrain, num_boost_round=num_boost_round)
+    return LightGBMBoosterClassifier(booster)
+
+
+def evaluate_streaming(
+    model: Any, test_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, threshold: float = 0.5
+) -> Dict[str, float]:
+    """
+    按数据块在测试集上评估模型，只保留每行的预测概率
+
+    Args:
+        model: 训练好的模型
+        test_path: 转换后的测试集文件
+        chunk_size: 每个数据块的行数
+        threshold: 判定续保的概率阈值
+
+    Returns:
+        评估指标字典
+    """
+    scores, labels = [], []
+    for X, y in iter_xy_chunks(test_path, chunk_size):
+        scores.append(predict_scores(model, X))
+        labels.append(y)
+
+    scores = np.concatenate(scores)
+    y_true = np.concatenate(labels)
+    return classification_metrics(y_true, (scores >= threshold).astype(int), scores)
+
+
+def train_out_of_core(input_path: str, config: Dict[str, Any], output_dir: str = OUT_OF_CORE_DIR) -> str:
+    """
+    外存训练完整流程：流式拟合预处理器、逐块转换写入磁盘、增量或外存训练、按块评估并保存
+
+    Args:
+        input_path: 原始数据文件路径
+        config: 配置参数（out_of_core 部分）
+        output_dir: 中间数据目录
+
+    Returns:
+        模型保存路径
+    """
+    settings = config.get("out_of_core") or {}
+    model_name = settings.get("model", "sgd")
+    if model_name not in OUT_OF_CORE_MODELS:
+        raise ValueError(f"不支持的外存训练模型: {model_name}，可选: {', '.join(OUT_OF_CORE_MODELS)}")
+
+    chunk_size = settings.get("chunk_size", DEFAULT_CHUNK_SIZE)
+    test_size = settings.get("test_size", 0.2)
+    random_state = settings.get("random_state", 42)
+    fmt = settings.get("format", "csv")
+    params = (settings.get("params") or {}).get(model_name) or {}
+
+    # 流式拟合预处理器
+    preprocessor, summary = fit_preprocessor_streaming(
+        input_path, chunk_size, test_size, random_state,
+        settings.get("sample_size", DEFAULT_SAMPLE_SIZE)
+    )
+    os.makedirs(output_dir, exist_ok=True)
+    preprocessor_path = os.path.join(output_dir, "preprocessor.pkl")
+    joblib.dump(preprocessor, preprocessor_path)
+    feature_names = list(get_feature_names(preprocessor))
+
+    # 逐块转换并写入磁盘
+    train_path = with_format(os.path.join(output_dir, "train"), fmt)
+    test_path = with_format(os.path.join(output_dir, "test"), fmt)
+    transform_streaming(input_path, preprocessor, train_path, test_path, chunk_size, test_size, random_state)
+
+    # 训练
+    logger.info(f"外存训练模型: {model_name}")
+    if model_name == "sgd":
+        model = train_sgd(train_path, params, summary["label_counts"], chunk_size, settings.get("epochs", 3))
+    elif model_name == "xgboost":
+        model = train_xgboost(train_path, params, feature_names, chunk_size)
+    else:
+        model = train_lightgbm(train_path, params, feature_names)
+
+    # 评估
+    threshold = config.get("evaluation", {}).get("threshold", 0.5)
+    metrics = evaluate_streaming(model, test_path, chunk_size, threshold)
+    logger.info("外存训练模型评估结果:")
+    for metric_name, value in metrics.items():
+        logger.info(f"  {metric_name}: {value:.4f}")
+
+    # 保存模型和推理管道
+    model_path = save_model(model, f"out_of_core_{model_name}", feature_names=feature_names)
+    with open(os.path.join(output_dir, "metrics.json"), "w", encoding="utf-8") as file:
+        json.dump({"model_path": model_path, "train_rows": summary["n_train"], **metrics}, file, ensure_ascii=False)
+    save_inference_pipeline(build_inference_pipeline(preprocessor, model), f"out_of_core_{model_name}")
+    return model_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="在超出内存的数据上训练保险续保预测模型")
+    parser.add_argument("--input", type=str, required=True, help="原始数据文件路径（CSV、Parquet或Feather）")
+    parser.add_argument(
+        "--config", dest="config_path", type=str,
+        default=os.path.join(PROJECT_ROOT, "configs/default.yaml"),
+        help="配置文件路径"
+    )
+    parser.add_argument("--model", type=str, choices=OUT_OF_CORE_MODELS, help="覆盖配置中的外存训练模型")
+
+    args = parser.parse_args()
+    config = load_config(args.config_path)
+    if args.model:
+        config.setdefault("out_of_core", {})["model"] = args.model
+    train_out_of_core(args.input, config)
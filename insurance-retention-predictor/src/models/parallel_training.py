@@ -0,0 +1,195 @@
+"""
+并行模型训练模块
+
+该模块在CPU预算内并发训练多个模型，包括：
+- 根据模型的 n_jobs 参数区分多线程模型和单线程模型
+- 按CPU预算调度：单线程模型各占一个核，多线程模型分配剩余的核，总线程数不超过预算
+- 每个模型在独立的工作进程中训练，支持fork时训练数据由子进程直接继承，不重新序列化
+- 记录每个模型的墙钟时间和CPU时间（包括模型内部线程的CPU时间）
+- 提升树模型按早停设置在验证集上早停
+"""
+
+import os
+import time
+import logging
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.models.early_stopping import fit_estimator
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# 工作进程中的训练数据
+_worker_data = None
+
+
+def resolve_cpu_budget(cpu_budget: Optional[int] = None) -> int:
+    """
+    确定CPU预算
+
+    Args:
+        cpu_budget: 配置的CPU核数，为空或非正数时使用全部CPU核
+
+    Returns:
+        可用的CPU核数
+    """
+    n_cpus = os.cpu_count() or 1
+    if cpu_budget is None or cpu_budget <= 0:
+        return n_cpus
+    return min(cpu_budget, n_cpus)
+
+
+def requested_threads(estimator: Any, cpu_budget: int) -> Optional[int]:
+    """
+    模型希望使用的线程数
+
+    Args:
+        estimator: 未训练的模型
+        cpu_budget: CPU预算
+
+    Returns:
+        多线程模型返回希望使用的线程数（不超过预算），单线程模型返回None
+    """
+    n_jobs = estimator.get_params().get("n_jobs")
+    if n_jobs is None or n_jobs == 1:
+        return None
+    if n_jobs < 0:
+        # 与joblib一致：-1 表示全部核，-2 表示保留一个核，以此类推
+        n_jobs = cpu_budget + 1 + n_jobs
+    return max(1, min(n_jobs, cpu_budget))
+
+
+def _init_worker(X: Any, y: Any) -> None:
+    """工作进程初始化：保存训练数据，每个进程只接收一次"""
+    global _worker_data
+    _worker_data = (X, y)
+
+
+def _fit_in_worker(
+    name: str, estimator: Any, n_threads: Optional[int],
+    early_stopping: Optional[Dict[str, Any]] = None
+) -> Tuple[str, Any, float, float]:
+    """
+    在工作进程中训练一个模型
+
+    Args:
+        name: 模型名称
+        estimator: 未训练的模型
+        n_threads: 分配的线程数，单线程模型为None
+        early_stopping: 早停设置
+
+    Returns:
+        模型名称、训练好的模型、墙钟时间和CPU时间（秒）
+    """
+    X, y = _worker_data
+    original_n_jobs = estimator.get_params().get("n_jobs")
+    if n_threads is not None:
+        estimator.set_params(n_jobs=n_threads)
+
+    # 同一时刻每个工作进程只训练一个模型，进程CPU时间的差值即为该模型的CPU时间
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    fit_estimator(estimator, X, y, early_stopping)
+    wall_time = time.perf_counter() - start_wall
+    cpu_time = time.process_time() - start_cpu
+
+    # 训练时的线程数只适用于并发训练，恢复配置中的值供后续预测使用
+    if n_threads is not None:
+        estimator.set_params(n_jobs=original_n_jobs)
+    return name, estimator, wall_time, cpu_time
+
+
+def _mp_context() -> multiprocessing.context.BaseContext:
+    """优先使用fork启动工作进程，训练数据由子进程直接继承"""
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def train_in_parallel(
+    estimators: Dict[str, Any], X: Any, y: Any, cpu_budget: Optional[int] = None,
+    early_stopping: Optional[Dict[str, Any]] = None
+) -> Tuple[Dict[str, Any], Dict[str, Dict[str, float]]]:
+    """
+    在CPU预算内并发训练多个模型
+
+    调度规则：单线程模型优先启动，各占一个核；多线程模型在空闲核数达到其需求
+    （或预算的一半）时启动，线程数取需求与空闲核数的较小值；任意时刻分配的线程总数不超过预算。
+
+    Args:
+        estimators: 模型名称到未训练模型的字典
+        X: 训练特征
+        y: 训练标签
+        cpu_budget: CPU核数预算，默认使用全部CPU核
+        early_stopping: 提升树模型的早停设置
+
+    Returns:
+        训练好的模型字典，以及每个模型的墙钟时间、CPU时间和分配线程数
+    """
+    budget = resolve_cpu_budget(cpu_budget)
+    pending: List[Tuple[str, Any, Optional[int]]] = [
+        (name, estimator, requested_threads(estimator, budget))
+        for name, estimator in estimators.items()
+    ]
+    # 单线程模型先启动，多线程模型按需求从小到大排列
+    pending.sort(key=lambda task: 0 if task[2] is None else task[2])
+
+    logger.info(f"并行训练 {len(pending)} 个模型，CPU预算: {budget} 核")
+    start_time = time.perf_counter()
+
+    models: Dict[str, Any] = {}
+    timings: Dict[str, Dict[str, float]] = {}
+    running: Dict[Future, Tuple[str, int]] = {}
+    free = budget
+
+    with ProcessPoolExecutor(
+        max_workers=max(1, min(len(pending), budget)),
+        mp_context=_mp_context(),
+        initializer=_init_worker,
+        initargs=(X, y)
+    ) as executor:
+        while pending or running:
+            # 启动空闲核数允许的任务
+            while pending:
+                name, estimator, wanted = pending[0]
+                if wanted is None:
+                    granted = 1 if free >= 1 else 0
+                else:
+                    minimum = min(wanted, max(1, budget // 2))
+                    granted = min(wanted, free) if free >= minimum or not running else 0
+                if granted == 0:
+                    break
+
+                pending.pop(0)
+                free -= granted
+                future = executor.submit(
+                    _fit_in_worker, name, estimator, None if wanted is None else granted, early_stopping
+                )
+                running[future] = (name, granted)
+                logger.info(f"开始训练 {name}，分配 {granted} 个线程，剩余空闲核: {free}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, granted = running.pop(future)
+                free += granted
+                name, model, wall_time, cpu_time = future.result()
+                models[name] = model
+                timings[name] = {"wall_time": wall_time, "cpu_time": cpu_time, "threads": granted}
+                logger.info(f"完成训练 {name}，墙钟时间: {wall_time:.2f} 秒，CPU时间: {cpu_time:.2f} 秒")
+
+    total_wall = time.perf_counter() - start_time
+    sequential_wall = sum(timing["wall_time"] for timing in timings.values())
+    logger.info(
+        f"并行训练完成，总墙钟时间: {total_wall:.2f} 秒，"
+        f"各模型墙钟时间之和: {sequential_wall:.2f} 秒"
+    )
+
+    # 保持与配置中一致的模型顺序
+    ordered = {name: models[name] for name in estimators}
+    return ordered, {name: timings[name] for name in estimators}
@@ -0,0 +1,340 @@
+"""
+流水线运行模块
+
+该模块将预处理和训练组织为一个有向无环图，逐阶段运行并缓存每个阶段的输出，包括：
+- 阶段：load → clean → split → transform → train:<模型> → evaluate:<模型> → optimize → save，
+  训练和评估按模型展开为独立的阶段
+- 每个阶段的缓存键由上游阶段的缓存键和该阶段用到的配置项（configs/default.yaml 中的对应部分）计算，
+  原始数据文件以内容哈希参与 load 阶段的缓存键
+- 只修改某个模型的参数时，只重新训练和评估该模型；最佳模型及其搜索设置不变时，优化和保存阶段直接使用缓存
+- 缓存未命中的模型在 training.cpu_budget 的预算内并发训练；可强制重新运行指定阶段，其下游阶段随之重新运行
+- 保存阶段写出处理后的数据、预处理器、最佳模型和推理管道，供预测、增量训练和Web应用使用
+"""
+
+import os
+import sys
+import json
+import hashlib
+import logging
+import argparse
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence
+
+# 添加项目根目录到系统路径，以便以脚本方式运行时导入src包
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from src.data.ingestion import file_hash
+from src.data.preprocessing import (
+    clean_data, fit_transform_features, get_feature_names, load_data, save_processed_data, split_data
+)
+from src.data.transform_cache import load_entry, save_entry
+from src.evaluation.metrics import ModelEvaluator
+from src.models.early_stopping import best_iteration
+from src.models.inference import build_inference_pipeline, save_inference_pipeline
+from src.models.train_model import (
+    PROJECT_ROOT, find_best_model, load_config, log_to_mlflow, optimize_best_model,
+    plot_model_comparison, save_model, train_models
+)
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# 流水线缓存格式版本，阶段的实现或输出结构变化时递增，使旧缓存项失效
+PIPELINE_VERSION = 1
+
+# 默认流水线设置
+DEFAULT_PIPELINE_CONFIG = {
+    "raw_data": "data/raw/insurance_data.csv",
+    "test_size": 0.2,
+    "random_state": 42,
+    "sparse": False,
+    "clip_strategy": None,
+    "cache_dir": "data/cache/pipeline",
+}
+
+
+class PipelineRunner:
+    """按有向无环图运行流水线阶段，阶段输出按缓存键保存，缓存命中时跳过该阶段"""
+
+    def __init__(self, config: Dict[str, Any], force: Iterable[str] = ()):
+        """
+        Args:
+            config: 配置参数
+            force: 强制重新运行的阶段（阶段名称或前缀，如 train 表示所有模型的训练阶段），
+                其下游阶段随之重新运行
+        """
+        self.config = config
+        self.settings = {**DEFAULT_PIPELINE_CONFIG, **(config.get("pipeline") or {})}
+        self.cache_dir = os.path.join(PROJECT_ROOT, self.settings["cache_dir"])
+        self.force = set(force)
+        self.keys: Dict[str, str] = {}
+        self.inputs: Dict[str, Sequence[str]] = {}
+        self.status: Dict[str, str] = {}
+
+    def _config_section(self, path: str) -> Any:
+        """按点分路径读取配置项，如 models.xgboost"""
+        if path.startswith("pipeline."):
+            return self.settings.get(path.split(".", 1)[1])
+        value: Any = self.config
+        for part in path.split("."):
+            if not isinstance(value, dict):
+                return None
+            value = value.get(part)
+        return value
+
+    def stage_key(
+        self, stage: str, inputs: Sequence[str] = (), config_paths: Sequence[str] = (), extra: Any = None
+    ) -> str:
+        """
+        计算阶段的缓存键：上游阶段的缓存键、用到的配置项和额外输入
+
+        Args:
+            stage: 阶段名称
+            inputs: 上游阶段名称
+            config_paths: 用到的配置项路径
+            extra: 额外输入（如原始数据文件的内容哈希）
+
+        Returns:
+            缓存键
+        """
+        payload = {
+            "stage": stage,
+            "version": PIPELINE_VERSION,
+            "inputs": {name: self.keys[name] for name in inputs},
+            "config": {path: self._config_section(path) for path in config_paths},
+            "extra": extra,
+        }
+        encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        key = hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+        self.keys[stage] = key
+        self.inputs[stage] = list(inputs)
+        return key
+
+    def _stage_dir(self, stage: str) -> str:
+        return os.path.join(self.cache_dir, stage.replace(":", "_"))
+
+    def _is_forced(self, stage: str) -> bool:
+        """强制运行的阶段，以及上游阶段在本次运行中重新执行过的阶段（上游输出可能已变化）"""
+        if stage in self.force or stage.split(":")[0] in self.force:
+            return True
+        return any(self.status.get(name) == "executed" for name in self.inputs.get(stage, ()))
+
+    def lookup(self, stage: str, validate: Optional[Callable[[Any], bool]] = None) -> Optional[Any]:
+        """读取阶段的缓存输出，强制运行、未命中或校验失败时返回None"""
+        if self._is_forced(stage):
+            return None
+        cached = load_entry(self.keys[stage], self._stage_dir(stage))
+        if cached is None or (validate is not None and not validate(cached)):
+            return None
+        self.status[stage] = "cached"
+        logger.info(f"阶段 {stage}: 使用缓存 ({self.keys[stage][:12]})")
+        return cached
+
+    def store(self, stage: str, value: Any) -> Any:
+        """保存阶段输出"""
+        save_entry(self.keys[stage], value, self._stage_dir(stage))
+        self.status[stage] = "executed"
+        return value
+
+    def run_stage(
+        self, stage: str, func: Callable[[], Any], inputs: Sequence[str] = (),
+        config_paths: Sequence[str] = (), extra: Any = None,
+        validate: Optional[Callable[[Any], bool]] = None
+    ) -> Any:
+        """
+        运行单个阶段：缓存命中时直接返回缓存输出，否则执行并保存输出
+
+        Args:
+            stage: 阶段名称
+            func: 阶段函数（无参数，上游输出通过闭包传入）
+            inputs: 上游阶段名称
+            config_paths: 用到的配置项路径
+            extra: 额外输入
+            validate: 缓存输出的校验函数，返回False时重新运行
+
+        Returns:
+            阶段输出
+        """
+        self.stage_key(stage, inputs, config_paths, extra)
+        cached = self.lookup(stage, validate)
+        if cached is not None:
+            return cached
+        logger.info(f"阶段 {stage}: 运行")
+        return self.store(stage, func())
+
+    def _train_stages(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """每个启用的模型一个训练阶段，缓存未命中的模型一起（按配置并发）训练"""
+        models, missing = {}, []
+        for name, model_config in self.config["models"].items():
+            if not model_config.get("enabled", True):
+                logger.info(f"跳过未启用的模型: {name}")
+                continue
+            stage = f"train:{name}"
+            self.stage_key(stage, ["transform"], [f"models.{name}", "training.early_stopping"])
+            cached = self.lookup(stage)
+            if cached is not None:
+                models[name] = cached
+            else:
+                missing.append(name)
+
+        if missing:
+            logger.info(f"阶段 train: 训练 {', '.join(missing)}")
+            trained = train_models(
+                data["X_train"], data["y_train"],
+                {**self.config, "models": {name: self.config["models"][name] for name in missing}}
+            )
+            for name, model in trained.items():
+                models[name] = self.store(f"train:{name}", model)
+        return models
+
+    def run(self) -> Dict[str, Any]:
+        """
+        运行完整流水线
+
+        Returns:
+            最佳模型名称、优化后的评估指标、模型保存路径和各阶段的运行状态
+        """
+        start_time = datetime.now()
+        raw_path = os.path.join(PROJECT_ROOT, self.settings["raw_data"])
+        if not os.path.exists(raw_path):
+            raise FileNotFoundError(f"原始数据文件不存在: {raw_path}")
+        clip_strategy = self.settings["clip_strategy"]
+
+        raw = self.run_stage(
+            "load", lambda: load_data(raw_path),
+            config_paths=["pipeline.raw_data"], extra=file_hash(raw_path)
+        )
+
+        # 指定截断策略时截断在预处理器中学习（见 preprocessing.main），清洗阶段不再截断
+        cleaned = self.run_stage(
+            "clean",
+            lambda: clean_data(raw) if clip_strategy is None else clean_data(raw, clip_strategy=None),
+            inputs=["load"], config_paths=["pipeline.clip_strategy"]
+        )
+
+        split = self.run_stage(
+            "split",
+            lambda: dict(zip(("X_train", "X_test", "y_train", "y_test"), split_data(
+                cleaned, self.settings["test_size"], self.settings["random_state"]
+            ))),
+            inputs=["clean"], config_paths=["pipeline.test_size", "pipeline.random_state"]
+        )
+
+        def transform() -> Dict[str, Any]:
+            X_train, X_test, preprocessor = fit_transform_features(
+                split["X_train"], split["X_test"], sparse=self.settings["sparse"], clip_strategy=clip_strategy
+            )
+            return {
+                "X_train": X_train, "X_test": X_test,
+                "y_train": split["y_train"], "y_test": split["y_test"],
+                "preprocessor": preprocessor,
+            }
+
+        data = self.run_stage(
+            "transform", transform,
+            inputs=["split"], config_paths=["pipeline.sparse", "pipeline.clip_strategy"]
+        )
+
+        models = self._train_stages(data)
+
+        evaluator = ModelEvaluator(threshold=self.config.get("evaluation", {}).get("threshold", 0.5))
+        evaluation_results = {
+            name: self.run_stage(
+                f"evaluate:{name}", lambda model=model: evaluator.evaluate(model, data["X_test"], data["y_test"]),
+                inputs=[f"train:{name}"], config_paths=["evaluation"]
+            )
+            for name, model in models.items()
+        }
+        if any(self.status.get(f"evaluate:{name}") == "executed" for name in evaluation_results):
+            plot_model_comparison(evaluation_results, os.path.join(PROJECT_ROOT, "reports/figures"))
+
+        best_model_name = find_best_model(evaluation_results, self.config.get("best_model_metric", "roc_auc"))
+
+        def optimize() -> Dict[str, Any]:
+            model = optimize_best_model(
+                data["X_train"], data["y_train"], data["X_test"], data["y_test"],
+                best_model_name, self.config, evaluator, base_model=models[best_model_name]
+            )
+            return {"model": model, "metrics": evaluator.evaluate(model, data["X_test"], data["y_test"])}
+
+        optimized = self.run_stage(
+            "optimize", optimize,
+            inputs=["transform", f"train:{best_model_name}"],
+            config_paths=[
+                "hyperparameter_search", f"hyperparameters.{best_model_name}",
+                f"models.{best_model_name}", "training.early_stopping", "evaluation"
+            ],
+            extra=best_model_name
+        )
+
+        def save() -> Dict[str, Any]:
+            save_processed_data(
+                data["X_train"], data["X_test"], data["y_train"], data["y_test"], data["preprocessor"]
+            )
+            model = optimized["model"]
+            feature_names = list(get_feature_names(data["preprocessor"]))
+            model_path = save_model(model, f"optimized_{best_model_name}", feature_names=feature_names)
+            pipeline = build_inference_pipeline(data["preprocessor"], model)
+            save_inference_pipeline(pipeline, f"optimized_{best_model_name}")
+
+            if self.config.get("use_mlflow", False):
+                params = model.get_params()
+                n_iterations = best_iteration(model)
+                if n_iterations is not None:
+                    params["best_iteration"] = n_iterations
+                log_to_mlflow(model, best_model_name, optimized["metrics"], params)
+            return {"model_path": model_path}
+
+        # 保存的模型文件被删除时重新保存
+        saved = self.run_stage(
+            "save", save, inputs=["optimize"], config_paths=["use_mlflow"],
+            validate=lambda value: os.path.exists(value["model_path"])
+        )
+
+        executed = [stage for stage, state in self.status.items() if state == "executed"]
+        cached = [stage for stage, state in self.status.items() if state == "cached"]
+        logger.info(f"流水线完成，耗时: {datetime.now() - start_time}")
+        logger.info(f"  运行的阶段: {', '.join(executed) or '无'}")
+        logger.info(f"  使用缓存的阶段: {', '.join(cached) or '无'}")
+        logger.info(f"最佳优化模型: {best_model_name}，已保存到 {saved['model_path']}")
+
+        return {
+            "best_model": best_model_name,
+            "metrics": optimized["metrics"],
+            "model_path": saved["model_path"],
+            "stages": dict(self.status),
+        }
+
+
+def run_pipeline(config_path: str, force: Iterable[str] = ()) -> Dict[str, Any]:
+    """
+    按配置运行流水线
+
+    Args:
+        config_path: 配置文件路径
+        force: 强制重新运行的阶段
+
+    Returns:
+        流水线运行结果
+    """
+    return PipelineRunner(load_config(config_path), force=force).run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="运行保险续保预测流水线（带阶段缓存）")
+    parser.add_argument(
+        "--config", dest="config_path", type=str,
+        default=os.path.join(PROJECT_ROOT, "configs/default.yaml"),
+        help="配置文件路径"
+    )
+    parser.add_argument(
+        "--force", type=str, default="",
+        help="强制重新运行的阶段，逗号分隔（如 train:xgboost；train 表示所有模型的训练阶段），下游阶段随之重新运行"
+    )
+
+    args = parser.parse_args()
+    run_pipeline(args.config_path, force=[stage for stage in args.force.split(",") if stage])
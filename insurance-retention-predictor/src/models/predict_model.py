@@ -0,0 +1,403 @@
+"""
+模型预测模块
+
+该模块负责使用训练好的模型对客户数据进行批量评分，包括：
+- 按固定大小分块读取输入文件（CSV/Excel）
+- 对每个数据块进行预处理和预测
+- 将结果追加写入输出文件，峰值内存只与块大小相关
+- 统计评分吞吐量（行/秒）
+- 命令行离线评分：将输入文件切分为分片，使用多进程并行评分后按顺序合并
+"""
+
+import os
+import sys
+import time
+import shutil
+import logging
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import joblib
+import pandas as pd
+
+# 添加项目根目录到系统路径，以便以脚本方式运行时导入src包
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from src.data.ingestion import iter_excel_chunks
+from src.data.storage import FORMAT_EXTENSIONS, FrameWriter, detect_format, iter_frame_chunks, read_frame
+from src.evaluation.batch_summary import BatchSummary
+from src.models.explain import explain_batch
+from src.models.inference import PIPELINES_DIR, InferencePipeline
+from src.models.registry import ModelRegistry
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# 项目根目录
+PROJECT_ROOT = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), "../.."
+))
+
+# 模型和预处理器路径
+MODELS_DIR = os.path.join(PROJECT_ROOT, "models")
+PREPROCESSOR_PATH = os.path.join(PROJECT_ROOT, "data/processed/preprocessor.pkl")
+
+# 默认每个数据块的行数
+DEFAULT_CHUNK_SIZE = 50000
+
+# 多进程评分时每个工作进程持有的模型和预处理器
+_worker_model = None
+_worker_preprocessor = None
+
+
+def find_latest_model_path(
+    models_dir: str = MODELS_DIR, preprocessor_path: str = PREPROCESSOR_PATH,
+    pipelines_dir: str = PIPELINES_DIR
+) -> Optional[str]:
+    """
+    查找最新的推理管道或模型文件，与Web应用模型注册表的选择一致
+
+    Args:
+        models_dir: 模型目录
+        preprocessor_path: 预处理器文件路径（模型文件需要与之配对）
+        pipelines_dir: 推理管道目录
+
+    Returns:
+        最新的推理管道或模型文件路径，未找到时返回None
+    """
+    latest = ModelRegistry(models_dir, preprocessor_path, pipelines_dir).latest_artifact()
+    return None if latest is None else latest[1]
+
+
+def iter_input_chunks(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    按固定大小分块读取输入文件
+
+    Args:
+        file_path: 输入文件路径（CSV、Parquet、Feather、npz或Excel）
+        chunk_size: 每个数据块的行数
+
+    Returns:
+        数据块迭代器
+    """
+    if chunk_size <= 0:
+        raise ValueError(f"块大小必须为正整数: {chunk_size}")
+
+    if file_path.endswith(".xlsx"):
+        yield from iter_excel_chunks(file_path, chunk_size)
+    elif file_path.endswith(tuple(FORMAT_EXTENSIONS.values())):
+        yield from iter_frame_chunks(file_path, chunk_size)
+    else:
+        raise ValueError(f"不支持的文件类型: {file_path}")
+
+
+def score_chunk(
+    chunk: pd.DataFrame, model: Any, preprocessor: Any, threshold: float = 0.5,
+    explainer: Any = None, feature_names: Optional[List[str]] = None, top_k: int = 3
+) -> pd.DataFrame:
+    """
+    对单个数据块进行预处理和预测
+
+    Args:
+        chunk: 原始数据块
+        model: 训练好的模型
+        preprocessor: 拟合好的预处理器
+        threshold: 判定续保的概率阈值
+        explainer: SHAP解释器，提供时为每行附加主要影响因素
+        feature_names: 转换后的特征名称
+        top_k: 每行保留的主要影响因素个数
+
+    Returns:
+        添加了预测结果列的数据块
+    """
+    processed = preprocessor.transform(chunk)
+
+    if hasattr(model, "predict_proba"):
+        probabilities = model.predict_proba(processed)[:, 1]
+    else:
+        probabilities = model.predict(processed)
+
+    chunk["RenewalProbability"] = probabilities
+    chunk["PredictedRenewal"] = (probabilities >= threshold).astype(int)
+
+    if explainer is not None:
+        factors = explain_batch(explainer, processed, feature_names, top_k)
+        factors.index = chunk.index
+        chunk = pd.concat([chunk, factors], axis=1)
+    return chunk
+
+
+def score_file_in_chunks(
+    input_path: str, output_path: str,
+    model: Any, preprocessor: Any,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    threshold: float = 0.5,
+    explainer: Any = None,
+    feature_names: Optional[List[str]] = None,
+    summary: Optional[BatchSummary] = None
+) -> Dict[str, float]:
+    """
+    流式批量评分：分块读取、转换、预测并追加写入结果文件
+
+    Args:
+        input_path: 输入文件路径
+        output_path: 结果文件路径（CSV或Parquet，按扩展名确定格式）
+        model: 训练好的模型
+        preprocessor: 拟合好的预处理器
+        chunk_size: 每个数据块的行数
+        threshold: 判定续保的概率阈值
+        explainer: SHAP解释器，提供时为每行附加主要影响因素
+        feature_names: 转换后的特征名称
+        summary: 结果摘要，提供时在评分过程中逐块累计
+
+    Returns:
+        包含行数、块数、耗时和吞吐量的统计字典
+    """
+    logger.info(f"开始流式评分: {input_path}，块大小: {chunk_size}")
+    start_time = time.perf_counter()
+
+    total_rows = 0
+    n_chunks = 0
+    with FrameWriter(output_path) as writer:
+        for chunk in iter_input_chunks(input_path, chunk_size):
+            scored = score_chunk(chunk, model, preprocessor, threshold, explainer, feature_names)
+            writer.write(scored)
+            if summary is not None:
+                summary.update(
+                    scored["RenewalProbability"], scored["PredictedRenewal"],
+                    scored["Renewed"] if "Renewed" in scored.columns else None
+                )
+            total_rows += len(scored)
+            n_chunks += 1
+
+    if n_chunks == 0:
+        raise ValueError(f"输入文件中没有数据: {input_path}")
+
+    elapsed = time.perf_counter() - start_time
+    stats = {
+        "rows": total_rows,
+        "chunks": n_chunks,
+        "seconds": elapsed,
+        "rows_per_second": total_rows / elapsed if elapsed > 0 else float("inf"),
+    }
+
+    logger.info(
+        f"流式评分完成: {total_rows} 行, {n_chunks} 块, 耗时 {elapsed:.2f} 秒, "
+        f"吞吐量 {stats['rows_per_second']:.0f} 行/秒"
+    )
+    return stats
+
+
+def load_model_and_preprocessor(model_path: str, preprocessor_path: str = PREPROCESSOR_PATH) -> Tuple[Any, Any]:
+    """
+    加载模型和预处理器：推理管道文件自带预处理器，模型文件与预处理器文件配对
+
+    Args:
+        model_path: 推理管道或模型文件路径
+        preprocessor_path: 预处理器文件路径
+
+    Returns:
+        模型和预处理器
+    """
+    artifact = joblib.load(model_path)
+    if isinstance(artifact, InferencePipeline):
+        return artifact.model, artifact.preprocessor
+    return artifact, joblib.load(preprocessor_path)
+
+
+def _init_worker(model_path: str, preprocessor_path: str) -> None:
+    """工作进程初始化：每个进程只加载一次模型和预处理器"""
+    global _worker_model, _worker_preprocessor
+    _worker_model, _worker_preprocessor = load_model_and_preprocessor(model_path, preprocessor_path)
+
+
+def _score_shard(shard_index: int, shard: pd.DataFrame, part_path: str, threshold: float) -> Tuple[int, int]:
+    """
+    在工作进程中对一个分片评分并写入分片结果文件
+
+    Args:
+        shard_index: 分片序号
+        shard: 分片数据
+        part_path: 分片结果文件路径
+        threshold: 判定续保的概率阈值
+
+    Returns:
+        分片序号和行数
+    """
+    scored = score_chunk(shard, _worker_model, _worker_preprocessor, threshold)
+    if part_path.endswith(".csv"):
+        scored.to_csv(part_path, header=shard_index == 0, index=False)
+    else:
+        scored.to_parquet(part_path, index=False)
+    return shard_index, len(scored)
+
+
+def _append_part(part_path: str, output_file, writer: Optional[FrameWriter] = None) -> None:
+    """将分片结果文件追加到输出文件并删除分片文件"""
+    if writer is None:
+        # CSV分片直接按字节拼接，无需重新解析
+        with open(part_path, "rb") as part_file:
+            shutil.copyfileobj(part_file, output_file)
+    else:
+        writer.write(read_frame(part_path))
+    os.remove(part_path)
+
+
+def score_file_parallel(
+    input_path: str, output_path: str,
+    model_path: str, preprocessor_path: str = PREPROCESSOR_PATH,
+    n_workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    threshold: float = 0.5
+) -> Dict[str, float]:
+    """
+    多进程分片评分：主进程分块读取输入，工作进程并行评分，结果按原始顺序合并
+
+    同时在途的分片数量限制为工作进程数的两倍，因此内存占用仍只与块大小相关。
+
+    Args:
+        input_path: 输入文件路径
+        output_path: 结果文件路径（CSV或Parquet，按扩展名确定格式）
+        model_path: 推理管道或模型文件路径
+        preprocessor_path: 预处理器文件路径（推理管道自带预处理器，不使用该文件）
+        n_workers: 工作进程数，默认为CPU核数
+        chunk_size: 每个分片的行数
+        threshold: 判定续保的概率阈值
+
+    Returns:
+        包含行数、分片数、耗时和吞吐量的统计字典
+    """
+    n_workers = n_workers or os.cpu_count() or 1
+    output_format = detect_format(output_path)
+    if output_format not in ("csv", "parquet"):
+        raise ValueError(f"结果文件只支持CSV或Parquet格式: {output_path}")
+    part_ext = FORMAT_EXTENSIONS[output_format]
+    max_pending = n_workers * 2
+    logger.info(f"开始多进程评分: {input_path}，工作进程: {n_workers}，分片大小: {chunk_size}")
+    start_time = time.perf_counter()
+
+    total_rows = 0
+    n_shards = 0
+    pending = deque()
+
+    with ProcessPoolExecutor(
+        max_workers=n_workers,
+        initializer=_init_worker,
+        initargs=(model_path, preprocessor_path)
+    ) as executor:
+        # CSV结果以二进制方式拼接分片，Parquet结果由写入器逐个追加分片
+        if output_format == "csv":
+            output_file, writer = open(output_path, "wb"), None
+        else:
+            output_file, writer = None, FrameWriter(output_path)
+
+        def merge_next():
+            nonlocal total_rows
+            future, part_path = pending.popleft()
+            _, n_rows = future.result()
+            _append_part(part_path, output_file, writer)
+            total_rows += n_rows
+
+        try:
+            for shard in iter_input_chunks(input_path, chunk_size):
+                part_path = f"{output_path}.part-{n_shards:05d}{part_ext}"
+                future = executor.submit(_score_shard, n_shards, shard, part_path, threshold)
+                pending.append((future, part_path))
+                n_shards += 1
+
+                # 按提交顺序合并已完成的分片，限制在途分片数量
+                if len(pending) >= max_pending:
+                    merge_next()
+
+            while pending:
+                merge_next()
+        finally:
+            if output_file is not None:
+                output_file.close()
+            if writer is not None:
+                writer.close()
+
+    if n_shards == 0:
+        raise ValueError(f"输入文件中没有数据: {input_path}")
+
+    elapsed = time.perf_counter() - start_time
+    stats = {
+        "rows": total_rows,
+        "chunks": n_shards,
+        "seconds": elapsed,
+        "rows_per_second": total_rows / elapsed if elapsed > 0 else float("inf"),
+    }
+
+    logger.info(
+        f"多进程评分完成: {total_rows} 行, {n_shards} 个分片, 耗时 {elapsed:.2f} 秒, "
+        f"吞吐量 {stats['rows_per_second']:.0f} 行/秒"
+    )
+    return stats
+
+
+def main(args: argparse.Namespace) -> None:
+    """
+    主函数：执行离线批量评分
+
+    Args:
+        args: 命令行参数
+    """
+    model_path = args.model_path or find_latest_model_path(MODELS_DIR, args.preprocessor_path)
+    if model_path is None:
+        logger.error(f"未找到推理管道或模型文件: {MODELS_DIR}")
+        return
+
+    logger.info(f"使用模型: {model_path}")
+    if os.path.dirname(os.path.abspath(model_path)) != os.path.abspath(PIPELINES_DIR):
+        if not os.path.exists(args.preprocessor_path):
+            logger.error(f"预处理器文件不存在: {args.preprocessor_path}")
+            return
+        logger.info(f"使用预处理器: {args.preprocessor_path}")
+
+    score_file_parallel(
+        args.input_path, args.output_path,
+        model_path, args.preprocessor_path,
+        n_workers=args.workers,
+        chunk_size=args.chunk_size,
+        threshold=args.threshold
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="使用训练好的模型对客户数据进行离线批量评分")
+    parser.add_argument(
+        "--input", dest="input_path", type=str, required=True,
+        help="输入文件路径（CSV、Parquet、Feather、npz或Excel）"
+    )
+    parser.add_argument(
+        "--output", dest="output_path", type=str, required=True,
+        help="结果文件路径（.csv或.parquet）"
+    )
+    parser.add_argument(
+        "--model", dest="model_path", type=str, default=None,
+        help="推理管道或模型文件路径，默认与Web应用使用同一个最新版本"
+    )
+    parser.add_argument(
+        "--preprocessor", dest="preprocessor_path", type=str, default=PREPROCESSOR_PATH,
+        help="预处理器文件路径"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="工作进程数，默认为CPU核数"
+    )
+    parser.add_argument(
+        "--chunk-size", dest="chunk_size", type=int, default=DEFAULT_CHUNK_SIZE,
+        help="每个分片的行数"
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=0.5,
+        help="判定续保的概率阈值"
+    )
+
+    main(parser.parse_args())
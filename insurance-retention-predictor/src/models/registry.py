@@ -0,0 +1,297 @@
+"""
+模型注册表模块
+
+该模块负责在Web服务运行期间管理模型版本，包括：
+- 维护模型目录中模型文件的索引，目录未变化时不重复扫描
+- 后台线程定期检查是否有更新的模型或推理管道
+- 加载新版本并预热后再原子切换，进行中的请求继续使用旧版本
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.data.preprocessing import get_feature_names
+from src.models.explain import build_explainer, compute_global_importance, load_importance
+from src.models.inference import PIPELINES_DIR, InferencePipeline
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+class ModelBundle:
+    """一个已加载并预热的模型版本，加载后不再修改模型和预处理器"""
+
+    def __init__(
+        self, version: str, model: Any, preprocessor: Any,
+        pipeline: Optional[InferencePipeline] = None,
+        importance: Optional[pd.DataFrame] = None
+    ):
+        """
+        Args:
+            version: 版本标识（模型或推理管道文件名）
+            model: 训练好的模型
+            preprocessor: 拟合好的预处理器
+            pipeline: 推理管道（如有）
+            importance: 预先计算的全局特征重要性（如有）
+        """
+        self.version = version
+        self.model = model
+        self.preprocessor = preprocessor
+        self.pipeline = pipeline
+        self.loaded_at = time.time()
+        self.feature_names = pipeline.feature_names if pipeline is not None else list(get_feature_names(preprocessor))
+
+        # 全局特征重要性对同一模型版本不变，缺少预计算文件时在加载时计算一次
+        self.importance = importance if importance is not None else compute_global_importance(model, self.feature_names)
+
+        # SHAP解释器与模型版本绑定，首次使用时构建
+        self._explainer = None
+        self._explainer_built = False
+        self._explainer_lock = threading.Lock()
+
+    @property
+    def needs_shap(self) -> bool:
+        """模型没有内置特征重要性时，需要SHAP解释器计算重要性"""
+        return not (hasattr(self.model, "feature_importances_") or hasattr(self.model, "coef_"))
+
+    def get_explainer(self) -> Optional[Any]:
+        """获取该模型版本的SHAP解释器，每个版本只构建一次"""
+        if not self._explainer_built:
+            with self._explainer_lock:
+                if not self._explainer_built:
+                    self._explainer = build_explainer(self.model)
+                    self._explainer_built = True
+        return self._explainer
+
+    def warm_up(self) -> None:
+        """对一条全部字段为缺失值的样本执行预测，确保切换前预处理器和模型可用且相关代码路径已加载"""
+        input_columns = getattr(self.preprocessor, "feature_names_in_", None)
+        if self.pipeline is not None:
+            record = {col: np.nan for col in input_columns} if input_columns is not None else {}
+            self.pipeline.predict_proba_transformed(self.pipeline.transform_record(record))
+            return
+
+        if input_columns is not None:
+            sample = self.preprocessor.transform(pd.DataFrame([[np.nan] * len(input_columns)], columns=input_columns))
+            if hasattr(self.model, "predict_proba"):
+                self.model.predict_proba(sample)
+            else:
+                self.model.predict(sample)
+            return
+
+        n_features = getattr(self.model, "n_features_in_", None)
+        if n_features is not None:
+            sample = np.zeros((1, n_features))
+            if hasattr(self.model, "predict_proba"):
+                self.model.predict_proba(sample)
+            else:
+                self.model.predict(sample)
+
+
+class _DirectoryIndex:
+    """目录中模型文件的索引，仅在目录修改时间变化时重新扫描"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._dir_mtime = None
+        self._entries: Dict[str, float] = {}
+
+    def refresh(self) -> Dict[str, float]:
+        """返回 文件路径 -> 修改时间 的索引"""
+        try:
+            dir_mtime = os.stat(self.directory).st_mtime_ns
+        except FileNotFoundError:
+            self._dir_mtime = None
+            self._entries = {}
+            return self._entries
+
+        if dir_mtime != self._dir_mtime:
+            entries = {}
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.is_file() and entry.name.endswith(".pkl"):
+                        entries[entry.path] = entry.stat().st_mtime
+            self._entries = entries
+            self._dir_mtime = dir_mtime
+
+        return self._entries
+
+    def latest(self) -> Optional[Tuple[str, float]]:
+        """返回最新的模型文件路径及其修改时间"""
+        entries = self.refresh()
+        if not entries:
+            return None
+        path = max(entries, key=entries.get)
+
+        # 只重新获取最新文件的修改时间，以发现扫描后仍在写入的文件
+        try:
+            entries[path] = os.stat(path).st_mtime
+        except FileNotFoundError:
+            self._dir_mtime = None
+            return None
+        return path, entries[path]
+
+
+class ModelRegistry:
+    """模型注册表：发现新模型后在后台加载、预热并原子切换当前版本"""
+
+    def __init__(
+        self, models_dir: str, preprocessor_path: str,
+        pipelines_dir: str = PIPELINES_DIR, poll_interval: float = 10.0
+    ):
+        """
+        Args:
+            models_dir: 模型目录
+            preprocessor_path: 预处理器文件路径
+            pipelines_dir: 推理管道目录
+            poll_interval: 后台检查间隔（秒）
+        """
+        self.preprocessor_path = preprocessor_path
+        self.poll_interval = poll_interval
+
+        self._model_index = _DirectoryIndex(models_dir)
+        self._pipeline_index = _DirectoryIndex(pipelines_dir)
+        self._current: Optional[ModelBundle] = None
+        self._current_key = None
+        self._failed_keys = set()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def current(self) -> Optional[ModelBundle]:
+        """获取当前模型版本，请求应在开始时获取一次并在整个请求中使用"""
+        return self._current
+
+    def artifacts(self) -> List[Tuple[str, float]]:
+        """列出索引中的全部模型和推理管道文件，按修改时间从新到旧排序"""
+        entries = {**self._model_index.refresh(), **self._pipeline_index.refresh()}
+        return sorted(entries.items(), key=lambda item: item[1], reverse=True)
+
+    def _candidate_keys(self) -> List[Tuple]:
+        """
+        列出候选版本的标识：最新的推理管道和最新的模型（与预处理器配对），按修改时间从新到旧排序
+
+        修改时间相同时优先使用推理管道
+        """
+        candidates = []
+        latest_pipeline = self._pipeline_index.latest()
+        if latest_pipeline is not None:
+            candidates.append(("pipeline",) + latest_pipeline)
+
+        latest_model = self._model_index.latest()
+        if latest_model is not None and os.path.exists(self.preprocessor_path):
+            candidates.append(("model",) + latest_model + (os.path.getmtime(self.preprocessor_path),))
+
+        return sorted(candidates, key=lambda key: (key[2], key[0] == "pipeline"), reverse=True)
+
+    def _latest_key(self) -> Optional[Tuple]:
+        """确定最新版本的标识（推理管道和模型按修改时间比较）"""
+        candidates = self._candidate_keys()
+        return candidates[0] if candidates else None
+
+    def latest_artifact(self) -> Optional[Tuple[str, str]]:
+        """
+        最新版本的类型和文件路径，与后台加载时的选择一致
+
+        Returns:
+            ("pipeline" 或 "model", 文件路径)，未找到时返回None
+        """
+        key = self._latest_key()
+        return None if key is None else (key[0], key[1])
+
+    def _load(self, key: Tuple) -> ModelBundle:
+        """根据版本标识加载模型版本"""
+        kind, path = key[0], key[1]
+        version = os.path.basename(path)
+
+        if kind == "pipeline":
+            logger.info(f"加载推理管道：{path}")
+            pipeline = joblib.load(path)
+            return ModelBundle(version, pipeline.model, pipeline.preprocessor, pipeline, load_importance(path))
+
+        logger.info(f"加载模型：{path}")
+        model = joblib.load(path)
+        logger.info(f"加载预处理器：{self.preprocessor_path}")
+        preprocessor = joblib.load(self.preprocessor_path)
+        return ModelBundle(version, model, preprocessor, importance=load_importance(path))
+
+    def refresh(self) -> bool:
+        """
+        检查是否有更新的模型，有则加载、预热并切换
+
+        Returns:
+            是否切换了版本
+        """
+        with self._lock:
+            candidates = self._candidate_keys()
+            if not candidates:
+                if self._current is None:
+                    logger.error("未找到模型文件或预处理器文件")
+                return False
+
+            # 从最新的候选版本开始尝试，推理管道加载失败时回退到模型与预处理器的组合
+            bundle = None
+            for key in candidates:
+                if key == self._current_key:
+                    return False
+                if key in self._failed_keys:
+                    continue
+                try:
+                    bundle = self._load(key)
+                    bundle.warm_up()
+                    # 依赖SHAP计算重要性的模型，在切换前构建好解释器
+                    if bundle.needs_shap:
+                        bundle.get_explainer()
+                    break
+                except Exception as e:
+                    # 记录失败的版本，避免反复加载同一个损坏的文件
+                    logger.error(f"加载模型版本 {os.path.basename(key[1])} 失败: {str(e)}")
+                    self._failed_keys.add(key)
+                    bundle = None
+
+            if bundle is None:
+                return False
+
+            previous = self._current
+            self._current = bundle
+            self._current_key = key
+
+        if previous is None:
+            logger.info(f"模型版本 {bundle.version} 已就绪")
+        else:
+            logger.info(f"模型版本已从 {previous.version} 切换到 {bundle.version}")
+        return True
+
+    def _watch(self) -> None:
+        """后台线程：定期检查模型目录"""
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"检查模型更新失败: {str(e)}")
+
+    def start(self) -> None:
+        """启动后台监视线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._watch, name="model-registry", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台监视线程"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
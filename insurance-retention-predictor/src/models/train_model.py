@@ -10,9 +10,11 @@
 """
 
 import os
+import sys
+import copy
+import time
 import logging
 import yaml
-import pickle
 import joblib
 from typing import Dict, Any, Tuple
 import argparse
@@ -22,18 +24,28 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.base import clone
 from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import (
-    accuracy_score, precision_score, recall_score, f1_score,
-    roc_auc_score, confusion_matrix, classification_report,
-    precision_recall_curve, roc_curve, average_precision_score
-)
-from sklearn.model_selection import GridSearchCV, RandomizedSearchCV
 import xgboost as xgb
 import lightgbm as lgb
 import mlflow
 import mlflow.sklearn
 
+# 添加项目根目录到系统路径，以便以脚本方式运行时导入src包
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from src.data.feature_store import has_feature_matrix, load_feature_matrix, load_feature_metadata
+from src.data.storage import find_dataset, read_frame
+from src.evaluation.metrics import ModelEvaluator
+from src.models.early_stopping import (
+    apply_early_stopping_params, best_iteration, early_stopping_settings, fit_estimator,
+    log_best_iteration, needs_holdout
+)
+from src.models.explain import compute_global_importance, save_importance
+from src.models.hyperparameter_search import build_search
+from src.models.inference import build_inference_pipeline, save_inference_pipeline
+from src.models.parallel_training import requested_threads, resolve_cpu_budget, train_in_parallel
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -51,7 +63,7 @@ PROCESSED_DATA_DIR = os.path.join(PROJECT_ROOT, "data/processed")
 MODELS_DIR = os.path.join(PROJECT_ROOT, "models")
 
 
-def load_processed_data(data_dir: str = PROCESSED_DATA_DIR) -> Tuple[pd.DataFrame, pd.DataFrame, pd.Series, pd.Series]:
+def load_processed_data(data_dir: str = PROCESSED_DATA_DIR) -> Tuple[Any, Any, pd.Series, pd.Series]:
     """
     加载预处理后的数据
 
@@ -59,15 +71,30 @@ def load_processed_data(data_dir: str = PROCESSED_DATA_DIR) -> Tuple[pd.DataFram
         data_dir: 数据目录路径
 
     Returns:
-        X_train, X_test, y_train, y_test
+        X_train, X_test, y_train, y_test；稀疏模式保存的特征为CSR矩阵
     """
     logger.info(f"从 {data_dir} 加载处理后的数据")
     
     try:
-        X_train = pd.read_csv(os.path.join(data_dir, "X_train.csv"))
-        X_test = pd.read_csv(os.path.join(data_dir, "X_test.csv"))
-        y_train = pd.read_csv(os.path.join(data_dir, "y_train.csv")).squeeze()
-        y_test = pd.read_csv(os.path.join(data_dir, "y_test.csv")).squeeze()
+        # 自动识别数据格式，同一数据集存在多种格式时使用最新的文件
+        paths = {name: find_dataset(data_dir, name) for name in ("X_train", "X_test", "y_train", "y_test")}
+
+        # 特征矩阵优先从特征存储加载（不早于表格数据文件时）：稠密矩阵以内存映射方式打开，稀疏矩阵保持CSR
+        features = {}
+        for name in ("X_train", "X_test"):
+            if has_feature_matrix(data_dir, name, newer_than=paths[name]):
+                features[name] = load_feature_matrix(data_dir, name)
+            elif paths[name] is not None:
+                features[name] = read_frame(paths[name])
+            else:
+                raise FileNotFoundError(f"未找到数据文件: {os.path.join(data_dir, name)}.*")
+        X_train, X_test = features["X_train"], features["X_test"]
+
+        for name in ("y_train", "y_test"):
+            if paths[name] is None:
+                raise FileNotFoundError(f"未找到数据文件: {os.path.join(data_dir, name)}.*")
+        y_train = read_frame(paths["y_train"]).squeeze("columns")
+        y_test = read_frame(paths["y_test"]).squeeze("columns")
         
         logger.info(f"成功加载数据 - 训练集: {X_train.shape}, 测试集: {X_test.shape}")
         return X_train, X_test, y_train, y_test
@@ -77,12 +104,41 @@ def load_processed_data(data_dir: str = PROCESSED_DATA_DIR) -> Tuple[pd.DataFram
         raise
 
 
-def train_models(X_train: pd.DataFrame, y_train: pd.Series, config: Dict[str, Any]) -> Dict[str, Any]:
+# 模型名称到模型类的映射
+MODEL_CLASSES = {
+    "logistic_regression": LogisticRegression,
+    "random_forest": RandomForestClassifier,
+    "gradient_boosting": GradientBoostingClassifier,
+    "xgboost": xgb.XGBClassifier,
+    "lightgbm": lgb.LGBMClassifier,
+}
+
+
+def build_model(model_name: str, params: Dict[str, Any] = None) -> Any:
+    """
+    根据模型名称和参数创建未训练的模型
+
+    Args:
+        model_name: 模型名称
+        params: 模型参数
+
+    Returns:
+        未训练的模型
+    """
+    if model_name not in MODEL_CLASSES:
+        raise ValueError(f"不支持的模型类型: {model_name}")
+    return MODEL_CLASSES[model_name](**(params or {}))
+
+
+def train_models(X_train: Any, y_train: pd.Series, config: Dict[str, Any]) -> Dict[str, Any]:
     """
     训练多个模型并返回训练结果
 
+    配置中 training.parallel 为true（默认）时，在 training.cpu_budget 核的预算内并发训练，
+    否则依次训练。启用 training.early_stopping 时，提升树模型在验证集上早停，不再训练全部的树。
+
     Args:
-        X_train: 训练特征
+        X_train: 训练特征（DataFrame或CSR稀疏矩阵，稀疏矩阵直接传给各模型，不转换为稠密）
         y_train: 训练标签
         config: 配置参数
 
@@ -91,53 +147,47 @@ def train_models(X_train: pd.DataFrame, y_train: pd.Series, config: Dict[str, An
     """
     logger.info("开始训练模型")
     
-    models = {}
-    
-    # 逻辑回归
-    if "logistic_regression" in config["models"]:
-        logger.info("训练逻辑回归模型")
-        lr_params = config["models"]["logistic_regression"]["params"]
-        lr = LogisticRegression(**lr_params)
-        lr.fit(X_train, y_train)
-        models["logistic_regression"] = lr
-    
-    # 随机森林
-    if "random_forest" in config["models"]:
-        logger.info("训练随机森林模型")
-        rf_params = config["models"]["random_forest"]["params"]
-        rf = RandomForestClassifier(**rf_params)
-        rf.fit(X_train, y_train)
-        models["random_forest"] = rf
-    
-    # 梯度提升树
-    if "gradient_boosting" in config["models"]:
-        logger.info("训练梯度提升树模型")
-        gb_params = config["models"]["gradient_boosting"]["params"]
-        gb = GradientBoostingClassifier(**gb_params)
-        gb.fit(X_train, y_train)
-        models["gradient_boosting"] = gb
-    
-    # XGBoost
-    if "xgboost" in config["models"]:
-        logger.info("训练XGBoost模型")
-        xgb_params = config["models"]["xgboost"]["params"]
-        xgb_model = xgb.XGBClassifier(**xgb_params)
-        xgb_model.fit(X_train, y_train)
-        models["xgboost"] = xgb_model
-    
-    # LightGBM
-    if "lightgbm" in config["models"]:
-        logger.info("训练LightGBM模型")
-        lgb_params = config["models"]["lightgbm"]["params"]
-        lgb_model = lgb.LGBMClassifier(**lgb_params)
-        lgb_model.fit(X_train, y_train)
-        models["lightgbm"] = lgb_model
+    estimators = {}
+    for name, model_config in config["models"].items():
+        if not model_config.get("enabled", True):
+            logger.info(f"跳过未启用的模型: {name}")
+            continue
+        estimators[name] = build_model(name, model_config.get("params"))
+    
+    training_config = config.get("training", {})
+    early_stopping = early_stopping_settings(config)
+    if training_config.get("parallel", True) and len(estimators) > 1:
+        models, timings = train_in_parallel(
+            estimators, X_train, y_train, training_config.get("cpu_budget"), early_stopping
+        )
+    else:
+        models, timings = {}, {}
+        for name, model in estimators.items():
+            logger.info(f"训练模型: {name}")
+            start_wall = time.perf_counter()
+            start_cpu = time.process_time()
+            fit_estimator(model, X_train, y_train, early_stopping)
+            models[name] = model
+            timings[name] = {
+                "wall_time": time.perf_counter() - start_wall,
+                "cpu_time": time.process_time() - start_cpu,
+                "threads": requested_threads(model, resolve_cpu_budget()) or 1,
+            }
     
     logger.info(f"完成训练，共训练了 {len(models)} 个模型")
+    for name, timing in timings.items():
+        logger.info(
+            f"  {name}: 墙钟时间 {timing['wall_time']:.2f} 秒, CPU时间 {timing['cpu_time']:.2f} 秒, "
+            f"线程数 {timing['threads']}"
+        )
+        log_best_iteration(name, models[name])
     return models
 
 
-def evaluate_models(models: Dict[str, Any], X_test: pd.DataFrame, y_test: pd.Series) -> Dict[str, Dict[str, float]]:
+def evaluate_models(
+    models: Dict[str, Any], X_test: Any, y_test: pd.Series,
+    evaluator: ModelEvaluator = None
+) -> Dict[str, Dict[str, float]]:
     """
     评估所有模型的性能
 
@@ -145,30 +195,21 @@ def evaluate_models(models: Dict[str, Any], X_test: pd.DataFrame, y_test: pd.Ser
         models: 训练好的模型字典
         X_test: 测试特征
         y_test: 测试标签
+        evaluator: 模型评估器，每个模型只推理一次并缓存结果
 
     Returns:
         包含每个模型评估指标的字典
     """
     logger.info("开始评估模型性能")
+    evaluator = evaluator or ModelEvaluator()
     
     evaluation_results = {}
     
     for name, model in models.items():
         logger.info(f"评估模型: {name}")
         
-        # 预测概率和类别
-        y_pred_proba = model.predict_proba(X_test)[:, 1]
-        y_pred = model.predict(X_test)
-        
-        # 计算各种评估指标
-        metrics = {
-            "accuracy": accuracy_score(y_test, y_pred),
-            "precision": precision_score(y_test, y_pred),
-            "recall": recall_score(y_test, y_pred),
-            "f1": f1_score(y_test, y_pred),
-            "roc_auc": roc_auc_score(y_test, y_pred_proba),
-            "avg_precision": average_precision_score(y_test, y_pred_proba)
-        }
+        # 只推理一次预测概率，预测类别由概率和阈值得到
+        metrics = evaluator.evaluate(model, X_test, y_test)
         
         evaluation_results[name] = metrics
         
@@ -179,14 +220,71 @@ def evaluate_models(models: Dict[str, Any], X_test: pd.DataFrame, y_test: pd.Ser
     return evaluation_results
 
 
+# 不影响训练结果的参数，判断能否热启动时忽略
+_WARM_START_IGNORED_PARAMS = {"n_jobs", "verbose", "warm_start", "n_estimators"}
+
+
+def _warm_start_refit(base_model: Any, target_params: Dict[str, Any], X_train: Any, y_train: pd.Series) -> Any:
+    """
+    从已训练的基线模型热启动，训练最佳参数的最终模型
+
+    - 集成模型（随机森林、梯度提升树）：除树的数量外其余参数相同、且最佳树数量不少于基线时，
+      保留基线已训练的树，只训练新增的树
+    - 逻辑回归（liblinear以外的求解器）：以基线模型的系数作为优化初始值
+
+    Args:
+        base_model: 已在完整训练集上训练的基线模型
+        target_params: 最终模型的全部参数
+        X_train: 训练特征
+        y_train: 训练标签
+
+    Returns:
+        热启动训练的模型，模型不支持或参数不满足条件时返回None
+    """
+    if base_model is None or "warm_start" not in base_model.get_params():
+        return None
+
+    base_params = base_model.get_params()
+    if "n_estimators" in base_params:
+        same_params = all(
+            target_params.get(key) == value
+            for key, value in base_params.items()
+            if key not in _WARM_START_IGNORED_PARAMS
+        )
+        if not same_params or target_params["n_estimators"] < base_params["n_estimators"]:
+            return None
+        logger.info(
+            f"热启动：复用基线模型的 {base_params['n_estimators']} 棵树，"
+            f"新增 {target_params['n_estimators'] - base_params['n_estimators']} 棵"
+        )
+    elif target_params.get("solver") == "liblinear":
+        return None
+    else:
+        logger.info("热启动：以基线模型的系数作为初始值")
+
+    model = copy.deepcopy(base_model)
+    model.set_params(**target_params)
+    model.set_params(warm_start=True)
+    model.fit(X_train, y_train)
+    model.set_params(warm_start=target_params.get("warm_start", False))
+    return model
+
+
 def optimize_best_model(
     X_train: pd.DataFrame, y_train: pd.Series,
     X_test: pd.DataFrame, y_test: pd.Series,
-    best_model_name: str, config: Dict[str, Any]
+    best_model_name: str, config: Dict[str, Any],
+    evaluator: ModelEvaluator = None,
+    base_model: Any = None
 ) -> Any:
     """
     对最佳模型进行超参数优化
 
+    搜索以配置中的模型参数为基础，搜索空间中的参数覆盖配置值。最终模型只在完整训练集上训练一次：
+    直接使用搜索重新训练得到的最佳模型；基线模型支持热启动时，搜索不重新训练，改为从基线模型继续训练。
+    启用早停时，提升树模型在搜索的每次训练中早停（XGBoost和LightGBM从每折的训练数据中划出验证集），
+    XGBoost和LightGBM的最终模型从训练集中划出验证集早停。
+
     Args:
         X_train: 训练特征
         y_train: 训练标签
@@ -194,70 +292,80 @@ def optimize_best_model(
         y_test: 测试标签
         best_model_name: 最佳模型名称
         config: 配置参数
+        evaluator: 模型评估器，评估结果缓存后可直接复用
+        base_model: train_models中已训练的同类模型，用于热启动
 
     Returns:
         优化后的最佳模型
     """
     logger.info(f"对最佳模型 {best_model_name} 进行超参数优化")
     
-    if best_model_name == "logistic_regression":
-        model = LogisticRegression()
-        param_grid = config["hyperparameters"]["logistic_regression"]
-    elif best_model_name == "random_forest":
-        model = RandomForestClassifier()
-        param_grid = config["hyperparameters"]["random_forest"]
-    elif best_model_name == "gradient_boosting":
-        model = GradientBoostingClassifier()
-        param_grid = config["hyperparameters"]["gradient_boosting"]
-    elif best_model_name == "xgboost":
-        model = xgb.XGBClassifier()
-        param_grid = config["hyperparameters"]["xgboost"]
-    elif best_model_name == "lightgbm":
-        model = lgb.LGBMClassifier()
-        param_grid = config["hyperparameters"]["lightgbm"]
-    else:
+    if best_model_name not in config["hyperparameters"]:
         raise ValueError(f"不支持的模型类型: {best_model_name}")
+    param_grid = config["hyperparameters"][best_model_name]
+    
+    # 交叉验证已并行，搜索中的模型使用单线程，避免线程过度订阅
+    model_params = dict(config.get("models", {}).get(best_model_name, {}).get("params") or {})
+    configured_n_jobs = model_params.get("n_jobs")
+    if configured_n_jobs is not None:
+        model_params["n_jobs"] = 1
+    early_stopping = early_stopping_settings(config)
+    model = apply_early_stopping_params(build_model(best_model_name, model_params), early_stopping)
+    
+    # 基线模型支持热启动时，由搜索之后的热启动代替搜索自身的重新训练；
+    # 需要单独验证集早停的模型也由搜索之后的训练得到最终模型
+    can_warm_start = base_model is not None and "warm_start" in base_model.get_params()
+    refit_in_search = not can_warm_start and not needs_holdout(model, early_stopping)
+    
+    # 按配置创建搜索：grid、random、halving（连续减半）或 optuna（剪枝并可续跑）
+    search = build_search(
+        model, param_grid, config.get("hyperparameter_search", {}),
+        refit=refit_in_search, estimator_n_jobs=configured_n_jobs, early_stopping=early_stopping
+    )
     
-    # 使用随机搜索进行超参数优化
-    search_method = config.get("hyperparameter_search", {}).get("method", "random")
-    n_iter = config.get("hyperparameter_search", {}).get("n_iter", 10)
-    cv = config.get("hyperparameter_search", {}).get("cv", 5)
-    
-    if search_method == "grid":
-        logger.info("使用网格搜索进行超参数优化")
-        search = GridSearchCV(
-            model, param_grid, cv=cv, scoring="roc_auc",
-            verbose=1, n_jobs=-1, return_train_score=True
-        )
-    else:
-        logger.info("使用随机搜索进行超参数优化")
-        search = RandomizedSearchCV(
-            model, param_grid, n_iter=n_iter, cv=cv, scoring="roc_auc",
-            verbose=1, n_jobs=-1, random_state=42, return_train_score=True
-        )
-    
-    # 开始搜索
+    # 开始搜索（X_train来自内存映射特征矩阵时，joblib按文件引用传给工作进程，不复制数据）
     search.fit(X_train, y_train)
     
     logger.info(f"最佳参数: {search.best_params_}")
     logger.info(f"最佳交叉验证得分: {search.best_score_:.4f}")
     
-    # 使用最佳参数重新训练模型
-    best_model = search.best_estimator_
-    best_model.fit(X_train, y_train)
+    # 最终模型只训练一次：直接使用搜索重新训练的模型，或从基线模型热启动，参数不满足热启动条件时完整训练
+    warm_started = False
+    if refit_in_search:
+        best_model = search.best_estimator_
+        refit_time = search.refit_time_
+    else:
+        target_params = {**model.get_params(), **search.best_params_}
+        refit_start = time.perf_counter()
+        best_model = _warm_start_refit(base_model, target_params, X_train, y_train) if can_warm_start else None
+        warm_started = best_model is not None
+        if not warm_started:
+            best_model = clone(model).set_params(**search.best_params_)
+            fit_estimator(best_model, X_train, y_train, early_stopping)
+        refit_time = time.perf_counter() - refit_start
+    
+    # 原流程在完整训练集上训练两次（搜索自动重新训练和随后的重复训练）；
+    # 热启动时按最佳参数在交叉验证中的平均训练耗时估算一次完整训练的耗时
+    if warm_started:
+        n_splits = search.n_splits_
+        full_fit_time = search.cv_results_["mean_fit_time"][search.best_index_] * n_splits / max(n_splits - 1, 1)
+    else:
+        full_fit_time = refit_time
+    time_saved = 2 * full_fit_time - refit_time
+    logger.info(
+        f"最终模型训练耗时 {refit_time:.2f} 秒（{'热启动' if warm_started else '完整训练'}），"
+        f"相比重复训练节省约 {time_saved:.2f} 秒"
+    )
+    
+    log_best_iteration(best_model_name, best_model)
+    
+    # 恢复配置中的线程数，供后续预测使用
+    if configured_n_jobs is not None:
+        best_model.set_params(n_jobs=configured_n_jobs)
     
     # 在测试集上评估优化后的模型
-    y_pred = best_model.predict(X_test)
-    y_pred_proba = best_model.predict_proba(X_test)[:, 1]
-    
-    optimized_metrics = {
-        "accuracy": accuracy_score(y_test, y_pred),
-        "precision": precision_score(y_test, y_pred),
-        "recall": recall_score(y_test, y_pred),
-        "f1": f1_score(y_test, y_pred),
-        "roc_auc": roc_auc_score(y_test, y_pred_proba),
-        "avg_precision": average_precision_score(y_test, y_pred_proba)
-    }
+    evaluator = evaluator or ModelEvaluator()
+    optimized_metrics = evaluator.evaluate(best_model, X_test, y_test)
     
     logger.info("优化后的模型评估结果:")
     for metric_name, value in optimized_metrics.items():
@@ -266,14 +374,15 @@ def optimize_best_model(
     return best_model
 
 
-def save_model(model: Any, model_name: str, output_dir: str = MODELS_DIR) -> str:
+def save_model(model: Any, model_name: str, output_dir: str = MODELS_DIR, feature_names: list = None) -> str:
     """
-    保存训练好的模型
+    保存训练好的模型，并在模型文件旁保存全局特征重要性
 
     Args:
         model: 训练好的模型
         model_name: 模型名称
         output_dir: 输出目录
+        feature_names: 特征名称，默认使用模型记录的特征名称
 
     Returns:
         模型保存路径
@@ -290,6 +399,11 @@ def save_model(model: Any, model_name: str, output_dir: str = MODELS_DIR) -> str
     logger.info(f"保存模型到 {model_path}")
     joblib.dump(model, model_path)
     
+    # 全局特征重要性对同一模型不变，保存时计算一次
+    importance_df = compute_global_importance(model, feature_names)
+    if importance_df is not None:
+        save_importance(importance_df, model_path)
+    
     return model_path
 
 
@@ -429,11 +543,18 @@ def main(config_path: str):
     # 加载数据
     X_train, X_test, y_train, y_test = load_processed_data()
     
+    # 稀疏特征矩阵不带列名，从特征存储元数据读取特征名称
+    feature_names = None
+    if not isinstance(X_train, pd.DataFrame):
+        metadata = load_feature_metadata(PROCESSED_DATA_DIR, "X_train")
+        feature_names = metadata["feature_names"] if metadata is not None else None
+    
     # 训练多个模型
     models = train_models(X_train, y_train, config)
     
-    # 评估模型
-    evaluation_results = evaluate_models(models, X_test, y_test)
+    # 评估模型：每个模型只推理一次，评估结果按模型和数据集指纹缓存
+    evaluator = ModelEvaluator(threshold=config.get("evaluation", {}).get("threshold", 0.5))
+    evaluation_results = evaluate_models(models, X_test, y_test, evaluator)
     
     # 绘制模型比较图
     plot_model_comparison(evaluation_results, os.path.join(PROJECT_ROOT, "reports/figures"))
@@ -443,31 +564,34 @@ def main(config_path: str):
     
     # 优化最佳模型
     optimized_model = optimize_best_model(
-        X_train, y_train, X_test, y_test, best_model_name, config
+        X_train, y_train, X_test, y_test, best_model_name, config, evaluator,
+        base_model=models.get(best_model_name)
     )
     
-    # 评估优化后的模型
-    y_pred = optimized_model.predict(X_test)
-    y_pred_proba = optimized_model.predict_proba(X_test)[:, 1]
-    
-    optimized_metrics = {
-        "accuracy": accuracy_score(y_test, y_pred),
-        "precision": precision_score(y_test, y_pred),
-        "recall": recall_score(y_test, y_pred),
-        "f1": f1_score(y_test, y_pred),
-        "roc_auc": roc_auc_score(y_test, y_pred_proba),
-        "avg_precision": average_precision_score(y_test, y_pred_proba)
-    }
+    # 评估优化后的模型（优化阶段已评估过，直接使用缓存结果）
+    optimized_metrics = evaluator.evaluate(optimized_model, X_test, y_test)
     
     # 保存最佳模型
-    model_path = save_model(optimized_model, f"optimized_{best_model_name}")
+    model_path = save_model(optimized_model, f"optimized_{best_model_name}", feature_names=feature_names)
+    
+    # 将预处理器与最佳模型打包为推理管道，构建时校验列约定
+    preprocessor_path = os.path.join(PROCESSED_DATA_DIR, "preprocessor.pkl")
+    if os.path.exists(preprocessor_path):
+        pipeline = build_inference_pipeline(joblib.load(preprocessor_path), optimized_model)
+        save_inference_pipeline(pipeline, f"optimized_{best_model_name}")
+    else:
+        logger.warning(f"预处理器文件不存在，跳过推理管道保存: {preprocessor_path}")
     
-    # 记录到MLflow
+    # 记录到MLflow（早停的模型同时记录预测时使用的迭代次数）
     if config.get("use_mlflow", False):
+        params = optimized_model.get_params()
+        n_iterations = best_iteration(optimized_model)
+        if n_iterations is not None:
+            params["best_iteration"] = n_iterations
         log_to_mlflow(
             optimized_model, best_model_name,
             optimized_metrics,
-            optimized_model.get_params()
+            params
         )
     
     # 记录完成时间和总耗时
@@ -0,0 +1,197 @@
+"""
+图表渲染模块
+
+该模块负责为Web应用渲染图表，包括：
+- 使用面向对象的Figure API绘图，不依赖pyplot全局状态，可在多线程中安全使用
+- 在后台线程池中渲染，不阻塞请求线程：请求中只取已渲染好的图表，尚未完成时返回图表标识，由页面轮询
+- 按键（如模型版本、结果文件）缓存渲染好的PNG（base64编码），图表标识由缓存键计算
+"""
+
+import io
+import base64
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from matplotlib.figure import Figure
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def figure_to_base64(fig: Figure) -> str:
+    """
+    将Figure对象转换为base64编码的PNG字符串
+
+    Args:
+        fig: matplotlib Figure对象
+
+    Returns:
+        base64编码的PNG字符串
+    """
+    img = io.BytesIO()
+    fig.savefig(img, format='png', bbox_inches='tight')
+    return base64.b64encode(img.getvalue()).decode('utf-8')
+
+
+def render_importance_chart(importance_df: pd.DataFrame, top_n: int = 10) -> str:
+    """
+    绘制Top N特征重要性条形图
+
+    Args:
+        importance_df: 特征重要性DataFrame
+        top_n: 展示的特征数
+
+    Returns:
+        base64编码的PNG字符串
+    """
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    sns.barplot(data=importance_df.head(top_n), x='Importance', y='Feature', ax=ax)
+    ax.set_title(f'Top {top_n} 特征重要性')
+    fig.tight_layout()
+    return figure_to_base64(fig)
+
+
+def render_probability_histogram(bin_edges: List[float], counts: List[int], threshold: float = 0.5) -> str:
+    """
+    根据预先统计的分箱计数绘制续保概率分布图
+
+    Args:
+        bin_edges: 分箱边界
+        counts: 每个分箱的客户数量
+        threshold: 决策阈值
+
+    Returns:
+        base64编码的PNG字符串
+    """
+    bin_edges = np.asarray(bin_edges)
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.bar(bin_edges[:-1], counts, width=np.diff(bin_edges), align='edge', edgecolor='white')
+    ax.set_title('续保概率分布')
+    ax.set_xlabel('续保概率')
+    ax.set_ylabel('客户数量')
+    ax.axvline(x=threshold, color='red', linestyle='--', label=f'决策阈值 ({threshold})')
+    ax.legend()
+    return figure_to_base64(fig)
+
+
+class ChartRenderer:
+    """在后台线程池中渲染图表，并按键缓存渲染结果"""
+
+    def __init__(self, max_workers: int = 2, max_entries: int = 256):
+        """
+        Args:
+            max_workers: 渲染线程数
+            max_entries: 最多缓存的图表数，超出时淘汰最久未使用的图表
+        """
+        self.max_entries = max_entries
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chart-renderer")
+        self._cache: "OrderedDict[str, Future]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def chart_id(key: Hashable) -> str:
+        """
+        由缓存键计算图表标识，用于图表URL（页面按该标识轮询渲染结果）
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            十六进制图表标识
+        """
+        return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:16]
+
+    def submit(self, key: Optional[Hashable], render_fn: Callable[..., str], *args: Any) -> Future:
+        """
+        提交渲染任务，相同键的图表只渲染一次
+
+        Args:
+            key: 缓存键，为None时不缓存
+            render_fn: 渲染函数，返回base64编码的PNG字符串
+            *args: 渲染函数参数
+
+        Returns:
+            渲染结果的Future
+        """
+        if key is None:
+            return self._executor.submit(render_fn, *args)
+
+        chart_id = self.chart_id(key)
+        with self._lock:
+            future = self._cache.get(chart_id)
+            if future is not None:
+                self._cache.move_to_end(chart_id)
+                return future
+
+            future = self._executor.submit(render_fn, *args)
+            self._cache[chart_id] = future
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return future
+
+    def render(
+        self, key: Hashable, render_fn: Callable[..., str], *args: Any, timeout: float = 0.0
+    ) -> Optional[str]:
+        """
+        获取图表，未渲染时提交渲染任务；默认不等待，尚未完成时返回None，
+        页面通过 chart_id(key) 对应的URL轮询 status
+
+        Args:
+            key: 缓存键
+            render_fn: 渲染函数
+            *args: 渲染函数参数
+            timeout: 最长等待时间（秒），默认不等待
+
+        Returns:
+            base64编码的PNG字符串，尚未完成或渲染失败时返回None
+        """
+        self.submit(key, render_fn, *args)
+        status, image = self.status(self.chart_id(key), timeout=timeout)
+        return image if status == "ready" else None
+
+    def status(self, chart_id: str, timeout: float = 0.0) -> Tuple[str, Optional[str]]:
+        """
+        查询图表的渲染状态
+
+        Args:
+            chart_id: 图表标识
+            timeout: 最长等待时间（秒），默认不等待
+
+        Returns:
+            (状态, 图表)：ready 时为base64编码的PNG字符串；pending 表示仍在渲染；
+            missing 表示没有该图表（未提交、已淘汰或渲染失败）
+        """
+        with self._lock:
+            future = self._cache.get(chart_id)
+        if future is None:
+            return "missing", None
+
+        try:
+            image = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            return "pending", None
+        except Exception as e:
+            logger.error(f"渲染图表失败: {chart_id}: {str(e)}")
+            image = None
+
+        if image is None:
+            # 失败的渲染不保留在缓存中，下次请求时重试
+            with self._lock:
+                if self._cache.get(chart_id) is future:
+                    del self._cache[chart_id]
+            return "missing", None
+        return "ready", image
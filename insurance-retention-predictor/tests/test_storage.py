@@ -0,0 +1,49 @@
+"""
+数据存储模块测试
+
+- 分块读取的CSV中列类型在数据块之间变化时，Parquet分块写入仍能完成并保留全部数据
+"""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# 添加项目根目录到系统路径，以便导入src包
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.data.storage import FrameWriter, iter_frame_chunks, read_frame
+
+pytest.importorskip("pyarrow")
+
+
+def _drifting_csv(path: str) -> None:
+    """前两行中Note列为空、Code列为整数，后面的行中出现字符串、日期和缺失值标记"""
+    pd.DataFrame({
+        "PolicyID": range(6),
+        "Note": [None, None, "续保", "2024-01-15", None, "退保"],
+        "Code": ["1", "2", "3", "N/A", "x7", "8"],
+        "Premium": [100, 200, 300.5, 400, 500, 600],
+    }).to_csv(path, index=False)
+
+
+def test_frame_writer_promotes_drifting_csv_columns(tmp_path):
+    csv_path = os.path.join(tmp_path, "drifting.csv")
+    parquet_path = os.path.join(tmp_path, "result.parquet")
+    _drifting_csv(csv_path)
+
+    chunks = list(iter_frame_chunks(csv_path, chunk_size=2))
+    assert chunks[0]["Note"].dtype != chunks[1]["Note"].dtype
+
+    with FrameWriter(parquet_path) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+
+    result = read_frame(parquet_path)
+    assert sorted(os.listdir(tmp_path)) == ["drifting.csv", "result.parquet"]
+    assert result["PolicyID"].tolist() == list(range(6))
+    assert result["Note"].tolist()[2:4] == ["续保", "2024-01-15"]
+    assert result["Note"].isna().tolist() == [True, True, False, False, True, False]
+    assert result["Code"].tolist()[4] == "x7"
+    assert result["Premium"].tolist() == [100, 200, 300.5, 400, 500, 600]